@@ -6,8 +6,12 @@ This script shows sample outputs and demonstrates the pipeline functionality.
 
 import json
 import sys
+from itertools import islice
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent / "repo-indexer"))
+from chunker.chunk_reader import count_chunks, iter_chunks
+
 def show_sample_chunks():
     """Display sample chunks from the generated chunks.jsonl file."""
     print("=" * 60)
@@ -21,20 +25,11 @@ def show_sample_chunks():
     
     print(f"Reading chunks from: {chunks_file}")
     
-    chunks = []
-    with open(chunks_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                chunk = json.loads(line.strip())
-                chunks.append(chunk)
-            except json.JSONDecodeError:
-                continue
-    
-    print(f"Total chunks found: {len(chunks)}")
+    print(f"Total chunks found: {count_chunks(chunks_file)}")
     print()
     
     # Show first 3 chunks as examples
-    for i, chunk in enumerate(chunks[:3], 1):
+    for i, chunk in enumerate(islice(iter_chunks(chunks_file), 3), 1):
         print(f"CHUNK {i}:")
         print(f"  ID: {chunk['id'][:50]}...")
         print(f"  File: {chunk['filepath']}")
@@ -90,8 +85,7 @@ def demonstrate_embedding_simulation():
         # Read a sample chunk
         chunks_file = Path("repo-indexer/outputs/chunks.jsonl")
         if chunks_file.exists():
-            with open(chunks_file, 'r', encoding='utf-8') as f:
-                first_chunk = json.loads(f.readline())
+            first_chunk = next(iter_chunks(chunks_file, fields=('text',)))
             
             # Generate embedding for the chunk
             text = first_chunk['text']
@@ -130,16 +124,7 @@ def demonstrate_chroma_simulation():
         # Read sample chunks and insert them
         chunks_file = Path("repo-indexer/outputs/chunks.jsonl")
         if chunks_file.exists():
-            chunks = []
-            with open(chunks_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        chunk = json.loads(line.strip())
-                        chunks.append(chunk)
-                        if len(chunks) >= 3:  # Limit to 3 chunks for demo
-                            break
-                    except json.JSONDecodeError:
-                        continue
+            chunks = list(islice(iter_chunks(chunks_file), 3))  # Limit to 3 chunks for demo
             
             if chunks:
                 # Insert chunks
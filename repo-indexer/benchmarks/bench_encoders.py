@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compares encoder backends on a sample of our own chunks.
+Reports encode throughput for the fp32 SentenceTransformer and the quantized
+ONNX export, plus recall@k of ONNX retrieval against the fp32 ranking.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.metrics import cosine, mean_recall_at_k, top_k_matrix
+from chunker.chunk_reader import sample_chunks
+from embeddings.encoders import load_encoder
+
+
+def load_sample(chunks_file: Path, sample: int, seed: int = 0) -> List[Dict]:
+    """Seeded stratified sample, streamed so only the sampled chunks are read in full."""
+    return sample_chunks(chunks_file, sample, seed, fields=('id', 'text', 'summary', 'symbol_path'))
+
+
+def default_queries(chunks: List[Dict], count: int, seed: int = 0) -> List[str]:
+    """Short natural-ish queries from chunk summaries and symbol names."""
+    picked = random.Random(seed + 1).sample(chunks, min(count, len(chunks)))
+    queries = []
+    for chunk in picked:
+        symbol = chunk.get('symbol_path', '').split(':')[-1]
+        queries.append(f"{chunk.get('summary', '')} {symbol}".strip() or chunk['text'][:200])
+    return queries
+
+
+def time_encode(encoder, texts: List[str], batch_size: int):
+    """Encode in batches; returns (embeddings, seconds)."""
+    embeddings = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        embeddings.extend(encoder.encode(texts[i:i + batch_size]))
+    return embeddings, time.perf_counter() - start
+
+
+def run(chunks_file: Path, model_name: str, onnx_path: str, sample: int, n_queries: int,
+        k: int, batch_size: int, queries: List[str] = None) -> Dict:
+    chunks = load_sample(chunks_file, sample)
+    texts = [chunk['text'] for chunk in chunks]
+    queries = queries or default_queries(chunks, n_queries)
+
+    report = {'chunks': len(texts), 'queries': len(queries), 'k': k, 'backends': {}}
+    results = {}
+    for backend in ('torch', 'onnx'):
+        start = time.perf_counter()
+        encoder = load_encoder(backend, model_name, onnx_path)
+        load_s = time.perf_counter() - start
+        encoder.encode(texts[:batch_size])  # warm-up
+        doc_vectors, encode_s = time_encode(encoder, texts, batch_size)
+        query_vectors, query_s = time_encode(encoder, queries, 1)
+        results[backend] = (doc_vectors, query_vectors)
+        report['backends'][backend] = {
+            'model': encoder.name,
+            'load_s': round(load_s, 3),
+            'chunks_per_s': round(len(texts) / encode_s, 2) if encode_s else None,
+            'query_ms': round(query_s / max(len(queries), 1) * 1000, 3),
+        }
+
+    ref_docs, ref_queries = results['torch']
+    onnx_docs, onnx_queries = results['onnx']
+    reference = top_k_matrix(ref_queries, ref_docs, k)
+    # Queries and documents both from ONNX: what a fully ONNX-indexed store returns
+    candidate = top_k_matrix(onnx_queries, onnx_docs, k)
+    report['recall_at_k'] = round(mean_recall_at_k(reference, candidate, k), 4)
+    report['mean_cosine_to_fp32'] = round(sum(cosine(a, b) for a, b in zip(ref_docs, onnx_docs)) / len(ref_docs), 4)
+    torch_rate = report['backends']['torch']['chunks_per_s']
+    onnx_rate = report['backends']['onnx']['chunks_per_s']
+    report['speedup'] = round(onnx_rate / torch_rate, 2) if torch_rate and onnx_rate else None
+    return report
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark fp32 vs quantized ONNX encoders")
+    parser.add_argument("--chunks", default="repo-indexer/outputs/chunks.jsonl", help="Path to chunks JSONL file")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    parser.add_argument("--onnx-path", required=True, help="Directory written by export_onnx.py")
+    parser.add_argument("--sample", type=int, default=2000, help="Chunks to encode")
+    parser.add_argument("--queries", type=int, default=200, help="Generated queries for recall")
+    parser.add_argument("--queries-file", help="Use these queries instead (one per line)")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encode batch size")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    queries = None
+    if args.queries_file:
+        with open(args.queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    report = run(Path(args.chunks), args.model, args.onnx_path, args.sample, args.queries,
+                 args.k, args.batch_size, queries)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on generated repositories.
+Times traversal, chunking, JSONL writing, embedding and search on a synthetic
+repo of configurable size and language mix; reports throughput, latency and peak RSS.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent.parent / "src" / "inputandfilehandling"))
+
+from benchmarks.metrics import latency_summary
+from chunker.chunker import RepoChunker
+from chunker.git_changes import git_head
+from filetraversal import TraverseFileSystemParams, traverse_file_system
+
+EXTENSIONS = {'python': '.py', 'javascript': '.js', 'typescript': '.ts', 'java': '.java'}
+DEFAULT_MIX = "python=0.5,javascript=0.2,typescript=0.1,java=0.2"
+STAGES = ('traversal', 'chunking', 'writing', 'embedding', 'search')
+
+# Throughput keys compared against a baseline report (higher is better)
+THROUGHPUT_KEYS = ('files_per_s', 'chunks_per_s', 'queries_per_s')
+
+_WORDS = ('user', 'order', 'cache', 'token', 'index', 'parse', 'session', 'config', 'query', 'record',
+          'buffer', 'request', 'payload', 'vector', 'graph', 'node', 'stream', 'batch', 'auth', 'report')
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse `python=0.5,java=0.5` into normalized language weights."""
+    weights = {}
+    for part in mix.split(','):
+        if not part.strip():
+            continue
+        language, _, weight = part.partition('=')
+        language = language.strip()
+        if language not in EXTENSIONS:
+            raise ValueError(f"Unsupported language in mix: {language} (choose from {', '.join(EXTENSIONS)})")
+        weights[language] = float(weight or 1)
+    total = sum(weights.values())
+    if not total:
+        raise ValueError("Language mix is empty")
+    return {language: weight / total for language, weight in weights.items()}
+
+
+def _identifier(rng: random.Random, parts: int = 2) -> str:
+    return '_'.join(rng.choice(_WORDS) for _ in range(parts))
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+def _function_source(language: str, name: str, rng: random.Random, body_lines: int) -> List[str]:
+    statements = [f"{_identifier(rng)} = {_identifier(rng)} + {rng.randint(0, 999)}" for _ in range(body_lines)]
+    if language == 'python':
+        return [f"def {name}({_identifier(rng, 1)}, {_identifier(rng, 1)}):",
+                f'    """{name.replace("_", " ").capitalize()}."""',
+                *(f"    {s}" for s in statements), "    return None", ""]
+    name = _camel(name)
+    if language == 'java':
+        return [f"    public int {name}(int {_identifier(rng, 1)}) {{",
+                *(f"        int {s};" for s in statements), "        return 0;", "    }", ""]
+    typed = ': number' if language == 'typescript' else ''
+    return [f"function {name}({_identifier(rng, 1)}{typed}) {{",
+            *(f"  const {s};" for s in statements), "  return null;", "}", ""]
+
+
+def generate_repo(root: Path, files: int, mix: Dict[str, float], functions_per_file: int = 8,
+                  body_lines: int = 6, files_per_dir: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """Write a deterministic synthetic repository; returns its size by language."""
+    rng = random.Random(seed)
+    languages = list(mix)
+    weights = [mix[language] for language in languages]
+    by_language: Dict[str, int] = {}
+    total_bytes = 0
+    for n in range(files):
+        language = rng.choices(languages, weights)[0]
+        directory = root / f"pkg_{n // files_per_dir:03d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for f in range(functions_per_file):
+            lines.extend(_function_source(language, f"{_identifier(rng)}_{f}", rng, body_lines))
+        if language == 'java':
+            lines = [f"public class Module{n} {{", *lines, "}"]
+        path = directory / f"module_{n:05d}{EXTENSIONS[language]}"
+        content = '\n'.join(lines) + '\n'
+        path.write_text(content, encoding='utf-8')
+        by_language[language] = by_language.get(language, 0) + 1
+        total_bytes += len(content.encode('utf-8'))
+    return {'files': files, 'bytes': total_bytes, 'files_by_language': by_language, 'seed': seed}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _stage(seconds: float, **values) -> Dict[str, Any]:
+    result = {'seconds': round(seconds, 4), **values}
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def _rate(count: int, seconds: float) -> Optional[float]:
+    return round(count / seconds, 2) if seconds else None
+
+
+def bench_traversal(root: Path) -> Tuple[List[str], Dict[str, Any]]:
+    files = []
+    params = TraverseFileSystemParams(
+        input_path=str(root),
+        process_file=lambda p: files.append(p.file_path),
+        ignore=RepoChunker.IGNORE_PATTERNS
+    )
+    start = time.perf_counter()
+    # The traversal prints every entry; keep that out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        traverse_file_system(params)
+    seconds = time.perf_counter() - start
+    return files, _stage(seconds, files=len(files), files_per_s=_rate(len(files), seconds))
+
+
+def bench_chunking(repo_chunker: RepoChunker, files: List[str]):
+    """Time `TreeSitterChunker.chunk_file` per file (reads are not timed)."""
+    chunker = repo_chunker.chunker
+    per_file = []
+    latencies = []
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        start = time.perf_counter()
+        chunks = chunker.chunk_file(path, content)
+        latencies.append((time.perf_counter() - start) * 1000)
+        per_file.append((path, chunks))
+    seconds = sum(latencies) / 1000
+    chunk_count = sum(len(chunks) for _, chunks in per_file)
+    fallback = sum(1 for _, chunks in per_file for c in chunks if c.get('parser_fallback'))
+    return per_file, _stage(seconds, files=len(files), chunks=chunk_count, files_per_s=_rate(len(files), seconds),
+                            chunks_per_s=_rate(chunk_count, seconds), parser_fallback_chunks=fallback,
+                            per_file_latency=latency_summary(latencies))
+
+
+def bench_writing(repo_chunker: RepoChunker, per_file, root: Path, chunks_file: Path) -> Dict[str, Any]:
+    """Time record building and JSONL serialization of the chunked files."""
+    last_modified = datetime.now().isoformat()
+    count = 0
+    start = time.perf_counter()
+    with open(chunks_file, 'w', encoding='utf-8') as f:
+        for path, chunks in per_file:
+            language = repo_chunker.chunker._get_language(path)
+            for record in repo_chunker._build_records(Path(path).relative_to(root), chunks, language, last_modified):
+                f.write(json.dumps(record) + '\n')
+                count += 1
+    seconds = time.perf_counter() - start
+    return _stage(seconds, chunks=count, chunks_per_s=_rate(count, seconds),
+                  bytes=chunks_file.stat().st_size)
+
+
+def bench_embedding(chunks_file: Path, store_path: Path, backend: str, model_name: str, store: Optional[str],
+                    batch_size: int, workers: int) -> Dict[str, Any]:
+    from embeddings.embed_chroma import ChromaEmbedder
+
+    start = time.perf_counter()
+    embedder = ChromaEmbedder(chroma_path=str(store_path), model_name=model_name, batch_size=batch_size,
+                              workers=workers, backend=backend, store=store)
+    load_s = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        totals = embedder.process_chunks_file(str(chunks_file))
+        seconds = time.perf_counter() - start
+    finally:
+        embedder.close()
+    embedded = totals.get('inserted', 0) + totals.get('updated', 0)
+    return _stage(seconds, load_s=round(load_s, 3), store=embedder.store, chunks=embedded,
+                  failed=totals.get('failed', 0), chunks_per_s=_rate(embedded, seconds))
+
+
+def bench_search(store_path: Path, backend: str, model_name: str, store: Optional[str], queries: List[str],
+                 n_results: int) -> Dict[str, Any]:
+    from retrieval.query import CodeRetriever
+
+    retriever = CodeRetriever(chroma_path=str(store_path), model_name=model_name, backend=backend, store=store)
+    retriever.search(queries[0], n_results=n_results)  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        query_start = time.perf_counter()
+        retriever.search(query, n_results=n_results)
+        latencies.append((time.perf_counter() - query_start) * 1000)
+    seconds = time.perf_counter() - start
+    return _stage(seconds, queries=len(queries), queries_per_s=_rate(len(queries), seconds),
+                  latency=latency_summary(latencies))
+
+
+def synthetic_queries(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed + 1)
+    return [f"how does {_identifier(rng).replace('_', ' ')} handle {rng.choice(_WORDS)}" for _ in range(count)]
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Ratio of each throughput figure to the same figure in a baseline report."""
+    ratios = {}
+    for stage, values in report['stages'].items():
+        base = baseline.get('stages', {}).get(stage, {})
+        for key in THROUGHPUT_KEYS:
+            if values.get(key) and base.get(key):
+                ratios.setdefault(stage, {})[key] = round(values[key] / base[key], 3)
+    return ratios
+
+
+def run(files: int = 200, mix: str = DEFAULT_MIX, functions_per_file: int = 8, seed: int = 0,
+        backend: str = 'hashing', model_name: str = "all-mpnet-base-v2", store: Optional[str] = 'local',
+        batch_size: int = 64, workers: int = 1, n_queries: int = 50, n_results: int = 5,
+        stages: Optional[List[str]] = None, work_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Generate a repo under a temporary directory and benchmark each stage on it."""
+    stages = stages or list(STAGES)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        tmp = Path(tmp)
+        root = tmp / "repo"
+        report = {
+            'git_commit': git_head(Path(__file__).parent),
+            'timestamp': datetime.now().isoformat(),
+            'config': {'backend': backend, 'model': model_name if backend != 'hashing' else None,
+                       'store': store, 'batch_size': batch_size, 'workers': workers,
+                       'functions_per_file': functions_per_file, 'mix': parse_mix(mix)},
+            'repo': generate_repo(root, files, parse_mix(mix), functions_per_file, seed=seed),
+            'stages': {},
+        }
+        repo_chunker = RepoChunker(str(root), str(tmp / "outputs"))
+        chunks_file = tmp / "outputs" / "chunks.jsonl"
+
+        # Later stages consume earlier outputs, so everything up to the last requested stage runs
+        last = max(STAGES.index(stage) for stage in stages)
+        paths, results = bench_traversal(root)
+        report['stages']['traversal'] = results
+        if last >= STAGES.index('chunking'):
+            per_file, report['stages']['chunking'] = bench_chunking(repo_chunker, sorted(paths))
+        if last >= STAGES.index('writing'):
+            report['stages']['writing'] = bench_writing(repo_chunker, per_file, root, chunks_file)
+        if last >= STAGES.index('embedding'):
+            report['stages']['embedding'] = bench_embedding(chunks_file, tmp / "store", backend, model_name,
+                                                            store, batch_size, workers)
+        if last >= STAGES.index('search'):
+            report['stages']['search'] = bench_search(tmp / "store", backend, model_name, store,
+                                                      synthetic_queries(n_queries, seed), n_results)
+        report['stages'] = {stage: values for stage, values in report['stages'].items() if stage in stages}
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the indexing pipeline on a synthetic repository")
+    parser.add_argument("--files", type=int, default=200, help="Files in the generated repository")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Language weights, e.g. python=0.7,java=0.3")
+    parser.add_argument("--functions-per-file", type=int, default=8, help="Functions generated per file")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--stages", default=','.join(STAGES),
+                        help="Comma-separated stages to report")
+    parser.add_argument("--backend", default="hashing", choices=["torch", "onnx", "hashing"],
+                        help="Encoder backend (hashing is a model-free stand-in)")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    parser.add_argument("--store", default="local", choices=["chroma", "local"], help="Vector store")
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--workers", type=int, default=1, help="Encoder processes")
+    parser.add_argument("--queries", type=int, default=50, help="Search queries to time")
+    parser.add_argument("--n", type=int, default=5, help="Results per query")
+    parser.add_argument("--work-dir", help="Where to create the temporary repository and store")
+    parser.add_argument("--baseline", help="Earlier report to compare throughput against")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.files, args.mix, args.functions_per_file, args.seed, args.backend, args.model, args.store,
+                 args.batch_size, args.workers, args.queries, args.n,
+                 [s for s in args.stages.split(',') if s], args.work_dir)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['baseline'] = {'git_commit': baseline.get('git_commit'), 'ratios': compare(report, baseline)}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
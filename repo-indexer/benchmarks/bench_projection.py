@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-memory report for reduced-dimension vector storage.
+Encodes a sample of our chunks once at full size, then for each target
+dimension and method measures recall@k against full-size exact search.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.bench_encoders import default_queries, load_sample, time_encode
+from benchmarks.metrics import mean_recall_at_k, top_k_matrix
+from embeddings.encoders import load_encoder
+from embeddings.projection import Projection
+
+# hnswlib (Chroma's index) keeps float32 vectors plus ~2*M neighbour ids per node
+HNSW_M = 16
+
+
+def bytes_per_vector(dimension: int) -> int:
+    return dimension * 4 + 2 * HNSW_M * 4
+
+
+def run(chunks_file: Path, backend: str, model_name: str, onnx_path: str, sample: int,
+        n_queries: int, k: int, dims: List[int], fit_sample: int, batch_size: int, seed: int = 0) -> Dict:
+    chunks = load_sample(chunks_file, sample, seed)
+    texts = [chunk['text'] for chunk in chunks]
+    queries = default_queries(chunks, n_queries)
+
+    encoder = load_encoder(backend, model_name, onnx_path)
+    doc_vectors, _ = time_encode(encoder, texts, batch_size)
+    query_vectors, _ = time_encode(encoder, queries, batch_size)
+    full_dim = len(doc_vectors[0])
+
+    # Fit on a seeded subset (the sample is in file order, so a prefix would favour early files)
+    # and measure every method's recall on the rest, which PCA has not seen
+    fit_rows = set(random.Random(seed).sample(range(len(doc_vectors)), min(fit_sample, len(doc_vectors) // 2)))
+    fit_vectors = [doc_vectors[row] for row in sorted(fit_rows)]
+    eval_vectors = [vector for row, vector in enumerate(doc_vectors) if row not in fit_rows]
+    reference = top_k_matrix(query_vectors, eval_vectors, k)
+
+    rows = [{
+        'method': 'full', 'dimension': full_dim, 'recall_at_k': 1.0,
+        'bytes_per_vector': bytes_per_vector(full_dim), 'memory_ratio': 1.0,
+    }]
+    for dimension in dims:
+        if dimension >= full_dim:
+            continue
+        for method in ('pca', 'truncate'):
+            start = time.perf_counter()
+            if method == 'pca':
+                if dimension > len(fit_vectors):
+                    continue
+                projection = Projection.fit_pca(fit_vectors, dimension)
+            else:
+                projection = Projection.truncate(dimension)
+            fit_s = time.perf_counter() - start
+            candidate = top_k_matrix(projection.apply(query_vectors), projection.apply(eval_vectors), k)
+            rows.append({
+                'method': method,
+                'dimension': dimension,
+                'recall_at_k': round(mean_recall_at_k(reference, candidate, k), 4),
+                'explained_variance': round(projection.explained_variance, 4) if projection.explained_variance else None,
+                'fit_s': round(fit_s, 3),
+                'bytes_per_vector': bytes_per_vector(dimension),
+                'memory_ratio': round(bytes_per_vector(dimension) / bytes_per_vector(full_dim), 3),
+            })
+
+    return {
+        'encoder': encoder.name,
+        'chunks': len(texts),
+        'fit_chunks': len(fit_vectors),
+        'evaluated_chunks': len(eval_vectors),
+        'queries': len(queries),
+        'k': k,
+        'per_million_chunks_gb': {
+            f"{row['method']}-{row['dimension']}": round(row['bytes_per_vector'] * 1e6 / 1e9, 2) for row in rows
+        },
+        'results': rows,
+    }
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Recall vs memory of reduced-dimension vectors")
+    parser.add_argument("--chunks", default="repo-indexer/outputs/chunks.jsonl", help="Path to chunks JSONL file")
+    parser.add_argument("--backend", help="Encoder backend (default: ENCODER_BACKEND or torch)")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    parser.add_argument("--onnx-path", help="Directory written by export_onnx.py (onnx backend)")
+    parser.add_argument("--sample", type=int, default=5000, help="Chunks to encode")
+    parser.add_argument("--queries", type=int, default=200, help="Generated queries for recall")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--dims", default="512,384,256,128,64", help="Comma-separated target dimensions")
+    parser.add_argument("--fit-sample", type=int, default=2000, help="Vectors used to fit PCA (at most half the sample; the rest is evaluated)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encode batch size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the chunk sample and the PCA fit subset")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(Path(args.chunks), args.backend, args.model, args.onnx_path, args.sample, args.queries,
+                 args.k, [int(d) for d in args.dims.split(',') if d], args.fit_sample, args.batch_size, args.seed)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Retrieval quality and speed against a labeled query set.
+Runs JSONL queries with expected files/symbols through CodeRetriever for each
+store and search mode, reporting recall@k, MRR, p50/p99 latency and QPS.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.metrics import latency_summary, reciprocal_rank
+
+
+def _path_parts(filepath: str) -> List[str]:
+    """Path components, ignoring the separator style and `./` segments (not dot-prefixed names)."""
+    return [part for part in str(filepath).replace('\\', '/').split('/') if part not in ('', '.')]
+
+
+def load_labeled_queries(path: Path) -> List[Dict[str, Any]]:
+    """Read `{"query": ..., "expected": [{"filepath": ..., "symbol": ...}]}` lines.
+
+    `expected_files` / `expected_symbols` lists are accepted as shorthand, and
+    an optional `language` restricts the search like `query.py --language`.
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            expected = list(record.get('expected', []))
+            expected += [{'filepath': filepath} for filepath in record.get('expected_files', [])]
+            expected += [{'symbol': symbol} for symbol in record.get('expected_symbols', [])]
+            if not record.get('query') or not expected:
+                raise ValueError(f"Line {line_num} of {path} needs a query and at least one expected answer")
+            queries.append({'query': record['query'], 'expected': expected, 'language': record.get('language')})
+    return queries
+
+
+def is_relevant(metadata: Dict[str, Any], answer: Dict[str, Any]) -> bool:
+    """A hit answers when its file ends with the expected path's components and its symbol path names the symbol."""
+    filepath = answer.get('filepath')
+    if filepath:
+        expected, actual = _path_parts(filepath), _path_parts(metadata.get('filepath', ''))
+        if not expected or actual[-len(expected):] != expected:
+            return False
+    symbol = answer.get('symbol')
+    if symbol:
+        # symbol_path looks like "function:name"; also accept a bare "name" or "Class.method" tail
+        symbol_path = metadata.get('symbol_path', '')
+        if symbol_path != symbol and symbol_path.split(':')[-1] != symbol.split(':')[-1]:
+            return False
+    return bool(filepath or symbol)
+
+
+def score_query(hits: List[Dict[str, Any]], expected: List[Dict[str, Any]], k: int) -> Dict[str, float]:
+    metadatas = [hit.get('metadata') or {} for hit in hits[:k]]
+    found = sum(1 for answer in expected if any(is_relevant(m, answer) for m in metadatas))
+    flags = [any(is_relevant(m, answer) for answer in expected) for m in metadatas]
+    return {
+        'recall': found / len(expected),
+        'hit': float(any(flags)),
+        'reciprocal_rank': reciprocal_rank(flags),
+    }
+
+
+def evaluate(search: Callable[[str, int, Optional[Dict[str, Any]]], List[Dict[str, Any]]],
+             queries: List[Dict[str, Any]], k: int, warmup: int = 1, per_query: bool = False) -> Dict[str, Any]:
+    """Time `search(query, k, where)` over the labeled queries and score the rankings."""
+    for labeled in queries[:warmup]:
+        search(labeled['query'], k, None)
+
+    scores = []
+    latencies = []
+    started = time.perf_counter()
+    for labeled in queries:
+        where = {'language': labeled['language']} if labeled.get('language') else None
+        start = time.perf_counter()
+        hits = search(labeled['query'], k, where)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scores.append(score_query(hits, labeled['expected'], k))
+    elapsed = time.perf_counter() - started
+
+    count = len(queries)
+    report = {
+        'queries': count,
+        'k': k,
+        f'recall_at_{k}': round(sum(s['recall'] for s in scores) / count, 4) if count else 0.0,
+        f'hit_rate_at_{k}': round(sum(s['hit'] for s in scores) / count, 4) if count else 0.0,
+        'mrr': round(sum(s['reciprocal_rank'] for s in scores) / count, 4) if count else 0.0,
+        'qps': round(count / elapsed, 2) if elapsed else None,
+        **latency_summary(latencies),
+    }
+    if per_query:
+        report['per_query'] = [
+            {'query': labeled['query'], 'latency_ms': round(latency, 3), **{key: round(value, 4) for key, value in s.items()}}
+            for labeled, latency, s in zip(queries, latencies, scores)
+        ]
+    return report
+
+
+def search_modes(retriever, nprobes: List[int]) -> Iterator[Tuple[str, Callable[[], None]]]:
+    """Yield (label, activate) for each way the retriever's store can answer queries.
+
+    Chroma has one mode. A local store with an IVF-PQ index is measured with
+    exact search and with the index at each `nprobe`.
+    """
+    collection = retriever.collection
+    index = getattr(collection, 'index', None)
+    if index is None:
+        yield ('exact' if retriever.store == 'local' else 'hnsw'), lambda: None
+        return
+
+    def exact():
+        collection.index = None
+
+    yield 'exact', exact
+    for nprobe in nprobes:
+        def ivf(nprobe=nprobe):
+            collection.index = index
+            collection.nprobe = nprobe
+        yield f'ivfpq-nprobe{nprobe}', ivf
+
+
+def run(queries_file: Path, chroma_paths: List[str], backend: Optional[str], model_name: str,
+        onnx_path: Optional[str], k: int, nprobes: List[int], per_query: bool = False,
+        store: Optional[str] = None) -> Dict[str, Any]:
+    from retrieval.query import CodeRetriever
+
+    queries = load_labeled_queries(queries_file)
+    report = {'queries_file': str(queries_file), 'queries': len(queries), 'k': k, 'runs': []}
+    for chroma_path in chroma_paths:
+        retriever = CodeRetriever(chroma_path=chroma_path, model_name=model_name, backend=backend,
+                                  onnx_path=onnx_path, store=store)
+
+        def search(query, n, where, retriever=retriever):
+            return retriever.search(query, n_results=n, where=where)
+
+        for mode, activate in search_modes(retriever, nprobes):
+            activate()
+            result = evaluate(search, queries, k, per_query=per_query)
+            report['runs'].append({
+                'store_path': chroma_path,
+                'store': retriever.store,
+                'mode': mode,
+                'encoder': retriever.encoder.name,
+                'projection': f"{retriever.projection.method}-{retriever.projection.dimension}"
+                              if retriever.projection else None,
+                **result,
+            })
+    return report
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Recall@k, MRR and latency of retrieval on labeled queries")
+    parser.add_argument("--queries", required=True, help="JSONL of {query, expected:[{filepath, symbol}]}")
+    parser.add_argument("--chroma-path", action="append",
+                        help="Store to evaluate; repeat to compare stores (default: ./repo-indexer/chroma_store)")
+    parser.add_argument("--backend", help="Encoder backend (default: ENCODER_BACKEND or torch)")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    parser.add_argument("--onnx-path", help="Directory written by export_onnx.py (onnx backend)")
+    parser.add_argument("--store", choices=["chroma", "local"],
+                        help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path)")
+    parser.add_argument("--k", type=int, default=10, help="Results per query / recall cutoff")
+    parser.add_argument("--nprobe", default="4,8,16", help="IVF-PQ probes to try on indexed local stores")
+    parser.add_argument("--per-query", action="store_true", help="Include per-query scores and latency")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(Path(args.queries), args.chroma_path or ["./repo-indexer/chroma_store"], args.backend,
+                 args.model, args.onnx_path, args.k, [int(n) for n in args.nprobe.split(',') if n], args.per_query,
+                 args.store)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Small, dependency-free metrics shared by the benchmarks.
+Recall of a candidate ranking against a reference ranking, reciprocal rank,
+exact top-k by inner product and latency percentiles.
+"""
+
+import heapq
+import math
+from typing import Dict, List, Sequence
+
+
+def top_k(query: Sequence[float], vectors: Sequence[Sequence[float]], k: int) -> List[int]:
+    """Indices of the k vectors with the highest inner product with query."""
+    scores = ((sum(q * v for q, v in zip(query, vector)), i) for i, vector in enumerate(vectors))
+    return [i for _, i in heapq.nlargest(k, scores)]
+
+
+def top_k_matrix(queries, vectors, k: int) -> List[List[int]]:
+    """Exact top-k for many queries at once with numpy."""
+    import numpy as np
+    scores = np.asarray(queries, dtype=np.float32) @ np.asarray(vectors, dtype=np.float32).T
+    k = min(k, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, best, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(best, order, axis=1).tolist()
+
+
+def recall_at_k(reference: Sequence, candidate: Sequence, k: int) -> float:
+    """Fraction of the reference top-k that appears in the candidate top-k."""
+    expected = set(reference[:k])
+    if not expected:
+        return 0.0
+    return len(expected & set(candidate[:k])) / len(expected)
+
+
+def mean_recall_at_k(references: List[Sequence], candidates: List[Sequence], k: int) -> float:
+    if not references:
+        return 0.0
+    return sum(recall_at_k(r, c, k) for r, c in zip(references, candidates)) / len(references)
+
+
+def reciprocal_rank(relevant: Sequence[bool]) -> float:
+    """1 / rank of the first relevant result, 0 if none is relevant."""
+    for rank, flag in enumerate(relevant, 1):
+        if flag:
+            return 1.0 / rank
+    return 0.0
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) * sum(y * y for y in b)) ** 0.5
+    return dot / norm if norm else 0.0
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+    }
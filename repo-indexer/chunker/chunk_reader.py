@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Streaming readers for chunks.jsonl shared by every consumer.
+Yields chunks one at a time with optional field projection, parses large files
+in parallel byte ranges, keeps byte-offset indexes and draws stratified samples.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OFFSETS_FILENAME = "chunk_offsets.json"
+
+# Files smaller than two blocks are parsed inline; process start-up would dominate
+PARALLEL_BLOCK_BYTES = 8 * 1024 * 1024
+
+# Fields stratified sampling reads; full chunks are fetched by offset afterwards
+SAMPLE_FIELDS = ('id', 'language', 'tokens_estimate', 'filepath', 'start_line', 'end_line')
+
+# Upper bounds (exclusive) of the small and medium size strata, in tokens_estimate
+SIZE_BUCKETS = ((1000, 'small'), (5000, 'medium'))
+
+ErrorHandler = Callable[[int, Exception], None]
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """json.loads, through orjson when it is installed."""
+    if orjson is None:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson is stricter (NaN, lone surrogates); keep whatever json accepts
+        return json.loads(data)
+
+
+def project(chunk: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only `fields` of a chunk (all of them when `fields` is None)."""
+    if fields is None:
+        return chunk
+    return {field: chunk[field] for field in fields if field in chunk}
+
+
+def _warn(line_num: int, error: Exception):
+    logging.warning(f"Skipping unreadable chunk at line {line_num}: {error}")
+
+
+class ChunkRecord(NamedTuple):
+    """One parsed line: 1-based line number, byte span in the file and the chunk."""
+    line_num: int
+    offset: int
+    end_offset: int
+    chunk: Dict[str, Any]
+    line: bytes
+
+
+def iter_chunk_records(path: Union[str, Path], fields: Optional[Sequence[str]] = None, offset: int = 0,
+                       line_num: int = 0, on_error: Optional[ErrorHandler] = None) -> Iterator[ChunkRecord]:
+    """Stream chunks with their positions, starting at byte `offset` (which is line `line_num`).
+
+    Blank lines are skipped; lines that fail to parse go to `on_error(line_num, error)`
+    (default: log a warning) and are skipped too.
+    """
+    on_error = on_error or _warn
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            start = offset
+            offset += len(line)
+            line_num += 1
+            if not line.strip():
+                continue
+            try:
+                chunk = loads(line)
+            except ValueError as e:
+                on_error(line_num, e)
+                continue
+            yield ChunkRecord(line_num, start, offset, project(chunk, fields), line)
+
+
+def _block_ranges(path: Union[str, Path], start: int, block_bytes: int) -> List[Tuple[int, int]]:
+    """Split the file from `start` into ranges of about `block_bytes` ending on line boundaries."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        while start < size:
+            end = min(start + block_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_block(path: str, start: int, end: int,
+                 fields: Optional[Sequence[str]]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]], int]:
+    """Worker side: parse one byte range, returning chunks, (relative line, error) pairs and its line count."""
+    chunks = []
+    errors = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    for line_num, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            chunks.append(project(loads(line), fields))
+        except ValueError as e:
+            errors.append((line_num, str(e)))
+    return chunks, errors, len(lines)
+
+
+def _iter_parallel(path: Union[str, Path], fields: Optional[Sequence[str]], offset: int, workers: int,
+                   block_bytes: int, on_error: ErrorHandler) -> Iterator[Dict[str, Any]]:
+    from concurrent.futures import ProcessPoolExecutor
+
+    ranges = _block_ranges(path, offset, block_bytes)
+    line_base = 0
+    # Results are consumed in file order; at most two blocks per worker are in flight
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        ranges = iter(ranges)
+        for start, end in islice(ranges, workers * 2):
+            pending.append(pool.submit(_parse_block, str(path), start, end, fields))
+        while pending:
+            chunks, errors, line_count = pending.popleft().result()
+            for start, end in islice(ranges, 1):
+                pending.append(pool.submit(_parse_block, str(path), start, end, fields))
+            for line_num, message in errors:
+                on_error(line_base + line_num, ValueError(message))
+            line_base += line_count
+            yield from chunks
+
+
+def iter_chunks(path: Union[str, Path], fields: Optional[Sequence[str]] = None, offset: int = 0,
+                on_error: Optional[ErrorHandler] = None, workers: int = 1,
+                block_bytes: int = PARALLEL_BLOCK_BYTES) -> Iterator[Dict[str, Any]]:
+    """Stream chunks (projected to `fields`), in file order.
+
+    With `workers` > 1 a file larger than two blocks is split on line boundaries
+    and parsed in that many processes; memory stays bounded by the blocks in flight.
+    """
+    on_error = on_error or _warn
+    if workers > 1 and os.path.getsize(path) - offset > 2 * block_bytes:
+        yield from _iter_parallel(path, fields, offset, workers, block_bytes, on_error)
+        return
+    for record in iter_chunk_records(path, fields, offset, on_error=on_error):
+        yield record.chunk
+
+
+def count_chunks(path: Union[str, Path]) -> int:
+    """Number of non-blank lines, without parsing any of them."""
+    with open(path, 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+
+def read_chunks_at(path: Union[str, Path], offsets: Iterable[int],
+                   fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Read the chunks starting at the given byte offsets, in the order given."""
+    chunks = []
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            chunks.append(project(loads(f.readline()), fields))
+    return chunks
+
+
+def _source(path: Union[str, Path]) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ChunkOffsetIndex:
+    """Byte offset of every chunk (and optionally its id) for seeking straight to it."""
+
+    def __init__(self, path: Union[str, Path], offsets: List[int], ids: Optional[List[str]] = None):
+        self.path = Path(path)
+        self.offsets = offsets
+        self.ids = ids
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(ids)} if ids is not None else None
+
+    @classmethod
+    def build(cls, path: Union[str, Path], with_ids: bool = True) -> 'ChunkOffsetIndex':
+        """One streaming pass over the file recording where each chunk starts."""
+        offsets = []
+        ids = [] if with_ids else None
+        for record in iter_chunk_records(path, fields=('id',)):
+            offsets.append(record.offset)
+            if with_ids:
+                ids.append(record.chunk.get('id'))
+        return cls(path, offsets, ids)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def read(self, position: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """The chunk at `position` (0-based, in file order)."""
+        return read_chunks_at(self.path, [self.offsets[position]], fields)[0]
+
+    def read_many(self, positions: Iterable[int], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        return read_chunks_at(self.path, [self.offsets[p] for p in positions], fields)
+
+    def get(self, chunk_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """The chunk with this id, or None; requires an index built with ids."""
+        if self._positions is None:
+            raise ValueError("Offset index was built without ids")
+        position = self._positions.get(chunk_id)
+        return None if position is None else self.read(position, fields)
+
+    def save(self, index_path: Union[str, Path]):
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': _source(self.path), 'offsets': self.offsets, 'ids': self.ids}, f)
+
+    @classmethod
+    def load(cls, index_path: Union[str, Path], path: Union[str, Path]) -> Optional['ChunkOffsetIndex']:
+        """Load a saved index, or None if it is missing or `path` changed since it was written."""
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get('source') != _source(path):
+            return None
+        return cls(path, data['offsets'], data.get('ids'))
+
+    @classmethod
+    def open(cls, path: Union[str, Path], with_ids: bool = True) -> 'ChunkOffsetIndex':
+        """Load the index saved next to `path`, rebuilding and saving it when stale."""
+        index_path = Path(path).parent / OFFSETS_FILENAME
+        index = cls.load(index_path, path)
+        if index is None or (with_ids and index.ids is None):
+            index = cls.build(path, with_ids)
+            index.save(index_path)
+        return index
+
+
+def size_bucket(chunk: Dict[str, Any]) -> str:
+    tokens = chunk.get('tokens_estimate', 0)
+    for upper, label in SIZE_BUCKETS:
+        if tokens < upper:
+            return label
+    return 'large'
+
+
+def _chunk_key(chunk: Dict[str, Any]) -> str:
+    return chunk.get('id') or f"{chunk.get('filepath')}:{chunk.get('start_line')}-{chunk.get('end_line')}"
+
+
+def _priority(seed: int, key: str) -> int:
+    digest = hashlib.blake2b(f"{seed}:{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def allocate(counts: Dict[Tuple[str, str], int], n_samples: int,
+             available: Optional[Dict[Tuple[str, str], int]] = None) -> Dict[Tuple[str, str], int]:
+    """Split `n_samples` across strata in proportion to `counts`, at least one each when possible.
+
+    `available` caps a stratum's quota (defaults to its count); what a capped
+    stratum cannot take is redistributed over the others.
+    """
+    available = available if available is not None else counts
+    quotas = {stratum: 0 for stratum in counts}
+    # Small strata are the ones a proportional split would drop, so seed every stratum first
+    for stratum in sorted(counts, key=lambda s: (-counts[s], s))[:n_samples]:
+        quotas[stratum] = min(1, available[stratum])
+    remaining = n_samples - sum(quotas.values())
+    while remaining > 0:
+        open_strata = [s for s in counts if available[s] > quotas[s]]
+        if not open_strata:
+            break
+        pool = sum(counts[s] for s in open_strata)
+        shares = {s: remaining * counts[s] / pool for s in open_strata}
+        granted = {s: min(int(shares[s]), available[s] - quotas[s]) for s in open_strata}
+        if not any(granted.values()):
+            # Largest remainders take the last few samples, one each
+            for s in sorted(open_strata, key=lambda s: (-(shares[s] - granted[s]), s))[:remaining]:
+                granted[s] = 1
+        for s, extra in granted.items():
+            quotas[s] += extra
+            remaining -= extra
+    return quotas
+
+
+def stratified_sample(chunks: Iterable[Dict[str, Any]], n_samples: int,
+                      seed: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Reservoir-sample chunks stratified by language and size bucket in a single pass.
+
+    Each chunk's rank is a seeded hash of its id, so the sample is reproducible
+    and independent of file order, and a repeated id is only ever kept once.
+    Every stratum keeps its `n_samples` lowest-ranked chunks (bottom-k sampling);
+    quotas are allocated from the stratum counts once the stream ends.
+    Returns the sample and the number of chunks seen.
+    """
+    reservoirs: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+    kept: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+    counts: Dict[Tuple[str, str], int] = {}
+    total = 0
+    for chunk in chunks:
+        total += 1
+        stratum = (chunk.get('language', 'unknown'), size_bucket(chunk))
+        counts[stratum] = counts.get(stratum, 0) + 1
+        heap = reservoirs.setdefault(stratum, [])
+        members = kept.setdefault(stratum, {})
+        key = _chunk_key(chunk)
+        if key in members or n_samples <= 0:
+            continue
+        entry = (-_priority(seed, key), key)
+        if len(heap) < n_samples:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            del members[heapq.heapreplace(heap, entry)[1]]
+        else:
+            continue
+        members[key] = chunk
+
+    quotas = allocate(counts, n_samples, {s: len(kept[s]) for s in counts})
+    selected = []
+    for stratum in sorted(reservoirs):
+        ranked = sorted(reservoirs[stratum], reverse=True)[:quotas[stratum]]
+        selected.extend(kept[stratum][key] for _, key in ranked)
+    return selected, total
+
+
+def sample_chunks(path: Union[str, Path], n_samples: int, seed: int = 0,
+                  fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Seeded stratified sample of the file, reading only the sampled chunks in full.
+
+    `n_samples` of 0 (or more than the file holds) returns every chunk.
+    """
+    if not n_samples:
+        return list(iter_chunks(path, fields))
+    keys = ({**record.chunk, 'offset': record.offset} for record in iter_chunk_records(path, SAMPLE_FIELDS))
+    sampled, _ = stratified_sample(keys, n_samples, seed)
+    return read_chunks_at(path, [chunk['offset'] for chunk in sampled], fields)
@@ -12,38 +12,54 @@ import logging
 import os
 import re
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
-
-try:
-    import tree_sitter
-    from tree_sitter import Language, Parser
-except ImportError:
-    tree_sitter = None
-    Language = None
-    Parser = None
-
-try:
-    import tiktoken
-except ImportError:
-    tiktoken = None
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 # Add the existing file traversal module to path
 sys.path.append(str(Path(__file__).parent.parent.parent / "src" / "inputandfilehandling"))
 from filetraversal import traverse_file_system, TraverseFileSystemParams, ProcessFileParams
 
+# Run as a script, this directory is sys.path[0] and chunker.py would shadow the chunker package
+if __name__ == "__main__":
+    sys.path = [p for p in sys.path if Path(p or '.').resolve() != Path(__file__).resolve().parent]
+sys.path.append(str(Path(__file__).parent.parent))
+from tracing import span
+from chunker.interval_index import ChunkIntervalIndex, INDEX_FILENAME
+from chunker.git_changes import git_head
+from chunker.instrumentation import IndexingProfile
+from chunker.file_reader import DEFAULT_MAX_FILE_BYTES, OVERSIZE_POLICIES, SKIP_REASONS, read_source
+from chunker.line_chunker import LineOffsetIndex, add_overlap, count_lines, iter_line_chunks
+from chunker.dedup import DuplicateTracker, content_hash
+from chunker.chunk_reader import iter_chunk_records, loads
+
+# First definition name in a chunk, used for position-independent symbol paths
+SYMBOL_DEF_REGEX = re.compile(r"\b(def|function|func|class|interface|enum|(?:public|private|protected)\s+(?:static\s+)?\w+)\s+([A-Za-z_$][A-Za-z0-9_$]*)")
+
 
 class TokenEstimator:
-    """Token estimation using tiktoken or fallback method."""
+    """Token estimation using tiktoken or fallback method.
+    
+    tiktoken and its encoding are loaded on the first estimate, so building an
+    estimator (e.g. for --help or a dry run) costs nothing.
+    """
     
     def __init__(self):
-        self.encoder = None
-        if tiktoken:
+        self._encoder = None
+        self._encoder_loaded = False
+    
+    @property
+    def encoder(self):
+        """The cl100k_base encoding, or None when tiktoken is unavailable."""
+        if not self._encoder_loaded:
+            self._encoder_loaded = True
             try:
-                self.encoder = tiktoken.get_encoding("cl100k_base")
+                import tiktoken
+                self._encoder = tiktoken.get_encoding("cl100k_base")
             except Exception:
-                pass
+                self._encoder = None
+        return self._encoder
     
     def estimate_tokens(self, text: str) -> int:
         """Estimate token count for text."""
@@ -63,16 +79,25 @@ class TreeSitterChunker:
         self.min_tokens = min_tokens
         self.overlap_tokens = overlap_tokens
         self.token_estimator = TokenEstimator()
-        self.parsers = {}
+        self._parsers = None
         self.queries = {}
         self.parse_errors = []
         
-        self._setup_parsers()
         self._load_queries()
     
+    @property
+    def parsers(self) -> Dict[str, Any]:
+        """Tree-sitter parsers, set up on first parse so tree_sitter is imported only when needed."""
+        if self._parsers is None:
+            self._parsers = {}
+            self._setup_parsers()
+        return self._parsers
+    
     def _setup_parsers(self):
         """Setup Tree-sitter parsers for supported languages."""
-        if not tree_sitter:
+        try:
+            from tree_sitter import Language, Parser
+        except ImportError:
             logging.warning("Tree-sitter not available, falling back to line-based chunking")
             return
         
@@ -97,7 +122,7 @@ class TreeSitterChunker:
                 
                 parser = Parser()
                 parser.set_language(language)
-                self.parsers[lang_name] = parser
+                self._parsers[lang_name] = parser
                 logging.info(f"Loaded Tree-sitter parser for {lang_name}")
             except Exception as e:
                 logging.warning(f"Could not load Tree-sitter parser for {lang_name}: {e}")
@@ -138,7 +163,7 @@ class TreeSitterChunker:
     
     def _parse_with_tree_sitter(self, content: str, language: str) -> Optional[Any]:
         """Parse content using Tree-sitter."""
-        if language not in self.parsers or language not in self.queries:
+        if language not in self.queries or language not in self.parsers:
             return None
         
         try:
@@ -186,125 +211,61 @@ class TreeSitterChunker:
         # In practice, you'd traverse the node to find identifier children
         return capture_name or node.type
     
-    def _fallback_chunking(self, content: str, filepath: str) -> List[Dict]:
+    def _fallback_chunking(self, content: str, filepath: str,
+                           index: Optional[LineOffsetIndex] = None) -> List[Dict]:
         """Fallback to line-based chunking when Tree-sitter fails."""
-        lines = content.split('\n')
-        chunks = []
-        current_chunk = []
-        current_tokens = 0
-        
-        for i, line in enumerate(lines, 1):
-            line_tokens = self.token_estimator.estimate_tokens(line)
-            
-            if current_tokens + line_tokens > self.max_tokens and current_chunk:
-                # Save current chunk
-                chunk_text = '\n'.join(current_chunk)
-                chunks.append({
-                    'type': 'block',
-                    'name': f'block_{len(chunks) + 1}',
-                    'start_line': i - len(current_chunk),
-                    'end_line': i - 1,
-                    'text': chunk_text,
-                    'capture_name': 'fallback',
-                    'parser_fallback': True
-                })
-                current_chunk = [line]
-                current_tokens = line_tokens
-            else:
-                current_chunk.append(line)
-                current_tokens += line_tokens
-        
-        # Add final chunk
-        if current_chunk:
-            chunk_text = '\n'.join(current_chunk)
-            chunks.append({
-                'type': 'block',
-                'name': f'block_{len(chunks) + 1}',
-                'start_line': len(lines) - len(current_chunk) + 1,
-                'end_line': len(lines),
-                'text': chunk_text,
-                'capture_name': 'fallback',
-                'parser_fallback': True
-            })
-        
-        return chunks
+        index = index or LineOffsetIndex.from_text(content)
+        return list(iter_line_chunks(index.iter_lines(content), self.token_estimator.estimate_tokens,
+                                     self.max_tokens))
     
     def _merge_small_chunks(self, chunks: List[Dict]) -> List[Dict]:
         """Merge chunks that are too small."""
-        if not chunks:
-            return chunks
-        
-        merged = []
-        i = 0
+        return list(self._iter_merged(chunks))
+    
+    def _iter_merged(self, chunks: Iterable[Dict]) -> Iterator[Dict]:
+        """Merge each too-small chunk into the one after it, looking one chunk ahead."""
+        chunks = iter(chunks)
+        current = next(chunks, None)
         
-        while i < len(chunks):
-            current = chunks[i]
+        while current is not None:
+            next_chunk = next(chunks, None)
             current_tokens = self.token_estimator.estimate_tokens(current['text'])
             
-            if current_tokens < self.min_tokens and i < len(chunks) - 1:
+            if current_tokens < self.min_tokens and next_chunk is not None:
                 # Try to merge with next chunk
-                next_chunk = chunks[i + 1]
                 next_tokens = self.token_estimator.estimate_tokens(next_chunk['text'])
                 
                 if current_tokens + next_tokens <= self.max_tokens:
                     # Merge chunks
                     merged_text = current['text'] + '\n' + next_chunk['text']
-                    merged.append({
+                    current_name = current.get('name', current['type'])
+                    next_name = next_chunk.get('name', next_chunk['type'])
+                    yield {
                         'type': 'merged',
-                        'name': f"{current['name']}_merged_{next_chunk['name']}",
+                        'name': f"{current_name}_merged_{next_name}",
                         'start_line': current['start_line'],
                         'end_line': next_chunk['end_line'],
                         'text': merged_text,
                         'capture_name': 'merged',
                         'parser_fallback': current.get('parser_fallback', False) or next_chunk.get('parser_fallback', False)
-                    })
-                    i += 2
+                    }
+                    current = next(chunks, None)
                     continue
             
-            merged.append(current)
-            i += 1
-        
-        return merged
+            yield current
+            current = next_chunk
     
-    def _add_overlap(self, chunks: List[Dict], content: str) -> List[Dict]:
+    def _add_overlap(self, chunks: List[Dict], content: str,
+                     index: Optional[LineOffsetIndex] = None) -> List[Dict]:
         """Add overlap between adjacent chunks."""
-        if len(chunks) <= 1:
-            return chunks
-        
-        lines = content.split('\n')
-        overlapped = []
-        
-        for i, chunk in enumerate(chunks):
-            start_line = chunk['start_line'] - 1  # Convert to 0-based
-            end_line = chunk['end_line']  # Already 1-based, convert to 0-based for slicing
-            
-            # Add overlap from previous chunk
-            if i > 0:
-                prev_chunk = chunks[i - 1]
-                prev_end = prev_chunk['end_line']  # 1-based
-                overlap_start = max(0, prev_end - self.overlap_tokens // 4)  # Rough line estimate
-                overlap_lines = lines[overlap_start:prev_end]
-                overlap_text = '\n'.join(overlap_lines)
-                chunk['text'] = overlap_text + '\n' + chunk['text']
-                chunk['start_line'] = overlap_start + 1
-            
-            # Add overlap to next chunk
-            if i < len(chunks) - 1:
-                next_chunk = chunks[i + 1]
-                next_start = next_chunk['start_line'] - 1  # Convert to 0-based
-                overlap_end = min(len(lines), next_start + self.overlap_tokens // 4)
-                overlap_lines = lines[next_start:overlap_end]
-                overlap_text = '\n'.join(overlap_lines)
-                chunk['text'] = chunk['text'] + '\n' + overlap_text
-                chunk['end_line'] = overlap_end
-            
-            overlapped.append(chunk)
-        
-        return overlapped
+        index = index or LineOffsetIndex.from_text(content)
+        return list(add_overlap(chunks, index, content, self.overlap_tokens // 4))  # Rough line estimate
     
     def chunk_file(self, filepath: str, content: str) -> List[Dict]:
         """Chunk a single file."""
         language = self._get_language(filepath)
+        # One line-offset index shared by fallback chunking and overlap
+        index = LineOffsetIndex.from_text(content)
         
         # Try Tree-sitter parsing first
         tree = self._parse_with_tree_sitter(content, language)
@@ -315,25 +276,54 @@ class TreeSitterChunker:
         
         # Fallback to line-based chunking if no nodes found
         if not nodes:
-            nodes = self._fallback_chunking(content, filepath)
+            nodes = self._fallback_chunking(content, filepath, index)
         
         # Merge small chunks
         nodes = self._merge_small_chunks(nodes)
         
         # Add overlap
-        nodes = self._add_overlap(nodes, content)
+        nodes = self._add_overlap(nodes, content, index)
         
         return nodes
     
-    def create_chunk_id(self, filepath: str, start_line: int, end_line: int, text: str) -> str:
-        """Create unique chunk ID."""
-        content = f"{filepath}:{start_line}:{end_line}:{text}"
+    def chunk_file_stream(self, filepath: str) -> Iterator[Dict]:
+        """Line-chunk a file too large to hold in memory, yielding chunks as they are read.
+        
+        Produces the same chunks as the fallback path of chunk_file. Overlap lines
+        are read back through the line-offset index from a second handle.
+        """
+        index = LineOffsetIndex()
+        with open(filepath, 'rb') as f, open(filepath, 'rb') as reader:
+            # Forward overlap is clamped to the end of the file, which the chunker has not reached yet
+            line_count = count_lines(reader)
+            chunks = iter_line_chunks(index.track(f), self.token_estimator.estimate_tokens, self.max_tokens)
+            yield from add_overlap(self._iter_merged(chunks), index, reader, self.overlap_tokens // 4, line_count)
+    
+    @staticmethod
+    def normalize_code(text: str) -> str:
+        """Normalize line endings, trailing whitespace and surrounding blank lines."""
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        return '\n'.join(line.rstrip() for line in lines).strip('\n')
+    
+    def extract_symbol_path(self, text: str, node_type: str) -> str:
+        """Position-independent symbol path: node type plus first defined name."""
+        match = SYMBOL_DEF_REGEX.search(text)
+        return f"{node_type}:{match.group(2)}" if match else node_type
+    
+    def create_chunk_id(self, filepath: str, text: str, symbol_path: str = "", occurrence: int = 0) -> str:
+        """Create a chunk ID that survives line shifts.
+        
+        Derived from the file path, symbol path and normalized content hash;
+        `occurrence` disambiguates identical chunks within one file. Line
+        numbers are deliberately excluded and kept as metadata instead.
+        """
+        normalized_path = filepath.replace('\\', '/')
+        content = f"{normalized_path}\0{symbol_path}\0{self.create_code_fingerprint(text)}\0{occurrence}"
         return f"sha1:{hashlib.sha1(content.encode()).hexdigest()}"
     
-    def create_code_fingerprint(self, filepath: str, start_line: int, end_line: int, text: str) -> str:
-        """Create code fingerprint for change detection."""
-        content = f"{filepath}:{start_line}:{end_line}:{text}"
-        return hashlib.sha1(content.encode()).hexdigest()
+    def create_code_fingerprint(self, text: str) -> str:
+        """Create code fingerprint (normalized content hash) for change detection."""
+        return hashlib.sha1(self.normalize_code(text).encode()).hexdigest()
     
     def generate_summary(self, text: str, node_type: str) -> str:
         """Generate a simple summary for the chunk."""
@@ -372,27 +362,60 @@ class TreeSitterChunker:
 class RepoChunker:
     """Main repository chunker."""
     
-    def __init__(self, root_path: str, output_dir: str, **kwargs):
+    IGNORE_PATTERNS = [
+        '__pycache__', '*.pyc', '.venv', 'env', '.env',
+        '.git', '.gitignore', '.gitattributes',
+        'node_modules', 'package-lock.json', 'yarn.lock',
+        '.idea', '.vscode', '*.sublime-*',
+        '.DS_Store', 'Thumbs.db',
+        '*.log', '*.tmp', '*.swp',
+        'Dockerfile', '*.dockerfile', '.dockerignore',
+        '*.env', '.env.example', 'venv', '*.egg-info'
+    ]
+    
+    # Records written per append while streaming a file's chunks
+    WRITE_BATCH = 256
+    
+    def __init__(self, root_path: str, output_dir: str,
+                 max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES, oversize: str = 'skip',
+                 dedup: bool = True, near_dedup: float = 0.0, **kwargs):
         self.root_path = Path(root_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_file_bytes = max_file_bytes
+        # 'skip' files over max_file_bytes, or 'stream' them through the line chunker
+        self.oversize = oversize
+        # During run(), identical files and chunk texts become aliases of the first copy
+        self.dedup = dedup
+        self.duplicates: Optional[DuplicateTracker] = None
+        # MinHash similarity threshold for clustering near-duplicate chunks after a run (0 = off)
+        self.near_dedup = near_dedup
         
         # Initialize chunker
         queries_dir = Path(__file__).parent / "queries"
         self.chunker = TreeSitterChunker(queries_dir, **kwargs)
         
+        # Line-range index over written chunks, persisted next to chunks.jsonl
+        self.interval_index = ChunkIntervalIndex()
+        
         # Statistics
         self.stats = {
             'scanned_folders': 0,
             'total_files': 0,
             'parsed_files': 0,
             'failed_files': 0,
+            'skipped_files': {reason: 0 for reason in SKIP_REASONS},
+            'duplicates': {'files': 0, 'chunks': 0, 'bytes': 0},
             'total_chunks': 0,
+            'total_tokens': 0,
             'chunks_by_language': {},
             'avg_chunk_tokens': 0,
             'timestamp': datetime.now().isoformat()
         }
         
+        # Per-stage timings and size counters, written into the manifest
+        self.profile = IndexingProfile()
+        
         # Setup logging
         self._setup_logging()
     
@@ -410,32 +433,73 @@ class RepoChunker:
     
     def process_file(self, file_params: ProcessFileParams):
         """Process a single file."""
-        filepath = file_params.file_path
+        with span('chunker.process_file', filepath=file_params.file_path) as s:
+            written = 0
+            batch = []
+            for record in self.iter_file_records(file_params.file_path):
+                batch.append(record)
+                if len(batch) >= self.WRITE_BATCH:
+                    self._append_records(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                self._append_records(batch)
+                written += len(batch)
+            s.set_attribute('chunks', written)
+    
+    def chunk_file_records(self, filepath: str) -> List[Dict]:
+        """Chunk one file into JSONL-ready records without writing them."""
+        return list(self.iter_file_records(filepath))
+    
+    def iter_file_records(self, filepath: str) -> Iterator[Dict]:
+        """Chunk one file into JSONL-ready records, streaming oversized files when allowed."""
         relative_path = Path(filepath).relative_to(self.root_path)
         
         self.stats['total_files'] += 1
+        language = self.chunker._get_language(filepath)
+        started = time.perf_counter()
         
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            # One open sniffs, size-checks and reads the file
+            with self.profile.timed('read', language):
+                source = read_source(filepath, self.max_file_bytes, oversize=self.oversize)
+            if source.skipped:
+                self.stats['skipped_files'][source.skipped] += 1
+                if source.skipped == 'binary':
+                    # Binary files are not sources: keep them out of total_files, as the traversal sniff did
+                    self.stats['total_files'] -= 1
+                logging.info(f"Skipping {source.skipped.replace('_', ' ')} file {filepath} ({source.size} bytes)")
+                return
+            last_modified = datetime.fromtimestamp(source.mtime).isoformat()
             
-            # Get file modification time
-            mtime = Path(filepath).stat().st_mtime
-            last_modified = datetime.fromtimestamp(mtime).isoformat()
+            # A byte-identical copy of an earlier file is only recorded as an alias
+            if self.duplicates is not None and not source.stream:
+                canonical = self.duplicates.canonical_file(str(relative_path), source.content, source.size)
+                if canonical:
+                    logging.info(f"Skipping {filepath}: identical to {canonical}")
+                    return
             
             # Chunk the file
-            chunks = self.chunker.chunk_file(filepath, content)
+            if source.stream:
+                logging.info(f"Streaming oversized file {filepath} ({source.size} bytes)")
+                chunks = self.profile.timed_iter('parse', language, self.chunker.chunk_file_stream(filepath))
+            else:
+                with self.profile.timed('parse', language):
+                    chunks = self.chunker.chunk_file(filepath, source.content)
+            
+            count = 0
+            for record in self._iter_records(relative_path, chunks, language, last_modified):
+                count += 1
+                yield record
+            self.profile.record_file(str(relative_path), language, source.size,
+                                     time.perf_counter() - started, count)
             
-            if chunks:
+            if count:
                 self.stats['parsed_files'] += 1
-                language = self.chunker._get_language(filepath)
                 
                 if language not in self.stats['chunks_by_language']:
                     self.stats['chunks_by_language'][language] = 0
-                self.stats['chunks_by_language'][language] += len(chunks)
-                
-                # Write chunks to output
-                self._write_chunks(relative_path, chunks, language, last_modified)
+                self.stats['chunks_by_language'][language] += count
             else:
                 self.stats['failed_files'] += 1
                 logging.warning(f"No chunks generated for {filepath}")
@@ -450,56 +514,115 @@ class RepoChunker:
     
     def _write_chunks(self, filepath: Path, chunks: List[Dict], language: str, last_modified: str):
         """Write chunks to JSONL file."""
+        self._append_records(self._build_records(filepath, chunks, language, last_modified))
+    
+    def _append_records(self, records: List[Dict]):
+        """Append chunk records to the JSONL output."""
         output_file = self.output_dir / "chunks.jsonl"
-        
-        with open(output_file, 'a', encoding='utf-8') as f:
-            for chunk in chunks:
-                chunk_id = self.chunker.create_chunk_id(
-                    str(filepath), chunk['start_line'], chunk['end_line'], chunk['text']
-                )
-                
+        language = records[0]['language'] if records else 'unknown'
+        with self.profile.timed('write', language):
+            with open(output_file, 'a', encoding='utf-8') as f:
+                for chunk_data in records:
+                    f.write(json.dumps(chunk_data) + '\n')
+    
+    def _build_records(self, filepath: Path, chunks: List[Dict], language: str, last_modified: str) -> List[Dict]:
+        """Build JSONL records for a file's chunks and index their line ranges."""
+        return list(self._iter_records(filepath, chunks, language, last_modified))
+    
+    def _iter_records(self, filepath: Path, chunks: Iterable[Dict], language: str,
+                      last_modified: str) -> Iterator[Dict]:
+        """Yield a JSONL record per chunk as it arrives, indexing its line range."""
+        occurrences: Dict[Tuple[str, str], int] = {}
+        for chunk in chunks:
+            text_hash = None
+            if self.duplicates is not None:
+                text_hash = content_hash(chunk['text'])
+                if self.duplicates.canonical_chunk(text_hash, str(filepath), chunk['start_line'], chunk['end_line']):
+                    continue
+            
+            symbol_path = self.chunker.extract_symbol_path(chunk['text'], chunk['type'])
+            code_fingerprint = self.chunker.create_code_fingerprint(chunk['text'])
+            occurrence = occurrences.get((symbol_path, code_fingerprint), 0)
+            occurrences[(symbol_path, code_fingerprint)] = occurrence + 1
+            chunk_id = self.chunker.create_chunk_id(str(filepath), chunk['text'], symbol_path, occurrence)
+            
+            with self.profile.timed('tokenize', language):
                 tokens_estimate = self.chunker.token_estimator.estimate_tokens(chunk['text'])
-                self.stats['total_chunks'] += 1
-                
-                chunk_data = {
-                    "id": chunk_id,
-                    "filepath": str(filepath),
-                    "language": language,
-                    "node_type": chunk['type'],
-                    "start_line": chunk['start_line'],
-                    "end_line": chunk['end_line'],
-                    "text": chunk['text'],
-                    "summary": self.chunker.generate_summary(chunk['text'], chunk['type']),
-                    "tokens_estimate": tokens_estimate,
-                    "parents": [],  # Could be enhanced to track parent relationships
-                    "imports": self.chunker.extract_imports(chunk['text'], language),
-                    "examples": [],  # Could be enhanced to extract usage examples
-                    "code_fingerprint": self.chunker.create_code_fingerprint(
-                        str(filepath), chunk['start_line'], chunk['end_line'], chunk['text']
-                    ),
-                    "last_modified": last_modified
-                }
-                
-                # Add parser fallback flag if applicable
-                if chunk.get('parser_fallback'):
-                    chunk_data['parser_fallback'] = True
-                
-                f.write(json.dumps(chunk_data) + '\n')
+            self.profile.record_chunk(language, tokens_estimate, bool(chunk.get('parser_fallback')))
+            self.stats['total_chunks'] += 1
+            self.stats['total_tokens'] += tokens_estimate
+            self.interval_index.add(str(filepath), chunk['start_line'], chunk['end_line'], chunk_id)
+            if text_hash:
+                self.duplicates.add_chunk(text_hash, chunk_id)
+            
+            chunk_data = {
+                "id": chunk_id,
+                "filepath": str(filepath),
+                "language": language,
+                "node_type": chunk['type'],
+                "symbol_path": symbol_path,
+                "start_line": chunk['start_line'],
+                "end_line": chunk['end_line'],
+                "text": chunk['text'],
+                "summary": self.chunker.generate_summary(chunk['text'], chunk['type']),
+                "tokens_estimate": tokens_estimate,
+                "parents": [],  # Could be enhanced to track parent relationships
+                "imports": self.chunker.extract_imports(chunk['text'], language),
+                "examples": [],  # Could be enhanced to extract usage examples
+                "code_fingerprint": code_fingerprint,
+                "last_modified": last_modified
+            }
+            
+            # Add parser fallback flag if applicable
+            if chunk.get('parser_fallback'):
+                chunk_data['parser_fallback'] = True
+            
+            yield chunk_data
+    
+    def attach_aliases(self):
+        """Record duplicate locations on their canonical chunks with one streaming rewrite of chunks.jsonl."""
+        if self.duplicates is None:
+            return
+        self.stats['duplicates'] = dict(self.duplicates.stats)
+        if not self.duplicates.has_aliases():
+            return
+        
+        chunks_file = self.output_dir / "chunks.jsonl"
+        tmp_file = chunks_file.with_suffix('.jsonl.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as out:
+            for record in iter_chunk_records(chunks_file, fields=('id', 'filepath', 'start_line', 'end_line')):
+                chunk = record.chunk
+                aliases = self.duplicates.aliases_for(chunk['id'], chunk['filepath'],
+                                                      chunk['start_line'], chunk['end_line'])
+                if not aliases:
+                    line = record.line.decode('utf-8')
+                    out.write(line if line.endswith('\n') else line + '\n')
+                    continue
+                chunk_data = loads(record.line)
+                chunk_data['aliases'] = aliases
+                out.write(json.dumps(chunk_data) + '\n')
+                # Line lookups at an alias location find the canonical chunk
+                for alias in aliases:
+                    self.interval_index.add(alias['filepath'], alias['start_line'], alias['end_line'], chunk['id'])
+        os.replace(tmp_file, chunks_file)
+        logging.info(f"Deduplicated {self.duplicates.stats['files']} identical files and "
+                     f"{self.duplicates.stats['chunks']} identical chunks")
     
     def write_manifest(self):
         """Write manifest file."""
-        # Calculate average chunk tokens
+        # Average of the per-chunk estimates recorded while building records
         if self.stats['total_chunks'] > 0:
-            total_tokens = sum(
-                self.stats['chunks_by_language'].get(lang, 0) * 1000  # Rough estimate
-                for lang in self.stats['chunks_by_language']
-            )
-            self.stats['avg_chunk_tokens'] = total_tokens // self.stats['total_chunks']
+            self.stats['avg_chunk_tokens'] = self.stats['total_tokens'] // self.stats['total_chunks']
+        self.stats['profile'] = self.profile.to_dict()
         
         manifest_file = self.output_dir / "manifest.json"
         with open(manifest_file, 'w', encoding='utf-8') as f:
             json.dump(self.stats, f, indent=2)
     
+    def write_interval_index(self):
+        """Write the per-file chunk line-range index."""
+        self.interval_index.save(self.output_dir / INDEX_FILENAME)
+    
     def run(self, dry_run: bool = False):
         """Run the chunking process."""
         logging.info(f"Starting chunking process for {self.root_path}")
@@ -513,28 +636,35 @@ class RepoChunker:
         if chunks_file.exists():
             chunks_file.unlink()
         
+        self.duplicates = DuplicateTracker() if self.dedup else None
+        
+        # Remember the indexed commit so `manage_index.py update` can diff from it
+        commit = git_head(self.root_path)
+        if commit:
+            self.stats['git_commit'] = commit
+        
         # Configure traversal
         params = TraverseFileSystemParams(
             input_path=str(self.root_path),
             process_file=self.process_file,
             process_folder=self.process_folder,
-            ignore=[
-                '__pycache__', '*.pyc', '.venv', 'env', '.env',
-                '.git', '.gitignore', '.gitattributes',
-                'node_modules', 'package-lock.json', 'yarn.lock',
-                '.idea', '.vscode', '*.sublime-*',
-                '.DS_Store', 'Thumbs.db',
-                '*.log', '*.tmp', '*.swp',
-                'Dockerfile', '*.dockerfile', '.dockerignore',
-                '*.env', '.env.example', 'venv', '*.egg-info'
-            ]
+            ignore=self.IGNORE_PATTERNS,
+            sniff=False  # read_source sniffs on the same open that reads the file
         )
         
         # Run traversal
-        traverse_file_system(params)
-        
-        # Write manifest
+        with span('traverse_file_system', root=str(self.root_path)) as s:
+            traverse_file_system(params)
+            s.set_attribute('files', self.stats['total_files'])
+            s.set_attribute('chunks', self.stats['total_chunks'])
+        
+        # Fold duplicates into their canonical chunks, then write manifest and line-range index
+        self.attach_aliases()
+        if self.near_dedup:
+            from chunker.near_dedup import cluster_chunks_file
+            self.stats['near_duplicates'] = cluster_chunks_file(chunks_file, threshold=self.near_dedup)['stats']
         self.write_manifest()
+        self.write_interval_index()
         
         # Write parse errors
         if self.chunker.parse_errors:
@@ -557,6 +687,14 @@ def main():
     parser.add_argument("--max-tokens", type=int, default=25000, help="Maximum tokens per chunk")
     parser.add_argument("--min-tokens", type=int, default=50, help="Minimum tokens per chunk")
     parser.add_argument("--overlap", type=int, default=1000, help="Overlap tokens between chunks")
+    parser.add_argument("--max-file-mb", type=float, default=DEFAULT_MAX_FILE_BYTES / (1024 * 1024),
+                        help="Skip files larger than this (0 = no limit)")
+    parser.add_argument("--oversize", choices=OVERSIZE_POLICIES, default='skip',
+                        help="Skip files over --max-file-mb, or stream them through the line chunker")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Chunk identical files and chunk texts separately instead of as aliases")
+    parser.add_argument("--near-dedup", type=float, default=0.0, metavar="THRESHOLD",
+                        help="Cluster chunks at least this similar (MinHash Jaccard) into near_duplicates.json (0 = off)")
     parser.add_argument("--dry-run", action="store_true", help="Dry run mode")
     
     args = parser.parse_args()
@@ -573,6 +711,10 @@ def main():
     chunker = RepoChunker(
         root_path=root,
         output_dir=args.out,
+        max_file_bytes=int(args.max_file_mb * 1024 * 1024) or None,
+        oversize=args.oversize,
+        dedup=not args.no_dedup,
+        near_dedup=args.near_dedup,
         max_tokens=args.max_tokens,
         min_tokens=args.min_tokens,
         overlap_tokens=args.overlap
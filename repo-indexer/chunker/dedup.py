@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Exact duplicate detection at chunk time.
+Byte-identical files and identical chunk texts are recognised by content hash;
+later copies become alias locations on the first (canonical) chunk instead of new chunks.
+"""
+
+import hashlib
+from typing import Dict, List, Optional
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class DuplicateTracker:
+    """Canonical copies seen so far in a run and the alias locations found for them."""
+
+    def __init__(self):
+        self._files: Dict[str, str] = {}  # file content hash -> canonical filepath
+        self._texts: Dict[str, str] = {}  # chunk text hash -> canonical chunk id
+        self.file_aliases: Dict[str, List[str]] = {}
+        self.chunk_aliases: Dict[str, List[Dict]] = {}
+        self.stats = {'files': 0, 'chunks': 0, 'bytes': 0}
+
+    def canonical_file(self, filepath: str, content: str, size: int) -> Optional[str]:
+        """Path of an earlier file with identical content, recording `filepath` as its alias."""
+        canonical = self._files.setdefault(content_hash(content), filepath)
+        if canonical == filepath:
+            return None
+        self.file_aliases.setdefault(canonical, []).append(filepath)
+        self.stats['files'] += 1
+        self.stats['bytes'] += size
+        return canonical
+
+    def canonical_chunk(self, text_hash: str, filepath: str, start_line: int, end_line: int) -> Optional[str]:
+        """Id of an earlier chunk with the same text, recording this location as its alias."""
+        canonical = self._texts.get(text_hash)
+        if canonical is None:
+            return None
+        self.chunk_aliases.setdefault(canonical, []).append(
+            {'filepath': filepath, 'start_line': start_line, 'end_line': end_line})
+        self.stats['chunks'] += 1
+        return canonical
+
+    def add_chunk(self, text_hash: str, chunk_id: str):
+        self._texts.setdefault(text_hash, chunk_id)
+
+    def has_aliases(self) -> bool:
+        return bool(self.file_aliases or self.chunk_aliases)
+
+    def aliases_for(self, chunk_id: str, filepath: str, start_line: int, end_line: int) -> List[Dict]:
+        """Every other location holding this chunk's text: same lines in identical files, then matching chunks."""
+        aliases = [{'filepath': path, 'start_line': start_line, 'end_line': end_line}
+                   for path in self.file_aliases.get(filepath, ())]
+        for alias in self.chunk_aliases.get(chunk_id, ()):
+            aliases.append(alias)
+            # Files identical to the one holding the matching chunk have it at the same lines
+            aliases.extend(dict(alias, filepath=path) for path in self.file_aliases.get(alias['filepath'], ()))
+        return aliases
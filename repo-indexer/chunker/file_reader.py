@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Single-open source file reading for the chunker.
+Sniffs text vs. binary, enforces a size cap and spots minified/generated files
+from the same handle that reads the content, memory-mapping large files.
+"""
+
+import mmap
+import os
+import sys
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent / "src" / "inputandfilehandling"))
+from filetraversal import SNIFF_BYTES, TEXT_EXTENSIONS, looks_like_text
+
+# Files above this are skipped, or streamed with --oversize stream (override with --max-file-mb)
+DEFAULT_MAX_FILE_BYTES = 20 * 1024 * 1024
+
+# Files at least this big are decoded straight from a memory map
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+# A line longer than this in the sampled head marks minified or generated output
+MAX_LINE_BYTES = 20000
+
+# How much of the file the minified check looks at
+LINE_SAMPLE_BYTES = 64 * 1024
+
+SKIP_REASONS = ('binary', 'too_large', 'minified')
+
+OVERSIZE_POLICIES = ('skip', 'stream')
+
+
+class SourceFile(NamedTuple):
+    """Result of reading one file: its text, why it was skipped, or that it must be streamed."""
+    content: Optional[str]
+    size: int
+    mtime: float
+    skipped: Optional[str] = None
+    stream: bool = False
+
+
+def is_minified(head: bytes, max_line_bytes: int = MAX_LINE_BYTES) -> bool:
+    """True when the sampled head already holds a line longer than `max_line_bytes`."""
+    return any(len(line) > max_line_bytes for line in head.split(b'\n'))
+
+
+def read_source(path: str, max_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES,
+                mmap_threshold: int = MMAP_THRESHOLD_BYTES, oversize: str = 'skip') -> SourceFile:
+    """Open `path` once, sniff it and return its decoded text unless it should be skipped.
+
+    Known text extensions skip the content sniff, like is_text_file. Content is
+    decoded as UTF-8 ignoring bad bytes; files of `mmap_threshold` bytes or more
+    are decoded from a read-only memory map instead of an intermediate buffer.
+    Files above `max_bytes` are skipped, or with oversize='stream' only their
+    head is checked and they come back with stream=True and no content.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        if max_bytes is not None and size > max_bytes:
+            if oversize == 'stream':
+                skipped = _check_head(path, f.read(LINE_SAMPLE_BYTES))
+                return SourceFile(None, size, stat.st_mtime, skipped, stream=skipped is None)
+            return SourceFile(None, size, stat.st_mtime, 'too_large')
+        if size == 0:
+            return SourceFile('', 0, stat.st_mtime)
+
+        if size >= mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                skipped = _check_head(path, mapped[:LINE_SAMPLE_BYTES])
+                content = None if skipped else str(mapped, 'utf-8', 'ignore')
+        else:
+            # Only the head is read before deciding, so rejected files are never read whole
+            head = f.read(LINE_SAMPLE_BYTES)
+            skipped = _check_head(path, head)
+            content = None if skipped else (head + f.read()).decode('utf-8', errors='ignore')
+    return SourceFile(content, size, stat.st_mtime, skipped)
+
+
+def _check_head(path: str, head: bytes) -> Optional[str]:
+    if Path(path).suffix.lower() not in TEXT_EXTENSIONS and not looks_like_text(head[:SNIFF_BYTES]):
+        return 'binary'
+    if is_minified(head):
+        return 'minified'
+    return None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Plain-git helpers for incremental indexing.
+Resolves the current commit and classifies files changed since a commit
+(added, modified, deleted, renamed) relative to the indexed root.
+"""
+
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+
+class GitError(RuntimeError):
+    """Raised when a git command fails."""
+
+
+def _git(root: Path, *args: str) -> str:
+    try:
+        proc = subprocess.run(
+            ['git', '-C', str(root), *args],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False
+        )
+    except FileNotFoundError as e:
+        raise GitError("git executable not found") from e
+    if proc.returncode != 0:
+        raise GitError(f"git {' '.join(args)} failed: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def git_head(root: Path) -> Optional[str]:
+    """Current HEAD commit of the repository containing root, if any."""
+    try:
+        return _git(Path(root), 'rev-parse', 'HEAD').strip() or None
+    except GitError:
+        return None
+
+
+@dataclass
+class FileChanges:
+    """Files changed since a commit, as paths relative to the indexed root."""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    def stale_paths(self) -> Set[str]:
+        """Paths whose existing chunks must be dropped."""
+        return set(self.modified) | set(self.deleted) | set(self.added) | {old for old, _ in self.renamed}
+
+    def paths_to_chunk(self) -> Set[str]:
+        """Paths that must be (re-)chunked."""
+        return set(self.added) | set(self.modified) | {new for _, new in self.renamed}
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.modified) + len(self.deleted) + len(self.renamed)
+
+
+def changed_files(root: Path, since: str, include_untracked: bool = True) -> FileChanges:
+    """Classify changes between `since` and the working tree under root.
+
+    Uses `git diff --name-status -z --relative` so paths are relative to root
+    even when root is a subdirectory of the repository.
+    """
+    root = Path(root)
+    changes = FileChanges()
+    fields = _git(root, 'diff', '--name-status', '-z', '-M', '--relative', since).split('\0')
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        kind = status[0]
+        if kind in ('R', 'C'):
+            old, new = fields[i + 1], fields[i + 2]
+            if kind == 'R':
+                changes.renamed.append((old, new))
+            else:
+                changes.added.append(new)
+            i += 3
+            continue
+        path = fields[i + 1]
+        if kind == 'A':
+            changes.added.append(path)
+        elif kind == 'D':
+            changes.deleted.append(path)
+        else:  # M, T (type change), U (unmerged)
+            changes.modified.append(path)
+        i += 2
+
+    if include_untracked:
+        untracked = _git(root, 'ls-files', '--others', '--exclude-standard', '-z').split('\0')
+        changes.added.extend(p for p in untracked if p)
+    return changes
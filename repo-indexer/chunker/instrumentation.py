@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Per-stage timings and counters for a chunking run.
+Accumulates read/parse/tokenize/write time, bytes and chunk sizes per language,
+and keeps the slowest files; serialized into manifest.json under "profile".
+"""
+
+import heapq
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+STAGES = ('read', 'parse', 'tokenize', 'write')
+
+# Upper bounds (exclusive) of the chunk token histogram buckets
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def bucket_label(tokens: int) -> str:
+    lower = 0
+    for upper in TOKEN_BUCKETS:
+        if tokens < upper:
+            return f"{lower}-{upper - 1}"
+        lower = upper
+    return f"{lower}+"
+
+
+def _empty_language() -> Dict[str, Any]:
+    counters = {'files': 0, 'bytes': 0, 'chunks': 0, 'tokens': 0, 'fallback_chunks': 0}
+    counters.update({f"{stage}_s": 0.0 for stage in STAGES})
+    return counters
+
+
+class IndexingProfile:
+    """Where indexing time goes, per language and per stage."""
+
+    def __init__(self, slowest: int = 10):
+        self.languages: Dict[str, Dict[str, Any]] = {}
+        self.histogram: Dict[str, int] = {}
+        self.max_chunk_tokens = 0
+        self._slowest_limit = slowest
+        self._slowest: List[Tuple[float, str, str, int, int]] = []
+
+    def _language(self, language: str) -> Dict[str, Any]:
+        counters = self.languages.get(language)
+        if counters is None:
+            counters = self.languages[language] = _empty_language()
+        return counters
+
+    @contextmanager
+    def timed(self, stage: str, language: str):
+        """Add the wall time of the block to `stage` for `language`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._language(language)[f"{stage}_s"] += time.perf_counter() - start
+
+    def timed_iter(self, stage: str, language: str, iterable: Iterable) -> Iterator:
+        """Yield from `iterable`, adding the time spent producing each item to `stage`."""
+        iterator = iter(iterable)
+        counters = self._language(language)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                counters[f"{stage}_s"] += time.perf_counter() - start
+            yield item
+
+    def record_file(self, filepath: str, language: str, size: int, seconds: float, chunks: int):
+        """Count one processed file and keep it if it is among the slowest."""
+        counters = self._language(language)
+        counters['files'] += 1
+        counters['bytes'] += size
+        entry = (seconds, filepath, language, size, chunks)
+        if len(self._slowest) < self._slowest_limit:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def record_chunk(self, language: str, tokens: int, fallback: bool = False):
+        counters = self._language(language)
+        counters['chunks'] += 1
+        counters['tokens'] += tokens
+        if fallback:
+            counters['fallback_chunks'] += 1
+        label = bucket_label(tokens)
+        self.histogram[label] = self.histogram.get(label, 0) + 1
+        self.max_chunk_tokens = max(self.max_chunk_tokens, tokens)
+
+    def totals(self) -> Dict[str, Any]:
+        totals = _empty_language()
+        for counters in self.languages.values():
+            for key, value in counters.items():
+                totals[key] += value
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        totals = self.totals()
+        ordered_labels = [bucket_label(upper - 1) for upper in TOKEN_BUCKETS] + [bucket_label(TOKEN_BUCKETS[-1])]
+        return {
+            'bytes_read': totals['bytes'],
+            'total_tokens': totals['tokens'],
+            'fallback_rate': round(totals['fallback_chunks'] / totals['chunks'], 4) if totals['chunks'] else 0.0,
+            'stage_seconds': {stage: round(totals[f"{stage}_s"], 4) for stage in STAGES},
+            'chunk_tokens_histogram': {label: self.histogram[label] for label in ordered_labels
+                                       if label in self.histogram},
+            'max_chunk_tokens': self.max_chunk_tokens,
+            'by_language': {
+                language: {key: round(value, 4) if isinstance(value, float) else value
+                           for key, value in counters.items()}
+                for language, counters in sorted(self.languages.items())
+            },
+            'slowest_files': [
+                {'filepath': filepath, 'language': language, 'bytes': size, 'chunks': chunks,
+                 'seconds': round(seconds, 4)}
+                for seconds, filepath, language, size, chunks in sorted(self._slowest, reverse=True)
+            ],
+        }
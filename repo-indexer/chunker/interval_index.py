@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Per-file interval index over chunk line ranges.
+Answers "which chunks cover file F lines a..b" with binary searches over
+sorted start/end arrays and persists next to chunks.jsonl as JSON.
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+INDEX_FILENAME = "chunk_index.json"
+
+
+def _normalize(filepath: str) -> str:
+    return str(filepath).replace('\\', '/')
+
+
+class _FileIntervals:
+    """Chunks of one file sorted by start line, with a running max of end lines."""
+
+    __slots__ = ('starts', 'ends', 'ids', 'max_ends')
+
+    def __init__(self, entries: List[Tuple[int, int, str]]):
+        entries.sort()
+        self.starts = [e[0] for e in entries]
+        self.ends = [e[1] for e in entries]
+        self.ids = [e[2] for e in entries]
+        self.max_ends: List[int] = []
+        running = 0
+        for end in self.ends:
+            running = max(running, end)
+            self.max_ends.append(running)
+
+    def query(self, start_line: int, end_line: int) -> List[str]:
+        # Candidates start at or before end_line; the first one that can reach
+        # start_line is where the running max end first gets there. Both bounds
+        # are binary searches, so only overlapping chunks (plus chunks nested
+        # inside a longer one) are scanned.
+        hi = bisect_right(self.starts, end_line)
+        lo = bisect_left(self.max_ends, start_line, 0, hi)
+        return [self.ids[i] for i in range(lo, hi) if self.ends[i] >= start_line]
+
+
+class ChunkIntervalIndex:
+    """Maps file paths to chunk ids by line range."""
+
+    def __init__(self):
+        self._pending: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._files: Dict[str, _FileIntervals] = {}
+
+    def add(self, filepath: str, start_line: int, end_line: int, chunk_id: str):
+        key = _normalize(filepath)
+        self._pending.setdefault(key, []).append((int(start_line), int(end_line), chunk_id))
+        if key in self._files:
+            # Fold already-built entries back in; rebuilt lazily on next query.
+            built = self._files.pop(key)
+            self._pending[key].extend(zip(built.starts, built.ends, built.ids))
+
+    def remove_file(self, filepath: str):
+        key = _normalize(filepath)
+        self._pending.pop(key, None)
+        self._files.pop(key, None)
+
+    def _file(self, filepath: str) -> Optional[_FileIntervals]:
+        key = _normalize(filepath)
+        if key in self._pending:
+            self._files[key] = _FileIntervals(self._pending.pop(key))
+        return self._files.get(key)
+
+    def query(self, filepath: str, start_line: int, end_line: int) -> List[str]:
+        """Ids of chunks in `filepath` overlapping lines [start_line, end_line]."""
+        intervals = self._file(filepath)
+        if intervals is None:
+            return []
+        return intervals.query(start_line, end_line)
+
+    def chunks_for_file(self, filepath: str) -> List[str]:
+        intervals = self._file(filepath)
+        return list(intervals.ids) if intervals else []
+
+    def files(self) -> List[str]:
+        return sorted(set(self._files) | set(self._pending))
+
+    def __contains__(self, filepath: str) -> bool:
+        key = _normalize(filepath)
+        return key in self._files or key in self._pending
+
+    def __len__(self) -> int:
+        return sum(len(self.chunks_for_file(f)) for f in self.files())
+
+    def to_dict(self) -> Dict[str, Dict[str, List]]:
+        data = {}
+        for filepath in self.files():
+            intervals = self._file(filepath)
+            data[filepath] = {'starts': intervals.starts, 'ends': intervals.ends, 'ids': intervals.ids}
+        return data
+
+    def save(self, path: Union[str, Path]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'ChunkIntervalIndex':
+        index = cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for filepath, arrays in data.items():
+            index._pending[filepath] = list(zip(arrays['starts'], arrays['ends'], arrays['ids']))
+        return index
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Streaming line-based chunking for files Tree-sitter cannot (or should not) parse.
+Chunks are generated one at a time from a line iterator, and a single line-offset
+index serves both chunking and overlap, so content is never split into a list.
+"""
+
+from array import array
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Union
+
+
+class LineOffsetIndex:
+    """Start offset of every line, so any line range can be sliced back out without re-splitting.
+
+    Offsets are character offsets for an in-memory string and byte offsets for a
+    file read through track(). Line numbering follows str.split('\\n'): a trailing
+    newline (or an empty source) ends with one empty line.
+    """
+
+    def __init__(self):
+        self.starts = array('Q')
+
+    @classmethod
+    def from_text(cls, text: str) -> 'LineOffsetIndex':
+        index = cls()
+        starts = [0]
+        find = text.find
+        position = find('\n')
+        while position != -1:
+            starts.append(position + 1)
+            position = find('\n', position + 1)
+        index.starts = array('Q', starts)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def iter_lines(self, text: str) -> Iterator[str]:
+        """Lines of the indexed string, sliced one at a time."""
+        starts = self.starts
+        for i in range(len(starts) - 1):
+            yield text[starts[i]:starts[i + 1] - 1]
+        if starts:
+            yield text[starts[-1]:]
+
+    def track(self, f: BinaryIO) -> Iterator[str]:
+        """Yield decoded lines of a binary file while recording where each one starts."""
+        position = f.tell()
+        last = b'\n'
+        for raw in f:
+            self.starts.append(position)
+            position += len(raw)
+            last = raw
+            yield (raw[:-1] if raw.endswith(b'\n') else raw).decode('utf-8', errors='ignore')
+        if last.endswith(b'\n'):
+            self.starts.append(position)
+            yield ''
+
+    def text(self, source: Union[str, BinaryIO], start_line: int, end_line: int) -> str:
+        """Lines `start_line`..`end_line` (1-based, inclusive) joined by newlines.
+
+        Only `start_line` has to be indexed already: lines after it are read on
+        from the file, so a file source must not be asked for lines past its end.
+        """
+        if isinstance(source, str):
+            end_line = min(end_line, len(self.starts))
+        if start_line > end_line:
+            return ''
+        start = self.starts[start_line - 1]
+        if isinstance(source, str):
+            end = self.starts[end_line] - 1 if end_line < len(self.starts) else len(source)
+            return source[start:end]
+        source.seek(start)
+        lines = [source.readline().removesuffix(b'\n') for _ in range(end_line - start_line + 1)]
+        return b'\n'.join(lines).decode('utf-8', errors='ignore')
+
+
+def count_lines(f: BinaryIO) -> int:
+    """Lines in a binary file as str.split('\\n') counts them, read in fixed-size blocks."""
+    position = f.tell()
+    count = 1
+    for block in iter(lambda: f.read(1 << 20), b''):
+        count += block.count(b'\n')
+    f.seek(position)
+    return count
+
+
+def _block(number: int, lines, start_line: int, end_line: int) -> Dict:
+    return {
+        'type': 'block',
+        'name': f'block_{number}',
+        'start_line': start_line,
+        'end_line': end_line,
+        'text': '\n'.join(lines),
+        'capture_name': 'fallback',
+        'parser_fallback': True
+    }
+
+
+def iter_line_chunks(lines: Iterable[str], estimate_tokens: Callable[[str], int],
+                     max_tokens: int) -> Iterator[Dict]:
+    """Group consecutive lines into blocks of at most `max_tokens` (a longer single line stands alone).
+
+    Only the lines of the block being built are held in memory.
+    """
+    current = []
+    current_tokens = 0
+    count = 0
+    line_num = 0
+    for line_num, line in enumerate(lines, 1):
+        line_tokens = estimate_tokens(line)
+        if current_tokens + line_tokens > max_tokens and current:
+            count += 1
+            yield _block(count, current, line_num - len(current), line_num - 1)
+            current = [line]
+            current_tokens = line_tokens
+        else:
+            current.append(line)
+            current_tokens += line_tokens
+    if current:
+        count += 1
+        yield _block(count, current, line_num - len(current) + 1, line_num)
+
+
+def add_overlap(chunks: Iterable[Dict], index: LineOffsetIndex, source: Union[str, BinaryIO],
+                overlap_lines: int, line_count: Optional[int] = None) -> Iterator[Dict]:
+    """Extend each chunk with the first `overlap_lines` of the next chunk and the lines before its own end.
+
+    The result matches extending a list of chunks in place front to back: a
+    chunk's prefix is the `overlap_lines` lines ending where the previous chunk
+    now ends (after its own extension into this chunk). Both are clamped to
+    `line_count`, which defaults to the indexed lines and must be the whole
+    file's count when `source` is still being indexed. Works on a stream with
+    one chunk of lookahead; overlap text is read back through `index` from
+    `source` (the indexed string or an open binary file).
+    """
+    total = len(index) if line_count is None else line_count
+    chunks = iter(chunks)
+    current = next(chunks, None)
+    prev_end: Optional[int] = None
+    while current is not None:
+        following = next(chunks, None)
+        if prev_end is not None:
+            overlap_start = max(0, prev_end - overlap_lines)
+            current['text'] = index.text(source, overlap_start + 1, prev_end) + '\n' + current['text']
+            current['start_line'] = overlap_start + 1
+        prev_end = None
+        if following is not None:
+            next_start = following['start_line'] - 1
+            overlap_end = min(total, next_start + overlap_lines)
+            current['text'] = current['text'] + '\n' + index.text(source, next_start + 1, overlap_end)
+            current['end_line'] = overlap_end
+            prev_end = overlap_end
+        yield current
+        current = following
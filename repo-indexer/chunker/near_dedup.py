@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chunk clustering with MinHash and LSH banding.
+Chunks whose token-shingle sets are estimated to be at least `threshold` similar
+are grouped; the embedder can then embed one representative per cluster.
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+sys.path.append(str(Path(__file__).parent.parent))
+from chunker.chunk_reader import iter_chunks
+
+NEAR_DUPLICATES_FILENAME = "near_duplicates.json"
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+SHINGLE_SIZE = 5
+
+# Chunks with fewer shingles than this are too small to cluster meaningfully
+MIN_SHINGLES = 8
+
+# Permutations are (a * x + b) mod a prime just below 2**32, with x a 32-bit shingle hash
+_PRIME = (1 << 32) - 5
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashes of every run of `size` consecutive word tokens."""
+    tokens = TOKEN_RE.findall(text)
+    if len(tokens) < size:
+        return {zlib.crc32(' '.join(tokens).encode('utf-8'))} if tokens else set()
+    return {zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8')) for i in range(len(tokens) - size + 1)}
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with the most rows whose candidate threshold (1/b)^(1/r) is still below `threshold`."""
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows / num_perm) ** (1 / rows) <= threshold:
+            best = (num_perm // rows, rows)
+    return best
+
+
+class MinHasher:
+    """Seeded MinHash signatures over shingle hash sets."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 0):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: Set[int]):
+        import numpy as np
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        return ((np.outer(values, self.a) + self.b) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+class _DisjointSet:
+    """Union-find whose roots are the smallest index, i.e. the earliest chunk in the file."""
+
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def cluster_chunks(chunks: Iterable[Dict], threshold: float = DEFAULT_THRESHOLD,
+                   num_perm: int = DEFAULT_NUM_PERM, seed: int = 0) -> Dict:
+    """Group near-duplicate chunks; each cluster's representative is its first chunk.
+
+    Each band of a chunk's signature is looked up in a bucket table; a hit is
+    confirmed only if the estimated Jaccard similarity with the representative
+    of the bucket's cluster reaches `threshold`, and a chunk joins at most one
+    cluster. Similarity is not transitive, so checking against the bucket's
+    chunk alone would chain A~B~C into one cluster even when A and C differ,
+    and C would then be stored with A's vector. Chunks only need `id` and
+    `text`, plus `tokens_estimate` for the report.
+    """
+    import numpy as np
+    started = time.perf_counter()
+    hasher = MinHasher(num_perm, seed)
+    bands, rows = lsh_params(num_perm, threshold)
+    buckets: List[Dict[bytes, int]] = [{} for _ in range(bands)]
+    clusters = _DisjointSet()
+    ids: List[str] = []
+    tokens: List[int] = []
+    signatures: List = []
+    total = 0
+
+    for chunk in chunks:
+        total += 1
+        hashes = shingles(chunk['text'])
+        if len(hashes) < MIN_SHINGLES:
+            continue
+        signature = hasher.signature(hashes)
+        index = clusters.add()
+        ids.append(chunk['id'])
+        tokens.append(chunk.get('tokens_estimate', 0))
+        signatures.append(signature)
+        for band, table in enumerate(buckets):
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            first = table.setdefault(key, index)
+            if first == index or clusters.find(index) != index:
+                continue
+            representative = clusters.find(first)
+            if np.count_nonzero(signatures[representative] == signature) / num_perm >= threshold:
+                clusters.union(representative, index)
+
+    members: Dict[int, List[int]] = {}
+    for index in range(len(ids)):
+        members.setdefault(clusters.find(index), []).append(index)
+    groups = [group for group in members.values() if len(group) > 1]
+
+    duplicates = sum(len(group) - 1 for group in groups)
+    return {
+        'params': {'threshold': threshold, 'num_perm': num_perm, 'bands': bands, 'rows': rows,
+                   'shingle_size': SHINGLE_SIZE, 'seed': seed},
+        'stats': {
+            'chunks': total,
+            'chunks_hashed': len(ids),
+            'clusters': len(groups),
+            'clustered_chunks': sum(len(group) for group in groups),
+            'embeddings_avoided': duplicates,
+            'tokens_avoided': sum(tokens[i] for group in groups for i in group[1:]),
+            'elapsed_s': round(time.perf_counter() - started, 3),
+        },
+        'clusters': [{'representative': ids[group[0]], 'members': [ids[i] for i in group[1:]]}
+                     for group in groups],
+    }
+
+
+def cluster_chunks_file(chunks_file: Union[str, Path], output_path: Optional[Union[str, Path]] = None,
+                        threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                        seed: int = 0) -> Dict:
+    """Cluster a chunks.jsonl and write the report next to it (or to `output_path`)."""
+    chunks_file = Path(chunks_file)
+    output_path = Path(output_path or chunks_file.parent / NEAR_DUPLICATES_FILENAME)
+    report = cluster_chunks(iter_chunks(chunks_file, fields=('id', 'text', 'tokens_estimate')),
+                            threshold, num_perm, seed)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    stats = report['stats']
+    logging.info(f"Near-duplicates: {stats['clusters']} clusters covering {stats['clustered_chunks']} chunks; "
+                 f"{stats['embeddings_avoided']} embeddings avoidable ({stats['elapsed_s']}s)")
+    return report
+
+
+def load_representatives(path: Union[str, Path]) -> Dict[str, str]:
+    """Map every non-representative cluster member to its representative's id."""
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    return {member: cluster['representative']
+            for cluster in report['clusters'] for member in cluster['members']}
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate chunks with MinHash/LSH")
+    parser.add_argument("--chunks", default="repo-indexer/outputs/chunks.jsonl", help="Path to chunks JSONL file")
+    parser.add_argument("--out", help=f"Report path (default: {NEAR_DUPLICATES_FILENAME} next to --chunks)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity for two chunks to share a cluster")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM, help="MinHash signature length")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the MinHash permutations")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    report = cluster_chunks_file(args.chunks, args.out, args.threshold, args.num_perm, args.seed)
+    print(json.dumps(report['stats'], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
-Embeds code chunks from JSONL into a persistent ChromaDB collection.
-Leverages SentenceTransformers for embeddings with normalization and batching.
+Embeds code chunks from JSONL into a persistent ChromaDB or local vector store.
+Encodes with a pluggable backend (SentenceTransformers, ONNX or hashing).
 CLI supports batch size, force re-embed, dry-run and environment overrides.
 """
 
@@ -9,37 +9,98 @@ import argparse
 import json
 import logging
 import os
+import sqlite3
 import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-except ImportError:
-    chromadb = None
+sys.path.append(str(Path(__file__).parent.parent))
+from chunker.chunk_reader import iter_chunk_records, sample_chunks
+from chunker.near_dedup import load_representatives
+from tracing import span
 
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    SentenceTransformer = None
+sys.path.append(str(Path(__file__).parent))
+
+from encode_pool import POOL_ERRORS, EncodePool
+from encoders import BACKENDS, load_encoder, resolve_backend
+from projection import METHODS as PROJECTION_METHODS, PROJECTION_FILENAME, Projection, encoder_name, load_projection
+from vector_store import COLLECTION_NAME, STORES, open_chunk_collection, resolve_store
+
+
+CHECKPOINT_FILENAME = "embed_checkpoint.json"
+
+# Write errors that no subset of a batch would avoid (wrong vector size, closed or read-only store)
+SYSTEMIC_ERROR_MARKERS = ('dimension', 'closed', 'readonly', 'read-only', 'disk i/o', 'database is locked')
+
+
+def is_systemic_error(error: Exception) -> bool:
+    """True when a failed write would fail for any subset of the batch, so bisecting cannot help."""
+    message = str(error).lower()
+    return (isinstance(error, (OSError, sqlite3.Error, MemoryError))
+            or any(marker in message for marker in SYSTEMIC_ERROR_MARKERS))
+
+
+def load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    """Read an embedding checkpoint, or None if missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_checkpoint(path: Path, checkpoint: Dict[str, Any]):
+    """Write the checkpoint atomically so a crash never leaves a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
 
 
 class ChromaEmbedder:
     """ChromaDB-based embedding storage and retrieval."""
     
     def __init__(self, chroma_path: str = "./repo-indexer/chroma_store", 
-                 model_name: str = "all-mpnet-base-v2", batch_size: int = 64):
+                 model_name: str = "all-mpnet-base-v2", batch_size: int = 64,
+                 workers: int = 1, threads_per_worker: int = 0,
+                 backend: Optional[str] = None, onnx_path: Optional[str] = None,
+                 load_model: bool = True, reduce_dim: int = 0, reduce_method: str = "pca",
+                 fit_sample: int = 5000, store: Optional[str] = None,
+                 near_duplicates: Optional[str] = None):
         self.chroma_path = chroma_path
+        self.store = resolve_store(chroma_path, store)
         self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.onnx_path = onnx_path
         self.batch_size = batch_size
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
         self.client = None
         self.collection = None
-        self.model = None
+        self.encoder = None
+        self.pool = None
+        self.reduce_dim = reduce_dim
+        self.reduce_method = reduce_method
+        self.fit_sample = fit_sample
+        self.projection = None
         self.errors = []
+        # Near-duplicate cluster members reuse their representative's vector instead of being encoded
+        self.representatives = load_representatives(near_duplicates) if near_duplicates else {}
+        self._representative_ids = set(self.representatives.values())
+        self._representative_vectors: Dict[str, List[float]] = {}
+        # Wall time per write-path stage; with a pool, encode_s is time spent waiting on workers
+        self.timings = {'metadata_s': 0.0, 'encode_s': 0.0, 'insert_s': 0.0,
+                        'batches_encoded': 0, 'chunks_encoded': 0, 'chunks_reused': 0}
         
         self._setup_logging()
-        self._setup_model()
+        self._setup_projection()
+        if load_model:
+            self._setup_model()
         self._setup_chroma()
     
     def _setup_logging(self):
@@ -57,192 +118,511 @@ class ChromaEmbedder:
         )
     
     def _setup_model(self):
-        """Setup SentenceTransformer model."""
-        if not SentenceTransformer:
-            raise ImportError("sentence-transformers not installed. Run: pip install sentence-transformers")
-        
+        """Setup the encoder, or a pool of worker processes each holding one."""
+        factory = partial(load_encoder, self.backend, self.model_name, self.onnx_path)
         try:
-            self.model = SentenceTransformer(self.model_name)
-            logging.info(f"Loaded model: {self.model_name}")
+            if self.workers != 1:
+                self.pool = EncodePool(factory, self.workers, self.threads_per_worker)
+                return
+            self.encoder = factory()
         except Exception as e:
-            logging.error(f"Failed to load model {self.model_name}: {e}")
+            logging.error(f"Failed to load {self.backend} model {self.model_name}: {e}")
             raise
     
+    def _setup_projection(self):
+        """Load the projection stored with the collection; it must match any requested one."""
+        self.projection = load_projection(self.chroma_path, encoder_name(self.backend, self.model_name))
+        if self.projection and self.reduce_dim and (
+                self.projection.dimension != self.reduce_dim or self.projection.method != self.reduce_method):
+            raise ValueError(f"Collection at {self.chroma_path} stores {self.projection.method} vectors of "
+                             f"dimension {self.projection.dimension}; re-create it to change the projection")
+        if self.projection:
+            logging.info(f"Storing {self.projection.method} projected vectors (dimension {self.projection.dimension})")
+    
     def _setup_chroma(self):
-        """Setup ChromaDB client and collection."""
-        if not chromadb:
-            raise ImportError("chromadb not installed. Run: pip install chromadb")
-        
+        """Setup the vector store client and collection."""
         try:
-            # Create persistent client
-            self.client = chromadb.PersistentClient(
-                path=self.chroma_path,
-                settings=Settings(anonymized_telemetry=False)
-            )
-            
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name="repo_chunks",
-                metadata={"description": "Code repository chunks with embeddings"}
-            )
-            
-            logging.info(f"Connected to ChromaDB at {self.chroma_path}")
+            self.client, self.collection = open_chunk_collection(self.chroma_path, store=self.store)
+            logging.info(f"Connected to {self.store} vector store at {self.chroma_path}")
         except Exception as e:
-            logging.error(f"Failed to setup ChromaDB: {e}")
+            logging.error(f"Failed to setup {self.store} vector store: {e}")
             raise
     
-    def _normalize_embedding(self, embedding: List[float]) -> List[float]:
-        """Normalize embedding to float32."""
-        import numpy as np
-        embedding_array = np.array(embedding, dtype=np.float32)
-        # L2 normalize
-        norm = np.linalg.norm(embedding_array)
-        if norm > 0:
-            embedding_array = embedding_array / norm
-        return embedding_array.tolist()
+    @contextmanager
+    def _timed(self, key: str):
+        """Add the wall time of the block to self.timings[key]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[key] += time.perf_counter() - start
+    
+    def _chunk_metadata(self, chunk: Dict) -> Dict[str, Any]:
+        """Chroma metadata for a chunk (positions are mutable, the id is not)."""
+        metadata = {
+            'filepath': chunk['filepath'],
+            'language': chunk['language'],
+            'node_type': chunk['node_type'],
+            'symbol_path': chunk.get('symbol_path', ''),
+            'start_line': chunk['start_line'],
+            'end_line': chunk['end_line'],
+            'summary': chunk['summary'],
+            'code_fingerprint': chunk['code_fingerprint'],
+            'last_modified': chunk['last_modified'],
+            'tokens_estimate': chunk['tokens_estimate']
+        }
+        if chunk.get('near_duplicate_of'):
+            metadata['near_duplicate_of'] = chunk['near_duplicate_of']
+        # Other locations of a deduplicated chunk, flattened since metadata values must be scalars
+        if chunk.get('aliases'):
+            metadata['aliases'] = ';'.join(f"{a['filepath']}:{a['start_line']}-{a['end_line']}"
+                                           for a in chunk['aliases'])
+        return metadata
     
-    def _check_existing_chunk(self, chunk_id: str, code_fingerprint: str) -> bool:
-        """Check if chunk already exists with same fingerprint."""
+    def _existing_metadata(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch metadata of already stored chunks in a single round trip."""
         try:
-            result = self.collection.get(ids=[chunk_id])
-            if result['ids']:
-                # Check if fingerprint matches
-                metadata = result['metadatas'][0]
-                existing_fingerprint = metadata.get('code_fingerprint', '')
-                return existing_fingerprint == code_fingerprint
+            with self._timed('metadata_s'):
+                result = self.collection.get(ids=chunk_ids, include=['metadatas'])
+            return dict(zip(result['ids'], result['metadatas']))
         except Exception as e:
-            logging.warning(f"Error checking existing chunk {chunk_id}: {e}")
-        return False
+            logging.warning(f"Error checking existing chunks: {e}")
+            return {}
+    
+    def partition_batch(self, chunks: List[Dict], force: bool = False) -> Tuple[List[Dict], List[Dict], int]:
+        """Split a batch into chunks to embed, chunks that only moved, and an unchanged count.
+        
+        Chunk ids are content-derived, so an existing id with the same
+        fingerprint needs no new embedding; if its line numbers or timestamp
+        differ only the metadata is updated.
+        """
+        to_embed, moved, unchanged, _ = self.partition_with_existing(chunks, force)
+        return to_embed, moved, unchanged
+    
+    def partition_with_existing(self, chunks: List[Dict], force: bool = False
+                                ) -> Tuple[List[Dict], List[Dict], int, Optional[Dict[str, Dict[str, Any]]]]:
+        """partition_batch plus the stored metadata it fetched, for insert_batch to reuse.
+        
+        Under force nothing is looked up and the metadata is None.
+        """
+        if force:
+            return list(chunks), [], 0, None
+        
+        existing = self._existing_metadata([chunk['id'] for chunk in chunks])
+        to_embed, moved, unchanged = [], [], 0
+        for chunk in chunks:
+            metadata = existing.get(chunk['id'])
+            if metadata is None or metadata.get('code_fingerprint') != chunk['code_fingerprint']:
+                to_embed.append(chunk)
+            elif any(metadata.get(key) != value for key, value in self._chunk_metadata(chunk).items()):
+                moved.append(chunk)
+            else:
+                unchanged += 1
+        return to_embed, moved, unchanged, existing
+    
+    def update_positions(self, chunks: List[Dict]) -> int:
+        """Update metadata in place (no re-embedding) for chunks whose content is unchanged."""
+        if not chunks:
+            return 0
+        try:
+            with self._timed('metadata_s'):
+                self.collection.update(
+                    ids=[chunk['id'] for chunk in chunks],
+                    metadatas=[self._chunk_metadata(chunk) for chunk in chunks]
+                )
+            logging.info(f"Updated positions of {len(chunks)} unchanged chunks")
+            return len(chunks)
+        except Exception as e:
+            logging.error(f"Error updating chunk metadata: {e}")
+            self.errors.append(f"ChromaDB metadata update failed: {e}")
+            return 0
     
     def embed_batch(self, chunks: List[Dict]) -> List[List[float]]:
         """Generate embeddings for a batch of chunks."""
         texts = [chunk['text'] for chunk in chunks]
         
+        if self.pool:
+            return self._pool_result(self.pool.encode_async(texts))
+        
         try:
-            embeddings = self.model.encode(texts, convert_to_tensor=False, show_progress_bar=False)
-            
-            # Normalize embeddings
-            normalized_embeddings = []
-            for embedding in embeddings:
-                normalized_embeddings.append(self._normalize_embedding(embedding.tolist()))
-            
-            return normalized_embeddings
+            with span('embedder.embed_batch', chunks=len(texts), backend=self.backend), self._timed('encode_s'):
+                embeddings = self._project(self.encoder.encode(texts))
+            self._count_encoded(embeddings)
+            return embeddings
+        except Exception as e:
+            logging.error(f"Error generating embeddings: {e}")
+            self.errors.append(f"Embedding generation failed: {e}")
+            return []
+    
+    def _pool_result(self, result) -> List[List[float]]:
+        """Wait for a pool batch; failures are recorded like in-process ones.
+        
+        A broken pool (a worker died) or a timed-out batch is re-raised: the
+        workers cannot be trusted with later batches.
+        """
+        try:
+            # Only the wait is visible here; the encode itself ran in a worker
+            with span('embedder.embed_batch', backend=self.backend, pool=True) as s, self._timed('encode_s'):
+                embeddings = self._project(self.pool.result(result))
+                s.set_attribute('chunks', len(embeddings))
+            self._count_encoded(embeddings)
+            return embeddings
+        except POOL_ERRORS:
+            raise
         except Exception as e:
             logging.error(f"Error generating embeddings: {e}")
             self.errors.append(f"Embedding generation failed: {e}")
             return []
     
-    def insert_batch(self, chunks: List[Dict], embeddings: List[List[float]], force: bool = False):
-        """Insert a batch of chunks with embeddings into ChromaDB."""
-        if not embeddings:
-            return
+    def _count_encoded(self, embeddings: List[List[float]]):
+        self.timings['batches_encoded'] += 1
+        self.timings['chunks_encoded'] += len(embeddings)
+    
+    def _project(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """Map full encoder vectors into the stored (reduced) space."""
+        if self.projection is None or not embeddings:
+            return embeddings
+        return self.projection.apply(embeddings)
+    
+    def fit_projection(self, chunks_file: Path) -> Projection:
+        """Create the requested projection, fitting PCA on a seeded stratified sample of `fit_sample` chunks."""
+        if self.collection.count():
+            raise ValueError(f"Collection at {self.chroma_path} already holds full-size vectors; "
+                             f"use an empty store for --reduce-dim")
+        
+        encoder = encoder_name(self.backend, self.model_name)
+        if self.reduce_method == 'truncate':
+            projection = Projection.truncate(self.reduce_dim, encoder=encoder)
+        else:
+            # Sampled across the whole file: the first lines are usually a few files of one language
+            texts = [chunk['text'] for chunk in sample_chunks(chunks_file, self.fit_sample, fields=('text',))]
+            logging.info(f"Fitting PCA to {self.reduce_dim} dimensions on {len(texts)} chunks")
+            vectors = []
+            for i in range(0, len(texts), self.batch_size):
+                vectors.extend(self.embed_batch([{'text': text} for text in texts[i:i + self.batch_size]]))
+            projection = Projection.fit_pca(vectors, self.reduce_dim, encoder=encoder)
+            logging.info(f"PCA keeps {projection.explained_variance:.1%} of the variance")
+        
+        projection.save(Path(self.chroma_path) / PROJECTION_FILENAME)
+        self.projection = projection
+        return projection
+    
+    def close(self):
+        """Shut down the encode pool, if any, and persist the store's pending index changes."""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+        self._flush_store()
+    
+    def _flush_store(self):
+        # The local store keeps IVF-PQ index updates in memory; Chroma persists on write
+        if self.store == 'local' and self.collection is not None:
+            self.collection.flush()
+    
+    def insert_batch(self, chunks: List[Dict], embeddings: List[List[float]], force: bool = False,
+                     existing: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, int]:
+        """Write a batch of chunks with embeddings into ChromaDB.
+        
+        Writes use upsert, so re-embedding existing ids (force) replaces them
+        instead of failing the whole batch. A failed write is split in halves
+        and retried until the offending records are isolated. Returns counts
+        of inserted, updated, skipped and failed chunks.
         
-        ids = []
-        documents = []
-        metadatas = []
-        embeddings_to_insert = []
+        `existing` is stored metadata already fetched by partition_with_existing,
+        so the batch is not looked up twice. Under force without it nothing is
+        looked up, and inserts and updates are told apart by how much the
+        collection grew.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        if not embeddings or len(embeddings) != len(chunks):
+            if chunks:
+                logging.error(f"Missing embeddings for batch of {len(chunks)} chunks")
+                self.errors.append(f"Missing embeddings for batch of {len(chunks)} chunks")
+            counts['failed'] = len(chunks)
+            return counts
         
-        for i, chunk in enumerate(chunks):
+        # At most one lookup per batch, to skip unchanged chunks and to tell inserts from updates
+        if existing is None and not force:
+            existing = self._existing_metadata([chunk['id'] for chunk in chunks])
+        
+        records: Dict[str, Tuple[Dict, List[float]]] = {}
+        for chunk, embedding in zip(chunks, embeddings):
             chunk_id = chunk['id']
-            code_fingerprint = chunk['code_fingerprint']
             
-            # Check if chunk already exists (unless force)
-            if not force and self._check_existing_chunk(chunk_id, code_fingerprint):
+            if not force and chunk_id in existing and existing[chunk_id].get('code_fingerprint') == chunk['code_fingerprint']:
                 logging.debug(f"Skipping existing chunk: {chunk_id}")
+                counts['skipped'] += 1
                 continue
             
-            ids.append(chunk_id)
-            documents.append(chunk['text'])
-            metadatas.append({
-                'filepath': chunk['filepath'],
-                'language': chunk['language'],
-                'node_type': chunk['node_type'],
-                'start_line': chunk['start_line'],
-                'end_line': chunk['end_line'],
-                'summary': chunk['summary'],
-                'code_fingerprint': code_fingerprint,
-                'last_modified': chunk['last_modified'],
-                'tokens_estimate': chunk['tokens_estimate']
-            })
-            embeddings_to_insert.append(embeddings[i])
-        
-        if not ids:
+            if chunk_id in records:
+                # Repeated id within the batch: the last occurrence wins
+                logging.warning(f"Duplicate chunk id in batch: {chunk_id}")
+                counts['skipped'] += 1
+            records[chunk_id] = (chunk, embedding)
+        
+        if not records:
             logging.info("No new chunks to insert")
-            return
+            return counts
         
+        with span('embedder.insert_batch', records=len(records), store=self.store), self._timed('insert_s'):
+            before = self.collection.count() if existing is None else 0
+            written = self._write_records(list(records.values()))
+            if existing is None:
+                counts['inserted'] = min(len(written), max(0, self.collection.count() - before))
+                counts['updated'] = len(written) - counts['inserted']
+        for chunk_id in written if existing is not None else ():
+            counts['updated' if chunk_id in existing else 'inserted'] += 1
+        counts['failed'] = len(records) - counts['inserted'] - counts['updated']
+        
+        logging.info(f"Inserted {counts['inserted']}, updated {counts['updated']} chunks in ChromaDB"
+                     + (f", {counts['failed']} failed" if counts['failed'] else ""))
+        return counts
+    
+    def _write_records(self, records: List[Tuple[Dict, List[float]]]) -> List[str]:
+        """Upsert records, bisecting on failure to isolate bad ones. Returns written ids.
+        
+        Systemic failures (see is_systemic_error) are re-raised instead of bisected.
+        """
         try:
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas,
-                embeddings=embeddings_to_insert
+            self.collection.upsert(
+                ids=[chunk['id'] for chunk, _ in records],
+                documents=[chunk['text'] for chunk, _ in records],
+                metadatas=[self._chunk_metadata(chunk) for chunk, _ in records],
+                embeddings=[embedding for _, embedding in records]
             )
-            logging.info(f"Inserted {len(ids)} chunks into ChromaDB")
+            return [chunk['id'] for chunk, _ in records]
         except Exception as e:
-            logging.error(f"Error inserting batch: {e}")
-            self.errors.append(f"ChromaDB insertion failed: {e}")
+            if is_systemic_error(e):
+                raise
+            if len(records) == 1:
+                chunk_id = records[0][0]['id']
+                logging.error(f"Error inserting chunk {chunk_id}: {e}")
+                self.errors.append(f"ChromaDB insertion failed for {chunk_id}: {e}")
+                return []
+            logging.warning(f"Insert of {len(records)} chunks failed ({e}); retrying in halves")
+            mid = len(records) // 2
+            return self._write_records(records[:mid]) + self._write_records(records[mid:])
     
-    def process_chunks_file(self, chunks_file: str, force: bool = False, dry_run: bool = False):
-        """Process chunks from JSONL file."""
+    def _checkpoint_source(self, chunks_file: Path) -> Dict[str, Any]:
+        """Identify the input a checkpoint belongs to; offsets are only valid for it."""
+        stat = chunks_file.stat()
+        return {
+            'chunks_file': str(chunks_file.resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'model_name': self.model_name,
+            'backend': self.backend,
+        }
+    
+    def process_chunks_file(self, chunks_file: str, force: bool = False, dry_run: bool = False,
+                            resume: bool = False, checkpoint_path: Optional[str] = None):
+        """Process chunks from JSONL file.
+        
+        After every committed batch the byte offset just past it is saved to a
+        checkpoint file (by default inside the Chroma store). With `resume`, a
+        checkpoint for the same chunks file and model is used to seek straight
+        to that offset. The checkpoint is removed once the file is done.
+        """
         chunks_file = Path(chunks_file)
         if not chunks_file.exists():
             raise FileNotFoundError(f"Chunks file not found: {chunks_file}")
         
         logging.info(f"Processing chunks from {chunks_file}")
         
+        if self.reduce_dim and self.projection is None and not dry_run:
+            self.fit_projection(chunks_file)
+        
+        checkpoint_path = Path(checkpoint_path or Path(self.chroma_path) / CHECKPOINT_FILENAME)
+        source = self._checkpoint_source(chunks_file)
         chunks = []
-        total_processed = 0
-        total_inserted = 0
+        totals = {'processed': 0, 'inserted': 0, 'updated': 0, 'moved': 0,
+                  'unchanged': 0, 'skipped': 0, 'failed': 0, 'reused': 0}
+        offset = 0
+        line_num = 0
+        batch_num = 0
+        
+        if resume:
+            checkpoint = load_checkpoint(checkpoint_path)
+            if checkpoint and checkpoint.get('source') == source:
+                offset = checkpoint['offset']
+                line_num = checkpoint['line']
+                batch_num = checkpoint['batch']
+                totals.update(checkpoint.get('totals', {}))
+                logging.info(f"Resuming at batch {batch_num} (line {line_num}, byte {offset})")
+            elif checkpoint:
+                logging.warning("Checkpoint does not match this chunks file or model; starting from the beginning")
+            else:
+                logging.info("No checkpoint found; starting from the beginning")
+        
+        # With an encode pool, batches are encoded concurrently but written
+        # (and checkpointed) strictly in file order by this process alone.
+        pending = deque()
+        
+        def save_position(position: Dict[str, int]):
+            if not dry_run:
+                save_checkpoint(checkpoint_path, {'source': source, **position, 'totals': totals})
+        
+        def write_oldest():
+            to_embed, reused, existing, result, counts, position = pending.popleft()
+            embeddings = self._pool_result(result) if result is not None else []
+            self._write_batch(to_embed, embeddings, counts, totals, reused, existing)
+            save_position(position)
+        
+        def commit_batch():
+            nonlocal batch_num
+            to_embed, reused, existing, counts = self._prepare_batch(chunks, force, dry_run)
+            batch_num += 1
+            position = {'offset': offset, 'line': line_num, 'batch': batch_num}
+            if self.pool is None:
+                self._write_batch(to_embed, self.embed_batch(to_embed) if to_embed else [], counts, totals,
+                                  reused, existing)
+                save_position(position)
+                return
+            result = self.pool.encode_async([chunk['text'] for chunk in to_embed]) if to_embed else None
+            pending.append((to_embed, reused, existing, result, counts, position))
+            while len(pending) > self.pool.max_pending:
+                write_oldest()
         
-        with open(chunks_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
+        def decode_error(bad_line: int, e: Exception):
+            logging.error(f"JSON decode error at line {bad_line}: {e}")
+            self.errors.append(f"JSON decode error at line {bad_line}: {e}")
+        
+        for record in iter_chunk_records(chunks_file, offset=offset, line_num=line_num, on_error=decode_error):
+            offset, line_num = record.end_offset, record.line_num
+            chunks.append(record.chunk)
+            
+            # Process in batches
+            if len(chunks) >= self.batch_size:
                 try:
-                    chunk = json.loads(line.strip())
-                    chunks.append(chunk)
+                    commit_batch()
+                    chunks = []
                     
-                    # Process in batches
-                    if len(chunks) >= self.batch_size:
-                        if not dry_run:
-                            embeddings = self.embed_batch(chunks)
-                            if embeddings:
-                                self.insert_batch(chunks, embeddings, force)
-                                total_inserted += len(chunks)
-                        else:
-                            logging.info(f"DRY RUN: Would process batch of {len(chunks)} chunks")
-                            total_inserted += len(chunks)
-                        
-                        total_processed += len(chunks)
-                        chunks = []
-                        
-                        if total_processed % (self.batch_size * 10) == 0:
-                            logging.info(f"Processed {total_processed} chunks...")
+                    if totals['processed'] % (self.batch_size * 10) == 0:
+                        logging.info(f"Processed {totals['processed']} chunks...")
                 
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error at line {line_num}: {e}")
-                    self.errors.append(f"JSON decode error at line {line_num}: {e}")
                 except Exception as e:
+                    if is_systemic_error(e) or isinstance(e, POOL_ERRORS):
+                        raise
                     logging.error(f"Error processing line {line_num}: {e}")
                     self.errors.append(f"Error processing line {line_num}: {e}")
+                    # Recorded; retrying it with every later line would only grow the batch
+                    chunks = []
         
         # Process remaining chunks
         if chunks:
-            if not dry_run:
-                embeddings = self.embed_batch(chunks)
-                if embeddings:
-                    self.insert_batch(chunks, embeddings, force)
-                    total_inserted += len(chunks)
-            else:
-                logging.info(f"DRY RUN: Would process final batch of {len(chunks)} chunks")
-                total_inserted += len(chunks)
-            
-            total_processed += len(chunks)
+            commit_batch()
+        while pending:
+            write_oldest()
         
-        logging.info(f"Processing complete. Total processed: {total_processed}, Total inserted: {total_inserted}")
+        if not dry_run:
+            self._flush_store()
+            if checkpoint_path.exists():
+                checkpoint_path.unlink()
+        
+        logging.info(f"Processing complete. Total processed: {totals['processed']}, "
+                     f"inserted: {totals['inserted']}, updated: {totals['updated']}, "
+                     f"moved (metadata only): {totals['moved']}, unchanged: {totals['unchanged']}, "
+                     f"skipped: {totals['skipped']}, failed: {totals['failed']}, "
+                     f"near-duplicates reusing a vector: {totals['reused']}")
+        timings = self.timing_summary()
+        logging.info(f"Time: encode {timings['encode_s']}s ({timings['encode_chunks_per_s']} chunks/s), "
+                     f"insert {timings['insert_s']}s, metadata lookups/updates {timings['metadata_s']}s")
+        if timings['chunks_reused']:
+            logging.info(f"Near-duplicate reuse skipped {timings['chunks_reused']} encodes "
+                         f"(~{timings['encode_s_saved_est']}s)")
         
         if self.errors:
             logging.warning(f"Encountered {len(self.errors)} errors during processing")
             for error in self.errors:
                 logging.warning(f"Error: {error}")
+        
+        return totals
+    
+    def _prepare_batch(self, chunks: List[Dict], force: bool, dry_run: bool
+                       ) -> Tuple[List[Dict], List[Dict], Optional[Dict[str, Dict[str, Any]]], Dict[str, int]]:
+        """Partition a batch and update moved chunks in place.
+        
+        Returns the chunks to encode, the near-duplicates that will reuse their
+        representative's vector, the stored metadata looked up while
+        partitioning (None under force) and the batch counts.
+        """
+        counts = {'processed': len(chunks)}
+        if dry_run:
+            logging.info(f"DRY RUN: Would process batch of {len(chunks)} chunks")
+            return [], [], None, counts
+        
+        to_embed, moved, unchanged, existing = self.partition_with_existing(chunks, force)
+        counts['moved'] = self.update_positions(moved)
+        counts['unchanged'] = unchanged
+        if not self.representatives:
+            return to_embed, [], existing, counts
+        to_encode, reused = [], []
+        for chunk in to_embed:
+            representative = self.representatives.get(chunk['id'])
+            if representative is None:
+                to_encode.append(chunk)
+            else:
+                reused.append(dict(chunk, near_duplicate_of=representative))
+        return to_encode, reused, existing, counts
+    
+    def _write_batch(self, to_embed: List[Dict], embeddings: List[List[float]], counts: Dict[str, int],
+                     totals: Dict[str, int], reused: Optional[List[Dict]] = None,
+                     existing: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Store embedded chunks, then near-duplicates, and fold the batch counts into the totals."""
+        counts = dict(counts)
+        if to_embed:
+            # Already partitioned, so do not skip anything again nor look the batch up twice
+            for key, value in self.insert_batch(to_embed, embeddings, force=True, existing=existing).items():
+                counts[key] = counts.get(key, 0) + value
+            if self._representative_ids:
+                self._representative_vectors.update(
+                    (chunk['id'], embedding) for chunk, embedding in zip(to_embed, embeddings)
+                    if chunk['id'] in self._representative_ids)
+        if reused:
+            for key, value in self._insert_near_duplicates(reused, existing).items():
+                counts[key] = counts.get(key, 0) + value
+        for key, value in counts.items():
+            totals[key] += value
+    
+    def _insert_near_duplicates(self, chunks: List[Dict],
+                                existing: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, int]:
+        """Store cluster members under their representative's vector.
+        
+        Representatives come first in chunks.jsonl, so their vectors are
+        normally cached by now; members whose representative was not embedded
+        in this run (unchanged, or before a resume point) are encoded instead.
+        """
+        found, missing = [], []
+        for chunk in chunks:
+            vector = self._representative_vectors.get(chunk['near_duplicate_of'])
+            if vector is None:
+                missing.append(chunk)
+            else:
+                found.append((chunk, vector))
+        counts = {'reused': len(found)}
+        self.timings['chunks_reused'] += len(found)
+        for batch, embeddings in ((missing, self.embed_batch(missing) if missing else []),
+                                  ([chunk for chunk, _ in found], [vector for _, vector in found])):
+            if batch:
+                for key, value in self.insert_batch(batch, embeddings, force=True, existing=existing).items():
+                    counts[key] = counts.get(key, 0) + value
+        return counts
+    
+    def _process_batch(self, chunks: List[Dict], force: bool, dry_run: bool, totals: Dict[str, int]):
+        """Embed only new or changed chunks of a batch; update moved ones in place."""
+        to_embed, reused, existing, counts = self._prepare_batch(chunks, force, dry_run)
+        self._write_batch(to_embed, self.embed_batch(to_embed) if to_embed else [], counts, totals, reused, existing)
+    
+    def timing_summary(self) -> Dict[str, Any]:
+        """Rounded stage timings plus encode throughput."""
+        summary = {key: round(value, 4) if isinstance(value, float) else value
+                   for key, value in self.timings.items()}
+        encode_s = self.timings['encode_s']
+        summary['encode_chunks_per_s'] = round(self.timings['chunks_encoded'] / encode_s, 2) if encode_s else None
+        # Encode time the reused near-duplicate vectors would have cost at the measured rate
+        encoded = self.timings['chunks_encoded']
+        summary['encode_s_saved_est'] = round(self.timings['chunks_reused'] * encode_s / encoded, 4) if encoded else 0.0
+        return summary
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
@@ -250,8 +630,10 @@ class ChromaEmbedder:
             count = self.collection.count()
             return {
                 "total_chunks": count,
-                "collection_name": "repo_chunks",
-                "model_name": self.model_name
+                "collection_name": COLLECTION_NAME,
+                "store": self.store,
+                "model_name": self.model_name,
+                "timings": self.timing_summary()
             }
         except Exception as e:
             logging.error(f"Error getting collection stats: {e}")
@@ -265,14 +647,35 @@ def main():
                        help="Path to chunks JSONL file")
     parser.add_argument("--chroma-path", default="./repo-indexer/chroma_store",
                        help="Path to ChromaDB storage")
+    parser.add_argument("--store", choices=STORES,
+                       help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path, else chroma)")
     parser.add_argument("--batch-size", type=int, default=64,
                        help="Batch size for embedding generation")
     parser.add_argument("--model", default="all-mpnet-base-v2",
                        help="SentenceTransformer model name")
+    parser.add_argument("--backend", choices=BACKENDS,
+                       help="Encoder backend (default: ENCODER_BACKEND or torch; hashing needs no model)")
+    parser.add_argument("--onnx-path", help="Directory written by export_onnx.py (onnx backend)")
     parser.add_argument("--force", action="store_true",
                        help="Force re-embedding of existing chunks")
     parser.add_argument("--dry-run", action="store_true",
                        help="Dry run mode")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Encoder processes (0 = one per CPU core; 1 = encode in-process)")
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                       help="Torch threads per encoder process (default: cores / workers)")
+    parser.add_argument("--reduce-dim", type=int, default=0,
+                       help="Store vectors projected to this many dimensions (new stores only)")
+    parser.add_argument("--reduce-method", choices=PROJECTION_METHODS, default="pca",
+                       help="Fitted PCA, or truncation for Matryoshka-trained models")
+    parser.add_argument("--fit-sample", type=int, default=5000,
+                       help="Chunks used to fit the PCA projection")
+    parser.add_argument("--near-duplicates", metavar="PATH",
+                       help="near_duplicates.json from the chunker; cluster members reuse their representative's vector")
+    parser.add_argument("--resume", action="store_true",
+                       help="Resume an interrupted run from its checkpoint")
+    parser.add_argument("--checkpoint",
+                       help=f"Checkpoint file (default: <chroma-path>/{CHECKPOINT_FILENAME})")
     
     args = parser.parse_args()
     
@@ -280,17 +683,31 @@ def main():
     model_name = os.getenv('SENTENCE_MODEL', args.model)
     chroma_path = os.getenv('CHROMA_PATH', args.chroma_path)
     
+    embedder = None
     try:
         embedder = ChromaEmbedder(
             chroma_path=chroma_path,
             model_name=model_name,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            backend=args.backend,
+            onnx_path=args.onnx_path,
+            # A dry run never encodes, so skip loading the model entirely
+            load_model=not args.dry_run,
+            reduce_dim=args.reduce_dim,
+            reduce_method=args.reduce_method,
+            fit_sample=args.fit_sample,
+            store=args.store,
+            near_duplicates=args.near_duplicates
         )
         
         embedder.process_chunks_file(
             chunks_file=args.chunks,
             force=args.force,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            resume=args.resume,
+            checkpoint_path=args.checkpoint
         )
         
         # Print collection stats
@@ -298,10 +715,16 @@ def main():
         print(f"\nCollection Statistics:")
         print(f"Total chunks: {stats.get('total_chunks', 'Unknown')}")
         print(f"Model: {stats.get('model_name', 'Unknown')}")
+        timings = embedder.timing_summary()
+        print(f"Encode: {timings['encode_s']}s, insert: {timings['insert_s']}s, "
+              f"metadata: {timings['metadata_s']}s")
         
     except Exception as e:
         logging.error(f"Fatal error: {e}")
         sys.exit(1)
+    finally:
+        if embedder is not None:
+            embedder.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Multi-process encoder pool for CPU embedding.
+Each worker builds its own encoder with a pinned thread count; batches are
+submitted asynchronously and results come back in submission order.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List
+
+# Longest wait for one batch before giving up on the workers
+RESULT_TIMEOUT_S = 600.0
+# Longest wait for the workers to start: interpreter, imports and model load
+STARTUP_TIMEOUT_S = 900.0
+
+# After either of these the pool cannot be trusted with further batches
+POOL_ERRORS = (BrokenProcessPool, FutureTimeoutError)
+
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+_worker_encoder = None
+
+
+def _init_worker(encoder_factory: Callable, threads: int):
+    global _worker_encoder
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_encoder = encoder_factory()
+
+
+def _encode(texts: List[str]) -> List[List[float]]:
+    return _worker_encoder.encode(texts)
+
+
+class EncodePool:
+    """Worker processes that each hold an encoder and encode whole batches.
+
+    `encoder_factory` must be picklable (e.g. a functools.partial of
+    `encoders.load_encoder`); it is called once in every worker. One probe
+    batch per worker is submitted at start-up, which starts every worker, and
+    the constructor raises if any probe fails, so a factory that cannot be
+    unpickled or fails in the workers is reported here. The executor does not
+    promise each probe lands on a different worker, so a worker that only
+    fails after the probes have returned is caught later instead: it breaks the
+    pool and the next result() raises BrokenProcessPool.
+    """
+
+    def __init__(self, encoder_factory: Callable, workers: int = 0, threads_per_worker: int = 0,
+                 timeout: float = RESULT_TIMEOUT_S, startup_timeout: float = STARTUP_TIMEOUT_S):
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.workers)
+        self.timeout = timeout
+        # Enough batches in flight to keep every worker busy while the writer drains
+        self.max_pending = self.workers * 2
+
+        # spawn: forking a process that already initialised torch threads can deadlock
+        context = multiprocessing.get_context('spawn')
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(encoder_factory, self.threads_per_worker))
+        try:
+            probes = [self.encode_async(['probe']) for _ in range(self.workers)]
+            for probe in probes:
+                probe.result(timeout=startup_timeout)
+        except Exception as e:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Encode pool workers failed to start: {e!r}") from e
+        logging.info(f"Started encode pool: {self.workers} workers x {self.threads_per_worker} threads")
+
+    def encode_async(self, texts: List[str]) -> Future:
+        """Submit a batch; pass the future to result() for normalized float32 embeddings."""
+        return self._pool.submit(_encode, texts)
+
+    def result(self, future: Future) -> List[List[float]]:
+        """Wait at most `timeout` seconds for a batch; raises one of POOL_ERRORS when the workers fail."""
+        return future.result(timeout=self.timeout)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.result(self.encode_async(texts))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Embedding backends shared by the embedder and the retriever.
+Each encoder turns texts into L2-normalized float32 vectors: SentenceTransformers,
+a quantized ONNX export, or a deterministic hashing stand-in needing no model.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Protocol, Tuple
+
+BACKENDS = ('torch', 'onnx', 'hashing')
+DEFAULT_BACKEND = 'torch'
+ONNX_MODEL_FILES = ('model_quantized.onnx', 'model.onnx')
+ONNX_CONFIG_FILENAME = "encoder_config.json"
+HASHING_DIMENSION = 384
+
+_TOKEN_REGEX = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]')
+_SUBTOKEN_REGEX = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+
+
+class Encoder(Protocol):
+    """What the embedder, retriever and benchmarks need from a backend.
+
+    `encode` returns one L2-normalized float32-precision vector (as a list,
+    the form Chroma accepts) per input text, each of length `dimension`.
+    """
+
+    name: str
+    dimension: Optional[int]
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+
+def _normalize_rows(embeddings) -> List[List[float]]:
+    """L2 normalize a 2-D array to float32 lists."""
+    import numpy as np
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (embeddings / norms).tolist()
+
+
+class SentenceTransformerEncoder:
+    """fp32 PyTorch SentenceTransformer."""
+
+    def __init__(self, model_name: str = "all-mpnet-base-v2", device: Optional[str] = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers not installed. Run: pip install sentence-transformers")
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        return _normalize_rows(embeddings)
+
+
+class OnnxEncoder:
+    """ONNX Runtime export of a SentenceTransformer (mean pooling), loaded offline.
+
+    `model_path` is a directory written by `export_onnx.py`: the ONNX graph
+    (quantized if present), `tokenizer.json` and `encoder_config.json`.
+    """
+
+    def __init__(self, model_path: str, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("ONNX backend needs onnxruntime and tokenizers. Run: pip install onnxruntime tokenizers")
+
+        model_dir = Path(model_path)
+        model_file = next((model_dir / name for name in ONNX_MODEL_FILES if (model_dir / name).exists()), None)
+        if model_file is None:
+            raise FileNotFoundError(f"No ONNX model in {model_dir} (expected one of {', '.join(ONNX_MODEL_FILES)})")
+
+        config = {}
+        config_file = model_dir / ONNX_CONFIG_FILENAME
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        self.name = config.get('model_name', str(model_dir))
+        self.dimension = config.get('dimension')
+        max_length = config.get('max_seq_length', 384)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        # Worker processes pin OMP_NUM_THREADS; ONNX Runtime does not read it itself
+        threads = threads or int(os.environ.get('OMP_NUM_THREADS', 0))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_file), options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        logging.info(f"Loaded ONNX encoder: {model_file}")
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return _normalize_rows(pooled)
+
+
+# Token -> bucket memo; bounded so a long run over many distinct identifiers cannot grow it without limit
+BUCKET_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=BUCKET_CACHE_SIZE)
+def _hash_bucket(token: str, dimension: int) -> Tuple[int, float]:
+    # blake2b rather than hash(): stable across processes and runs
+    digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+    return digest % dimension, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEncoder:
+    """Feature-hashing bag of code tokens: instant to load, deterministic, no model.
+
+    Identifiers are also split into camelCase/snake_case parts. Not a semantic
+    model; it stands in for one in tests and in benchmarks of the rest of the
+    pipeline.
+    """
+
+    def __init__(self, dimension: int = HASHING_DIMENSION):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        return _hash_bucket(token, self.dimension)
+
+    def _features(self, text: str) -> Counter:
+        features = Counter()
+        for token in _TOKEN_REGEX.findall(text):
+            features[token.lower()] += 1
+            parts = _SUBTOKEN_REGEX.findall(token)
+            if len(parts) > 1:
+                features.update(part.lower() for part in parts)
+        return features
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        embeddings = []
+        for text in texts:
+            vector = [0.0] * self.dimension
+            for token, count in self._features(text).items():
+                bucket, sign = self._bucket(token)
+                vector[bucket] += sign * (1.0 + math.log(count))
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            # Round through float32 so values match what the model backends emit
+            embeddings.append(array('f', (v / norm for v in vector)).tolist())
+        return embeddings
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Backend from the argument, else ENCODER_BACKEND, else torch."""
+    return backend or os.getenv('ENCODER_BACKEND') or DEFAULT_BACKEND
+
+
+def load_encoder(backend: Optional[str] = None, model_name: str = "all-mpnet-base-v2",
+                 onnx_path: Optional[str] = None) -> Encoder:
+    """Create the encoder for a backend name (default from ENCODER_BACKEND)."""
+    backend = resolve_backend(backend)
+    onnx_path = onnx_path or os.getenv('ONNX_MODEL_PATH')
+    if backend == 'hashing':
+        encoder = HashingEncoder(int(os.getenv('HASHING_DIM', HASHING_DIMENSION)))
+    elif backend == 'torch':
+        encoder = SentenceTransformerEncoder(model_name)
+    elif backend == 'onnx':
+        if not onnx_path:
+            raise ValueError("The onnx backend needs a local model directory (--onnx-path)")
+        encoder = OnnxEncoder(onnx_path)
+    else:
+        raise ValueError(f"Unknown encoder backend: {backend} (choose from {', '.join(BACKENDS)})")
+    logging.info(f"Loaded {backend} encoder: {encoder.name}")
+    return encoder
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Exports a SentenceTransformer to ONNX with int8 dynamic quantization.
+Writes model.onnx, model_quantized.onnx, tokenizer.json and encoder_config.json
+into one directory that OnnxEncoder loads without network access.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from encoders import ONNX_CONFIG_FILENAME
+
+
+def export(model_name: str, out_dir: Path, quantize: bool = True, opset: int = 17) -> Path:
+    """Export the transformer of `model_name` (token embeddings) and optionally quantize it."""
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError("Export needs torch and sentence-transformers. Run: pip install sentence-transformers")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["def example():\n    return 1"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    model_file = out_dir / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(model_file),
+            input_names=input_names,
+            output_names=['token_embeddings'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    tokenizer.backend_tokenizer.save(str(out_dir / "tokenizer.json"))
+
+    with open(out_dir / ONNX_CONFIG_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'dimension': st_model.get_sentence_embedding_dimension(),
+            'max_seq_length': st_model.max_seq_length,
+            'pooling': 'mean',
+            'quantized': quantize,
+        }, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_file = out_dir / "model_quantized.onnx"
+        quantize_dynamic(str(model_file), str(quantized_file), weight_type=QuantType.QInt8)
+        return quantized_file
+    return model_file
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Export a SentenceTransformer to (quantized) ONNX")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    parser.add_argument("--out", default="repo-indexer/models/all-mpnet-base-v2-onnx", help="Output directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep fp32 weights only")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+    args = parser.parse_args()
+
+    model_file = export(args.model, Path(args.out), quantize=not args.no_quantize, opset=args.opset)
+    print(f"Exported {args.model} to {model_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""
+Single-host vector store exposing the subset of Chroma's collection API we use.
+Vectors live in a memory-mapped float32 matrix, ids/documents/metadata in an
+append-only log; search is exact (blocked matmul) or through an IVF-PQ index.
+"""
+
+import argparse
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+STORE_MARKER = "local_store.json"
+VECTORS_FILENAME = "vectors.f32"
+RECORDS_FILENAME = "records.jsonl"
+INDEX_FILENAME = "ivfpq.npz"
+
+# Metadata fields kept as integer-coded columns for vectorized filtering
+FILTER_FIELDS = ('language', 'filepath')
+
+_BLOCK_ROWS = 65536
+
+_OPERATORS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value > operand,
+    '$gte': lambda value, operand: value >= operand,
+    '$lt': lambda value, operand: value < operand,
+    '$lte': lambda value, operand: value <= operand,
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+}
+
+
+def is_local_store(path) -> bool:
+    return (Path(path) / STORE_MARKER).exists()
+
+
+def matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma-style `where` filter against one metadata dict."""
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches(metadata, c) for c in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(metadata, c) for c in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for op, operand in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                # Like Chroma, a missing field never matches
+                if value is None or not _OPERATORS[op](value, operand):
+                    return False
+    return True
+
+
+def _nearest(data, centroids):
+    """Index of the nearest centroid (L2) for every row, in blocks."""
+    import numpy as np
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    nearest = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), _BLOCK_ROWS):
+        block = data[start:start + _BLOCK_ROWS]
+        nearest[start:start + len(block)] = (centroid_norms - 2 * block @ centroids.T).argmin(axis=1)
+    return nearest
+
+
+def kmeans(data, k: int, iterations: int = 20, seed: int = 0):
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random rows."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = _nearest(data, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class IvfPqIndex:
+    """Inverted file over k-means cells with product-quantized residuals.
+
+    Candidates from the `nprobe` closest cells are scored with per-query
+    lookup tables (inner product of the query with cell centroid plus residual
+    codewords) and the best `rerank` x k are rescored exactly.
+    """
+
+    def __init__(self, centroids, codebooks, codes, cells):
+        self.centroids = centroids      # (nlist, d)
+        self.codebooks = codebooks      # (m, ksub, d / m)
+        self.codes = codes              # (rows, m) uint8
+        self.cells = cells              # (rows,) int32, -1 = not indexed
+
+    @property
+    def subspaces(self) -> int:
+        return self.codebooks.shape[0]
+
+    @classmethod
+    def train(cls, vectors, nlist: int, subspaces: int, sample: int = 100000, seed: int = 0) -> 'IvfPqIndex':
+        import numpy as np
+        dimension = vectors.shape[1]
+        while dimension % subspaces:
+            subspaces -= 1
+        rng = np.random.default_rng(seed)
+        picked = rng.choice(len(vectors), min(sample, len(vectors)), replace=False)
+        data = np.asarray(vectors[np.sort(picked)], dtype=np.float32)
+
+        centroids = kmeans(data, nlist, seed=seed)
+        residuals = data - centroids[_nearest(data, centroids)]
+        width = dimension // subspaces
+        ksub = min(256, len(data))
+        codebooks = np.stack([
+            kmeans(residuals[:, j * width:(j + 1) * width], ksub, seed=seed + j + 1)
+            for j in range(subspaces)
+        ])
+        index = cls(centroids, codebooks, np.zeros((0, subspaces), dtype=np.uint8), np.zeros(0, dtype=np.int32))
+        index.add(np.arange(len(vectors)), vectors)
+        return index
+
+    def add(self, rows, vectors):
+        """Assign and encode `rows` (positions in the store) from their vectors."""
+        import numpy as np
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        needed = int(rows.max()) + 1
+        if needed > len(self.cells):
+            grow = needed - len(self.cells)
+            self.cells = np.concatenate([self.cells, np.full(grow, -1, dtype=np.int32)])
+            self.codes = np.concatenate([self.codes, np.zeros((grow, self.subspaces), dtype=np.uint8)])
+        width = self.codebooks.shape[2]
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            block_rows = rows[start:start + _BLOCK_ROWS]
+            data = np.asarray(vectors[block_rows], dtype=np.float32)
+            cells = _nearest(data, self.centroids)
+            residuals = data - self.centroids[cells]
+            self.cells[block_rows] = cells
+            for j in range(self.subspaces):
+                self.codes[block_rows, j] = _nearest(residuals[:, j * width:(j + 1) * width], self.codebooks[j])
+
+    def search(self, query, k: int, live, vectors, nprobe: int = 8, rerank: int = 4):
+        """Approximate top-k rows among `live` ones; returns (rows, exact scores)."""
+        import numpy as np
+        cell_scores = self.centroids @ query
+        probe = np.argsort(-cell_scores)[:nprobe]
+        indexed = len(self.cells)
+        candidates = np.flatnonzero(np.isin(self.cells, probe) & live[:indexed])
+        if not len(candidates):
+            return candidates, np.zeros(0, dtype=np.float32)
+
+        width = self.codebooks.shape[2]
+        tables = np.einsum('jkw,jw->jk', self.codebooks, query.reshape(self.subspaces, width))
+        approx = cell_scores[self.cells[candidates]] + tables[np.arange(self.subspaces), self.codes[candidates]].sum(axis=1)
+        keep = min(len(candidates), k * rerank)
+        shortlist = candidates[np.argpartition(-approx, keep - 1)[:keep]]
+        shortlist.sort()  # sequential reads from the memory map
+        scores = np.asarray(vectors[shortlist], dtype=np.float32) @ query
+        order = np.argsort(-scores)[:k]
+        return shortlist[order], scores[order]
+
+    def compact(self, keep_rows):
+        self.cells = self.cells[keep_rows]
+        self.codes = self.codes[keep_rows]
+
+    def save(self, path: Path):
+        import numpy as np
+        with open(path, 'wb') as f:
+            np.savez(f, centroids=self.centroids, codebooks=self.codebooks, codes=self.codes, cells=self.cells)
+
+    @classmethod
+    def load(cls, path: Path) -> 'IvfPqIndex':
+        import numpy as np
+        with np.load(path) as data:
+            return cls(data['centroids'], data['codebooks'], data['codes'], data['cells'])
+
+
+class LocalVectorStore:
+    """Collection-compatible store: get/add/upsert/update/delete/count/query.
+
+    Rows are append-only; upserting an existing id overwrites its row in
+    place and deletes leave holes until `compact()`. Vectors are expected to
+    be L2-normalized, so distances are cosine distances (1 - inner product).
+    Index changes are kept in memory until `flush()` / `close()`.
+    """
+
+    def __init__(self, path, create: bool = True, nprobe: int = 8):
+        self.path = Path(path)
+        if not is_local_store(self.path):
+            if not create:
+                raise FileNotFoundError(f"No local vector store at {self.path}")
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._write_marker(dimension=None)
+        with open(self.path / STORE_MARKER, 'r', encoding='utf-8') as f:
+            self.dimension = json.load(f).get('dimension')
+        self.nprobe = nprobe
+
+        self.ids: List[Optional[str]] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        self.row_of: Dict[str, int] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {field: {} for field in FILTER_FIELDS}
+        self._columns: Dict[str, List[int]] = {field: [] for field in FILTER_FIELDS}
+        self._vectors = None
+        self._cache: Dict[str, Any] = {}
+        self.index: Optional[IvfPqIndex] = None
+        self._index_dirty = False
+
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _write_marker(self, dimension: Optional[int]):
+        tmp = self.path / (STORE_MARKER + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'format': 1, 'dimension': dimension, 'metric': 'cosine'}, f)
+        os.replace(tmp, self.path / STORE_MARKER)
+
+    def _row_count(self) -> int:
+        vectors_file = self.path / VECTORS_FILENAME
+        if not self.dimension or not vectors_file.exists():
+            return 0
+        return vectors_file.stat().st_size // (4 * self.dimension)
+
+    def _load(self):
+        rows = self._row_count()
+        self._grow(rows)
+        records_file = self.path / RECORDS_FILENAME
+        if records_file.exists():
+            with open(records_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record['row'] >= rows:
+                        continue  # vector write never completed
+                    if record.get('deleted'):
+                        self._clear_row(record['row'])
+                    elif record.get('update'):
+                        row = record['row']
+                        if self.ids[row] is not None:
+                            self._set_row(row, self.ids[row], record.get('document', self.documents[row]),
+                                          record['metadata'])
+                    else:
+                        self._set_row(record['row'], record['id'], record.get('document'), record.get('metadata'))
+        index_file = self.path / INDEX_FILENAME
+        if index_file.exists():
+            self.index = IvfPqIndex.load(index_file)
+            if rows > len(self.index.cells):
+                # Rows appended after the index was last flushed
+                self.index.add(range(len(self.index.cells), rows), self.vectors)
+                self._index_dirty = True
+
+    def _append_records(self, records: Iterable[Dict[str, Any]]):
+        with open(self.path / RECORDS_FILENAME, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+    @property
+    def vectors(self):
+        """Memory-mapped (rows, dimension) float32 matrix."""
+        import numpy as np
+        if self._vectors is None:
+            rows = self._row_count()
+            if rows == 0:
+                self._vectors = np.zeros((0, self.dimension or 0), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(self.path / VECTORS_FILENAME, dtype=np.float32, mode='r+',
+                                          shape=(rows, self.dimension))
+        return self._vectors
+
+    # -- row bookkeeping ---------------------------------------------------
+
+    def _grow(self, rows: int):
+        extra = rows - len(self.ids)
+        if extra > 0:
+            self.ids.extend([None] * extra)
+            self.documents.extend([None] * extra)
+            self.metadatas.extend([None] * extra)
+            for field in FILTER_FIELDS:
+                self._columns[field].extend([-1] * extra)
+
+    def _set_row(self, row: int, chunk_id: str, document: Optional[str], metadata: Optional[Dict[str, Any]]):
+        previous = self.ids[row]
+        if previous is not None and previous != chunk_id:
+            self.row_of.pop(previous, None)
+        self.ids[row] = chunk_id
+        self.documents[row] = document
+        self.metadatas[row] = metadata or {}
+        self.row_of[chunk_id] = row
+        for field in FILTER_FIELDS:
+            value = self.metadatas[row].get(field)
+            codes = self._codes[field]
+            self._columns[field][row] = -1 if value is None else codes.setdefault(value, len(codes))
+        self._cache.clear()
+
+    def _clear_row(self, row: int):
+        chunk_id = self.ids[row]
+        if chunk_id is not None:
+            self.row_of.pop(chunk_id, None)
+        self.ids[row] = None
+        self.documents[row] = None
+        self.metadatas[row] = None
+        for field in FILTER_FIELDS:
+            self._columns[field][row] = -1
+        self._cache.clear()
+
+    def _live(self):
+        import numpy as np
+        if 'live' not in self._cache:
+            self._cache['live'] = np.fromiter((i is not None for i in self.ids), dtype=bool, count=len(self.ids))
+        return self._cache['live']
+
+    def _column(self, field: str):
+        import numpy as np
+        key = 'column:' + field
+        if key not in self._cache:
+            self._cache[key] = np.asarray(self._columns[field], dtype=np.int32)
+        return self._cache[key]
+
+    # -- filtering ---------------------------------------------------------
+
+    def _column_mask(self, condition: Dict[str, Any]):
+        """Vectorized mask for an $eq/$in test on a coded field, else None."""
+        import numpy as np
+        if len(condition) != 1:
+            return None
+        field, test = next(iter(condition.items()))
+        if field not in FILTER_FIELDS:
+            return None
+        if not isinstance(test, dict):
+            test = {'$eq': test}
+        if set(test) == {'$eq'}:
+            values = [test['$eq']]
+        elif set(test) == {'$in'}:
+            values = list(test['$in'])
+        else:
+            return None
+        codes = [self._codes[field][v] for v in values if v in self._codes[field]]
+        return np.isin(self._column(field), codes)
+
+    def _where_mask(self, where: Optional[Dict[str, Any]]):
+        """Live rows matching `where`; coded fields are filtered first, the rest per row."""
+        import numpy as np
+        mask = self._live().copy()
+        if not where:
+            return mask
+        conditions = where['$and'] if set(where) == {'$and'} else [{k: v} for k, v in where.items()]
+        remaining = []
+        for condition in conditions:
+            column_mask = self._column_mask(condition)
+            if column_mask is None:
+                remaining.append(condition)
+            else:
+                mask &= column_mask
+        if remaining:
+            for row in np.flatnonzero(mask):
+                if not all(matches(self.metadatas[row], c) for c in remaining):
+                    mask[row] = False
+        return mask
+
+    # -- writes ------------------------------------------------------------
+
+    def _check_dimension(self, embeddings) -> List[List[float]]:
+        embeddings = [list(map(float, e)) for e in embeddings]
+        if embeddings and self.dimension is None:
+            self.dimension = len(embeddings[0])
+            self._write_marker(self.dimension)
+        for embedding in embeddings:
+            if len(embedding) != self.dimension:
+                raise ValueError(f"Embedding dimension {len(embedding)} does not match store dimension {self.dimension}")
+        return embeddings
+
+    def upsert(self, ids: List[str], embeddings: Sequence[Sequence[float]],
+               documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        import numpy as np
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in upsert")
+        embeddings = self._check_dimension(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+
+        existing = [(i, self.row_of[chunk_id]) for i, chunk_id in enumerate(ids) if chunk_id in self.row_of]
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in self.row_of]
+
+        if existing:
+            vectors = self.vectors
+            for i, row in existing:
+                vectors[row] = embeddings[i]
+            vectors.flush()
+        first_new = self._row_count()
+        if new:
+            # Vectors before records: a crash leaves an unreferenced row, never a dangling record
+            with open(self.path / VECTORS_FILENAME, 'ab') as f:
+                f.write(np.asarray([embeddings[i] for i in new], dtype=np.float32).tobytes())
+            self._vectors = None
+            self._grow(first_new + len(new))
+
+        placed = existing + [(i, first_new + n) for n, i in enumerate(new)]
+        records = []
+        for i, row in placed:
+            self._set_row(row, ids[i], documents[i], metadatas[i])
+            records.append({'row': row, 'id': ids[i], 'document': documents[i], 'metadata': metadatas[i]})
+        self._append_records(records)
+        if self.index is not None:
+            self.index.add([row for _, row in placed], self.vectors)
+            self._index_dirty = True
+
+    def add(self, ids: List[str], embeddings: Sequence[Sequence[float]],
+            documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        duplicates = [chunk_id for chunk_id in ids if chunk_id in self.row_of]
+        if duplicates:
+            raise ValueError(f"Ids already exist: {', '.join(duplicates[:5])}")
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def update(self, ids: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+               documents: Optional[List[str]] = None, embeddings: Optional[Sequence[Sequence[float]]] = None):
+        """Merge metadata / replace documents or vectors of existing ids; unknown ids are skipped.
+
+        Without embeddings only an update record is logged; the vector and
+        the document (unless replaced) are not written again.
+        """
+        present = [(i, chunk_id) for i, chunk_id in enumerate(ids) if chunk_id in self.row_of]
+        if not present:
+            return
+        if embeddings is None:
+            records = []
+            for i, chunk_id in present:
+                row = self.row_of[chunk_id]
+                metadata = dict(self.metadatas[row])
+                if metadatas:
+                    metadata.update(metadatas[i])
+                record = {'row': row, 'update': True, 'metadata': metadata}
+                if documents:
+                    record['document'] = documents[i]
+                self._set_row(row, chunk_id, record.get('document', self.documents[row]), metadata)
+                records.append(record)
+            self._append_records(records)
+            return
+        merged_metadatas = []
+        merged_documents = []
+        for i, chunk_id in present:
+            row = self.row_of[chunk_id]
+            metadata = dict(self.metadatas[row])
+            if metadatas:
+                metadata.update(metadatas[i])
+            merged_metadatas.append(metadata)
+            merged_documents.append(documents[i] if documents else self.documents[row])
+        vectors = [embeddings[i] for i, _ in present]
+        self.upsert([chunk_id for _, chunk_id in present], vectors, merged_documents, merged_metadatas)
+
+    def delete(self, ids: List[str]):
+        rows = [self.row_of[chunk_id] for chunk_id in ids if chunk_id in self.row_of]
+        for row in rows:
+            self._clear_row(row)
+        self._append_records({'row': row, 'deleted': True} for row in rows)
+
+    def count(self) -> int:
+        return len(self.row_of)
+
+    def flush(self):
+        """Persist index changes made since the last flush; records and vectors are written as they come."""
+        if self.index is not None and self._index_dirty:
+            self.index.save(self.path / INDEX_FILENAME)
+        self._index_dirty = False
+
+    def close(self):
+        self.flush()
+        self._vectors = None
+
+    # -- reads -------------------------------------------------------------
+
+    def _result(self, rows: List[int], include: Sequence[str]) -> Dict[str, Any]:
+        return {
+            'ids': [self.ids[row] for row in rows],
+            'documents': [self.documents[row] for row in rows] if 'documents' in include else None,
+            'metadatas': [dict(self.metadatas[row]) for row in rows] if 'metadatas' in include else None,
+            'embeddings': [self.vectors[row].tolist() for row in rows] if 'embeddings' in include else None,
+        }
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Sequence[str] = ('metadatas', 'documents')) -> Dict[str, Any]:
+        import numpy as np
+        if ids is not None:
+            rows = [self.row_of[chunk_id] for chunk_id in ids if chunk_id in self.row_of]
+            if where:
+                rows = [row for row in rows if matches(self.metadatas[row], where)]
+        else:
+            rows = np.flatnonzero(self._where_mask(where)).tolist()
+        start = offset or 0
+        rows = rows[start:start + limit] if limit is not None else rows[start:]
+        return self._result(rows, include)
+
+    def _exact(self, query, k: int, mask):
+        """Blocked brute-force inner product over rows allowed by mask."""
+        import numpy as np
+        vectors = self.vectors
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            allowed = np.flatnonzero(mask[start:start + _BLOCK_ROWS])
+            if not len(allowed):
+                continue
+            if len(allowed) == min(_BLOCK_ROWS, len(vectors) - start):
+                scores = np.asarray(vectors[start:start + _BLOCK_ROWS]) @ query
+            else:
+                scores = np.asarray(vectors[start + allowed]) @ query
+            rows = start + allowed
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+        order = np.argsort(-best_scores)
+        return best_rows[order], best_scores[order]
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ('metadatas', 'documents', 'distances')) -> Dict[str, Any]:
+        import numpy as np
+        mask = self._where_mask(where)
+        allowed = int(mask.sum())
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for query in query_embeddings:
+            query = np.asarray(query, dtype=np.float32)
+            k = min(n_results, allowed)
+            if k == 0:
+                rows, scores = [], []
+            elif self.index is not None and allowed > n_results * 50:
+                rows, scores = self.index.search(query, k, mask, self.vectors, nprobe=self.nprobe)
+                if len(rows) < k:
+                    # Filter too selective for the probed cells: scan the allowed rows
+                    rows, scores = self._exact(query, k, mask)
+            else:
+                rows, scores = self._exact(query, k, mask)
+            part = self._result(list(rows), include)
+            results['ids'].append(part['ids'])
+            results['documents'].append(part['documents'])
+            results['metadatas'].append(part['metadatas'])
+            results['distances'].append([1.0 - float(s) for s in scores] if 'distances' in include else None)
+        return results
+
+    # -- maintenance -------------------------------------------------------
+
+    def build_index(self, nlist: Optional[int] = None, subspaces: int = 16, sample: int = 100000) -> IvfPqIndex:
+        """Train and persist an IVF-PQ index over the current vectors."""
+        rows = len(self.ids)
+        if rows == 0:
+            raise ValueError("Cannot build an index over an empty store")
+        nlist = nlist or max(1, int(4 * math.sqrt(rows)))
+        self.index = IvfPqIndex.train(self.vectors, nlist, subspaces, sample=sample)
+        self.index.save(self.path / INDEX_FILENAME)
+        self._index_dirty = False
+        return self.index
+
+    def drop_index(self):
+        self.index = None
+        self._index_dirty = False
+        index_file = self.path / INDEX_FILENAME
+        if index_file.exists():
+            index_file.unlink()
+
+    def _disk_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.path.iterdir() if f.is_file())
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite vectors and records without deleted rows."""
+        import numpy as np
+        before = self._disk_bytes()
+        keep = np.flatnonzero(self._live())
+        vectors_tmp = self.path / (VECTORS_FILENAME + '.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            for start in range(0, len(keep), _BLOCK_ROWS):
+                f.write(np.asarray(self.vectors[keep[start:start + _BLOCK_ROWS]], dtype=np.float32).tobytes())
+        records_tmp = self.path / (RECORDS_FILENAME + '.tmp')
+        with open(records_tmp, 'w', encoding='utf-8') as f:
+            for new_row, row in enumerate(keep):
+                f.write(json.dumps({'row': new_row, 'id': self.ids[row], 'document': self.documents[row],
+                                    'metadata': self.metadatas[row]}) + '\n')
+        if self.index is not None:
+            self.index.compact(keep[keep < len(self.index.cells)])
+
+        self._vectors = None
+        os.replace(vectors_tmp, self.path / VECTORS_FILENAME)
+        os.replace(records_tmp, self.path / RECORDS_FILENAME)
+        if self.index is not None:
+            self.index.save(self.path / INDEX_FILENAME)
+            self._index_dirty = False
+
+        # Reload bookkeeping from the rewritten files
+        self.ids, self.documents, self.metadatas, self.row_of = [], [], [], {}
+        self._codes = {field: {} for field in FILTER_FIELDS}
+        self._columns = {field: [] for field in FILTER_FIELDS}
+        self._cache.clear()
+        index, self.index = self.index, None
+        self._load()
+        self.index = index
+        return {'bytes_before': before, 'bytes_after': self._disk_bytes()}
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Maintain a local vector store")
+    parser.add_argument("--path", default="./repo-indexer/vector_store", help="Local store directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build-index", help="Train an IVF-PQ index for large stores")
+    build.add_argument("--nlist", type=int, help="Number of IVF cells (default: 4 * sqrt(rows))")
+    build.add_argument("--subspaces", type=int, default=16, help="PQ subspaces (bytes per vector code)")
+    build.add_argument("--sample", type=int, default=100000, help="Vectors used for training")
+    subparsers.add_parser("drop-index", help="Go back to exact search")
+    subparsers.add_parser("compact", help="Drop deleted rows from disk")
+    subparsers.add_parser("info", help="Print store statistics")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(args.path, create=False)
+    if args.command == "build-index":
+        index = store.build_index(args.nlist, args.subspaces, args.sample)
+        print(f"Built IVF-PQ index: {len(index.centroids)} cells, {index.subspaces} subspaces")
+    elif args.command == "drop-index":
+        store.drop_index()
+        print("Index dropped; queries are exact")
+    elif args.command == "compact":
+        sizes = store.compact()
+        print(f"Compacted store: {sizes['bytes_before']} -> {sizes['bytes_after']} bytes")
+    else:
+        print(json.dumps({
+            'path': str(store.path),
+            'count': store.count(),
+            'rows': len(store.ids),
+            'dimension': store.dimension,
+            'index': 'ivfpq' if store.index is not None else 'exact',
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
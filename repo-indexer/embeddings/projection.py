@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Dimension reduction for stored vectors: fitted PCA or Matryoshka-style truncation.
+The projection is saved next to the Chroma collection so the embedder and the
+retriever map documents and queries into the same reduced space.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+PROJECTION_FILENAME = "projection.json"
+METHODS = ('pca', 'truncate')
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class Projection:
+    """Maps encoder vectors to `dimension` components and re-normalizes them.
+
+    `pca` subtracts the fitted mean and projects onto the top principal
+    components; `truncate` keeps the leading coordinates, which suits models
+    trained with Matryoshka losses.
+    """
+
+    def __init__(self, method: str, dimension: int, source_dimension: Optional[int] = None,
+                 mean: Optional[List[float]] = None, components: Optional[List[List[float]]] = None,
+                 encoder: str = "", explained_variance: Optional[float] = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection method: {method} (choose from {', '.join(METHODS)})")
+        if method == 'pca' and (mean is None or components is None):
+            raise ValueError("A pca projection needs a fitted mean and components")
+        self.method = method
+        self.dimension = dimension
+        self.source_dimension = source_dimension
+        self.mean = mean
+        self.components = components
+        self.encoder = encoder
+        self.explained_variance = explained_variance
+        self._matrices = None
+
+    @classmethod
+    def fit_pca(cls, vectors, dimension: int, encoder: str = "") -> 'Projection':
+        """Fit the top `dimension` principal components of a sample of vectors."""
+        import numpy as np
+        data = np.asarray(vectors, dtype=np.float64)
+        if dimension > min(data.shape):
+            raise ValueError(f"Cannot fit {dimension} components from a {data.shape[0]}x{data.shape[1]} sample")
+        mean = data.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(data - mean, full_matrices=False)
+        variance = singular_values ** 2
+        return cls('pca', dimension, source_dimension=data.shape[1], mean=mean.tolist(),
+                   components=vt[:dimension].tolist(), encoder=encoder,
+                   explained_variance=float(variance[:dimension].sum() / variance.sum()))
+
+    @classmethod
+    def truncate(cls, dimension: int, encoder: str = "") -> 'Projection':
+        return cls('truncate', dimension, encoder=encoder)
+
+    def apply(self, vectors: Sequence[Sequence[float]]) -> List[List[float]]:
+        """Project and L2-normalize a batch of vectors."""
+        if not len(vectors):
+            return []
+        if self.method == 'truncate':
+            return [_normalize(vector[:self.dimension]) for vector in vectors]
+
+        import numpy as np
+        if self._matrices is None:
+            self._matrices = (np.asarray(self.mean, dtype=np.float32),
+                              np.asarray(self.components, dtype=np.float32).T)
+        mean, components = self._matrices
+        projected = (np.asarray(vectors, dtype=np.float32) - mean) @ components
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (projected / norms).tolist()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'dimension': self.dimension,
+            'source_dimension': self.source_dimension,
+            'encoder': self.encoder,
+            'explained_variance': self.explained_variance,
+            'mean': self.mean,
+            'components': self.components,
+        }
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Projection':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+
+def encoder_name(backend: str, model_name: str) -> str:
+    """How a projection records the encoder whose vector space it was fitted on."""
+    return f"{backend}:{model_name}"
+
+
+def load_projection(chroma_path: Union[str, Path], encoder: Optional[str] = None) -> Optional[Projection]:
+    """The projection stored alongside a collection, if any.
+
+    With `encoder`, a projection recorded for a different encoder is refused:
+    it was fitted on another vector space.
+    """
+    path = Path(chroma_path) / PROJECTION_FILENAME
+    if not path.exists():
+        return None
+    projection = Projection.load(path)
+    if encoder and projection.encoder and projection.encoder != encoder:
+        raise ValueError(f"Projection at {path} was fitted for encoder {projection.encoder}, not {encoder}; "
+                         f"use the same backend and model or re-create the collection")
+    return projection
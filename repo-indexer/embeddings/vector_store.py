@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Opens the chunk collection on the configured vector store.
+`chroma` is a ChromaDB persistent collection; `local` is the memory-mapped
+store in local_store.py. Both expose the same get/upsert/update/delete/query calls.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(str(Path(__file__).parent))
+
+from local_store import LocalVectorStore, is_local_store
+
+COLLECTION_NAME = "repo_chunks"
+STORES = ('chroma', 'local')
+
+
+def resolve_store(path: str, store: Optional[str] = None) -> str:
+    """Store from the argument, else VECTOR_STORE, else whatever already lives at `path`."""
+    store = store or os.getenv('VECTOR_STORE')
+    if store:
+        if store not in STORES:
+            raise ValueError(f"Unknown vector store: {store} (choose from {', '.join(STORES)})")
+        return store
+    return 'local' if is_local_store(path) else 'chroma'
+
+
+def open_chunk_collection(path: str, create: bool = True, store: Optional[str] = None):
+    """Open (client, collection) for the repo_chunks collection (no model needed).
+
+    The local store has no client; it is returned as None.
+    """
+    if resolve_store(path, store) == 'local':
+        return None, LocalVectorStore(path, create=create)
+
+    try:
+        import chromadb
+        from chromadb.config import Settings
+    except ImportError:
+        raise ImportError("chromadb not installed. Run: pip install chromadb")
+
+    client = chromadb.PersistentClient(
+        path=path,
+        settings=Settings(anonymized_telemetry=False)
+    )
+    if create:
+        collection = client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata={"description": "Code repository chunks with embeddings"}
+        )
+    else:
+        collection = client.get_collection(COLLECTION_NAME)
+    return client, collection
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Assembles model context for a chunk from semantic search and the call graph.
+Runs the Chroma search and the Neo4j subgraph expansion concurrently, drops
+duplicate chunks and packs graph text plus code chunks into a token budget.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from graph.query_graph import (
+    GraphEdge,
+    GraphNode,
+    _default_estimator,
+    get_call_subgraph,
+    get_call_subgraph_by_ids,
+    get_function_ids_for_chunk,
+    get_functions_for_chunk,
+    serialize_graph_for_model,
+)
+from tracing import propagate, span
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _chunk_query_text(chunk: Dict[str, Any], max_chars: int = 2000) -> str:
+    text = chunk.get('document') or chunk.get('text') or ''
+    if text.strip():
+        return text[:max_chars]
+    metadata = chunk.get('metadata') or {}
+    return str(metadata.get('summary') or chunk.get('summary') or '')
+
+
+def _chunk_location(chunk: Dict[str, Any]) -> Optional[Tuple[str, Any, Any]]:
+    metadata = chunk.get('metadata') or chunk
+    filepath = metadata.get('filepath')
+    if not filepath:
+        return None
+    return (str(filepath), metadata.get('start_line'), metadata.get('end_line'))
+
+
+def _semantic_search(retriever, query: str, n: int) -> Tuple[List[Dict[str, Any]], float]:
+    start = time.perf_counter()
+    if retriever is None or not query:
+        return [], _elapsed_ms(start)
+    return list(retriever.search(query, n)), _elapsed_ms(start)
+
+
+def _graph_expand(session, function_ids: List[str], function_names: List[str], direction: str,
+                  hops: int) -> Tuple[List[GraphNode], List[GraphEdge], float]:
+    start = time.perf_counter()
+    if session is None:
+        return [], [], _elapsed_ms(start)
+    if function_ids:
+        nodes, edges = get_call_subgraph_by_ids(session, function_ids, direction=direction, hops=hops)
+    elif function_names:
+        nodes, edges = get_call_subgraph(session, function_names, direction=direction, hops=hops)
+    else:
+        nodes, edges = [], []
+    return nodes, edges, _elapsed_ms(start)
+
+
+def dedupe_chunks(seed: Dict[str, Any], hits: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Drop the seed chunk and repeated hits (same id or same file span)."""
+    seen_ids = set()
+    seen_locations = set()
+    if seed.get('id'):
+        seen_ids.add(seed['id'])
+    seed_location = _chunk_location(seed)
+    if seed_location:
+        seen_locations.add(seed_location)
+
+    unique: List[Dict[str, Any]] = []
+    dropped = 0
+    for hit in hits:
+        location = _chunk_location(hit)
+        if hit.get('id') in seen_ids or (location and location in seen_locations):
+            dropped += 1
+            continue
+        if hit.get('id'):
+            seen_ids.add(hit['id'])
+        if location:
+            seen_locations.add(location)
+        unique.append(hit)
+    return unique, dropped
+
+
+def _chunk_tokens(chunk: Dict[str, Any]) -> int:
+    metadata = chunk.get('metadata') or {}
+    estimate = metadata.get('tokens_estimate')
+    if isinstance(estimate, int) and estimate > 0:
+        return estimate
+    return _default_estimator().estimate_tokens(chunk.get('document') or chunk.get('text') or '')
+
+
+def pack_chunks(chunks: List[Dict[str, Any]], budget: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Greedily keep chunks in rank order while they fit in the token budget."""
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for chunk in chunks:
+        tokens = _chunk_tokens(chunk)
+        if used + tokens > budget:
+            continue
+        packed.append(chunk)
+        used += tokens
+    return packed, used
+
+
+def retrieve_context_for_chunk(chunk: Dict[str, Any], retriever, session,
+                               n_semantic: int = 5, hops: int = 2,
+                               direction: str = 'both', max_tokens: int = 4000,
+                               graph_share: float = 0.3,
+                               link_table: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """Build graph + semantic context for a chunk within a token budget.
+
+    `retriever` is anything exposing `search(query, n)` (normally a
+    CodeRetriever) and `session` a Neo4j session; either may be None to skip
+    that source. Graph expansion starts from the exact Function ids of the
+    chunk/function join (metadata `function_ids` or `link_table`) when
+    available and falls back to matching names found in the chunk text. The
+    returned dict carries per-stage timings in milliseconds.
+    """
+    with span('context.retrieve_for_chunk', chunk_id=chunk.get('id'), n_semantic=n_semantic, hops=hops):
+        return _retrieve_context_for_chunk(chunk, retriever, session, n_semantic, hops, direction,
+                                           max_tokens, graph_share, link_table)
+
+
+def _retrieve_context_for_chunk(chunk: Dict[str, Any], retriever, session, n_semantic: int, hops: int,
+                                direction: str, max_tokens: int, graph_share: float,
+                                link_table: Optional[Dict[str, List[str]]]) -> Dict[str, Any]:
+    total_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    query = _chunk_query_text(chunk)
+    function_ids = get_function_ids_for_chunk(chunk, link_table)
+    function_names = [] if function_ids else get_functions_for_chunk(chunk)
+
+    # The two lookups are I/O bound and independent, so overlap them.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # propagate() keeps the worker-thread spans under this one
+        semantic_future = pool.submit(propagate(_semantic_search), retriever, query, n_semantic + 1)
+        graph_future = pool.submit(propagate(_graph_expand), session, function_ids, function_names, direction, hops)
+        hits, timings['semantic_ms'] = semantic_future.result()
+        nodes, edges, timings['graph_ms'] = graph_future.result()
+
+    start = time.perf_counter()
+    hits, duplicates_dropped = dedupe_chunks(chunk, hits)
+    hits = hits[:n_semantic]
+    timings['dedupe_ms'] = _elapsed_ms(start)
+
+    graph_budget = int(max_tokens * graph_share) if nodes else 0
+    start = time.perf_counter()
+    graph_text = serialize_graph_for_model(nodes, edges, max_tokens=max(graph_budget, 1),
+                                           seeds=function_ids or function_names, estimator=_default_estimator())
+    graph_tokens = _default_estimator().estimate_tokens(graph_text)
+    timings['serialize_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    semantic_chunks, semantic_tokens = pack_chunks(hits, max(0, max_tokens - graph_tokens))
+    timings['pack_ms'] = _elapsed_ms(start)
+    timings['total_ms'] = _elapsed_ms(total_start)
+
+    return {
+        'query': query,
+        'function_ids': function_ids,
+        'function_names': function_names,
+        'semantic_chunks': semantic_chunks,
+        'graph_nodes': nodes,
+        'graph_edges': edges,
+        'graph_text': graph_text,
+        'tokens': {
+            'budget': max_tokens,
+            'graph': graph_tokens,
+            'semantic': semantic_tokens,
+            'total': graph_tokens + semantic_tokens,
+        },
+        'duplicates_dropped': duplicates_dropped,
+        'chunks_over_budget': len(hits) - len(semantic_chunks),
+        'timings': timings,
+    }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Offline join between Chroma chunks and Joern Function nodes.
+Maps every chunk id to the Function ids whose (filepath, line range) overlap it
+and stores the result as a local table, Chroma metadata and COVERS relations.
+"""
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+from chunker.chunk_reader import iter_chunks
+from embeddings.vector_store import STORES, open_chunk_collection
+
+
+def normalize_path(path: str) -> str:
+    """Normalize separators so Windows chunk paths match Joern filenames."""
+    path = str(path).replace('\\', '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return path.rstrip('/')
+
+
+class FunctionSpanIndex:
+    """Function line spans per file, sorted by start line for bisect lookups."""
+
+    def __init__(self):
+        self._spans: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._starts: Dict[str, List[int]] = {}
+        self._longest: Dict[str, int] = {}
+        self._by_suffix: Dict[str, Optional[str]] = {}
+
+    def add(self, filepath: str, start_line: int, end_line: int, function_id: str):
+        key = normalize_path(filepath)
+        self._spans.setdefault(key, []).append((int(start_line), int(end_line), str(function_id)))
+        self._starts.pop(key, None)
+
+    def finalize(self):
+        """Sort spans and build the path-suffix lookup. Call once after adding."""
+        self._by_suffix = {}
+        for key, spans in self._spans.items():
+            spans.sort()
+            self._starts[key] = [s[0] for s in spans]
+            self._longest[key] = max(e - s for s, e, _ in spans)
+            # Joern may record absolute paths; index every path suffix so a
+            # repo-relative chunk path resolves. Ambiguous suffixes map to None.
+            parts = key.split('/')
+            for i in range(len(parts)):
+                suffix = '/'.join(parts[i:])
+                if suffix in self._by_suffix and self._by_suffix[suffix] != key:
+                    self._by_suffix[suffix] = None
+                else:
+                    self._by_suffix[suffix] = key
+
+    def resolve(self, filepath: str) -> Optional[str]:
+        key = normalize_path(filepath)
+        if key in self._spans:
+            return key
+        return self._by_suffix.get(key)
+
+    def overlapping(self, filepath: str, start_line: int, end_line: int) -> List[str]:
+        """Function ids whose span overlaps [start_line, end_line]."""
+        key = self.resolve(filepath)
+        if key is None:
+            return []
+        spans = self._spans[key]
+        starts = self._starts[key]
+        hi = bisect_right(starts, end_line)
+        # No span longer than the longest one can reach back further than this.
+        lo = bisect_right(starts, start_line - self._longest[key] - 1)
+        return [fid for s, e, fid in spans[lo:hi] if e >= start_line]
+
+    def __len__(self) -> int:
+        return sum(len(spans) for spans in self._spans.values())
+
+
+def load_function_spans(session) -> FunctionSpanIndex:
+    """Read all Function nodes with a file and line range from Neo4j."""
+    index = FunctionSpanIndex()
+    result = session.run(
+        "MATCH (f:Function) "
+        "WHERE f.filepath IS NOT NULL AND f.start_line > 0 "
+        "RETURN f.id AS id, f.filepath AS filepath, f.start_line AS start_line, f.end_line AS end_line"
+    )
+    for record in result:
+        end_line = record['end_line'] or record['start_line']
+        index.add(record['filepath'], record['start_line'], end_line, record['id'])
+    index.finalize()
+    return index
+
+
+def iter_chunk_spans(chunks_file: Path, workers: int = 1) -> Iterator[Tuple[str, str, int, int]]:
+    for chunk in iter_chunks(chunks_file, fields=('id', 'filepath', 'start_line', 'end_line'), workers=workers):
+        yield chunk['id'], chunk['filepath'], chunk['start_line'], chunk['end_line']
+
+
+def build_chunk_function_links(chunk_spans: Iterable[Tuple[str, str, int, int]],
+                               index: FunctionSpanIndex) -> Dict[str, List[str]]:
+    links: Dict[str, List[str]] = {}
+    for chunk_id, filepath, start_line, end_line in chunk_spans:
+        function_ids = index.overlapping(filepath, start_line, end_line)
+        if function_ids:
+            links[chunk_id] = function_ids
+    return links
+
+
+def write_link_table(links: Dict[str, List[str]], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(links, f)
+
+
+def load_link_table(path: Path) -> Dict[str, List[str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _batched(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def update_chroma_metadata(collection, links: Dict[str, List[str]], batch_size: int = 500) -> int:
+    """Store function ids on chunk metadata (Chroma only allows scalar values)."""
+    updated = 0
+    for batch in _batched(list(links.items()), batch_size):
+        existing = set(collection.get(ids=[cid for cid, _ in batch], include=[])['ids'])
+        batch = [(cid, fids) for cid, fids in batch if cid in existing]
+        if not batch:
+            continue
+        collection.update(
+            ids=[cid for cid, _ in batch],
+            metadatas=[{'function_ids': ','.join(fids)} for _, fids in batch]
+        )
+        updated += len(batch)
+    return updated
+
+
+def write_covers_relations(session, links: Dict[str, List[str]], batch_size: int = 1000) -> int:
+    """MERGE (:Chunk)-[:COVERS]->(:Function) for every linked chunk."""
+    rows = [{'chunk_id': cid, 'function_ids': fids} for cid, fids in links.items()]
+    for batch in _batched(rows, batch_size):
+        session.run(
+            "UNWIND $rows AS row "
+            "MERGE (c:Chunk {id: row.chunk_id}) "
+            "WITH c, row "
+            "UNWIND row.function_ids AS fid "
+            "MATCH (f:Function {id: fid}) "
+            "MERGE (c)-[:COVERS]->(f)",
+            rows=batch
+        ).consume()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link Chroma chunks to Joern Function nodes")
+    parser.add_argument("--chunks", default="repo-indexer/outputs/chunks.jsonl", help="Path to chunks JSONL file")
+    parser.add_argument("--out", default="repo-indexer/outputs/chunk_functions.json", help="Join table output path")
+    parser.add_argument("--bolt", default="bolt://localhost:7687", help="Neo4j bolt URI")
+    parser.add_argument("--user", default="neo4j", help="Neo4j username")
+    parser.add_argument("--password", default=os.getenv("NEO4J_PASSWORD", "test-password"), help="Neo4j password")
+    parser.add_argument("--chroma-path", help="Also store function ids in this vector store's chunk metadata")
+    parser.add_argument("--store", choices=STORES,
+                        help="Vector store at --chroma-path (default: VECTOR_STORE, else whatever exists there)")
+    parser.add_argument("--no-covers", action="store_true", help="Do not write COVERS relations to Neo4j")
+    parser.add_argument("--workers", type=int, default=1, help="Processes parsing a large chunks file")
+    args = parser.parse_args()
+
+    chunks_file = Path(args.chunks)
+    if not chunks_file.exists():
+        raise SystemExit(f"Chunks file not found: {chunks_file}")
+
+    try:
+        from neo4j import GraphDatabase
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("neo4j driver not installed. Run: pip install neo4j") from exc
+
+    driver = GraphDatabase.driver(args.bolt, auth=(args.user, args.password))
+    try:
+        with driver.session() as session:
+            index = load_function_spans(session)
+            links = build_chunk_function_links(iter_chunk_spans(chunks_file, args.workers), index)
+            if not args.no_covers:
+                session.run("CREATE INDEX chunk_id IF NOT EXISTS FOR (c:Chunk) ON (c.id)").consume()
+                write_covers_relations(session, links)
+    finally:
+        driver.close()
+
+    write_link_table(links, Path(args.out))
+    print(f"Linked {len(links)} chunks to {len(index)} functions. Table: {args.out}")
+
+    if args.chroma_path:
+        _, collection = open_chunk_collection(args.chroma_path, create=False, store=args.store)
+        updated = update_chroma_metadata(collection, links)
+        print(f"Updated function_ids metadata on {updated} stored chunks")
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,7 @@ def create_indexes(session) -> None:
         "CREATE INDEX function_id IF NOT EXISTS FOR (f:Function) ON (f.id)",
         "CREATE INDEX file_path IF NOT EXISTS FOR (f:File) ON (f.path)",
         "CREATE INDEX class_name IF NOT EXISTS FOR (c:Class) ON (c.name)",
+        "CREATE INDEX chunk_id IF NOT EXISTS FOR (c:Chunk) ON (c.id)",
     ]
     for stmt in statements:
         _run_query(session, stmt)
@@ -7,12 +7,30 @@ return a compact, model-friendly text summary of the graph.
 from __future__ import annotations
 
 import re
+import sys
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Any
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import TokenEstimator
+from tracing import span
 
 
 SYMBOL_DEF_REGEX = re.compile(r"\b(def|function|func|public\s+\w+|private\s+\w+|class)\s+([A-Za-z_][A-Za-z0-9_]*)")
 
+_MAX_SIGNATURE_CHARS = 120
+_token_estimator: Optional[TokenEstimator] = None
+
+
+def _default_estimator() -> TokenEstimator:
+    global _token_estimator
+    if _token_estimator is None:
+        _token_estimator = TokenEstimator()
+    return _token_estimator
+
 
 @dataclass
 class GraphNode:
@@ -56,24 +74,37 @@ def get_functions_for_chunk(chunk: Dict[str, Any]) -> List[str]:
     return unique[:10]
 
 
-def get_call_subgraph(session, function_names: List[str], direction: str = 'both', hops: int = 3) -> Tuple[List[GraphNode], List[GraphEdge]]:
-    if not function_names:
-        return [], []
-
-    dir_pattern = {
-        'out': '(:Function)-[r:CALLS*1..$hops]->(g:Function)',
-        'in': '(g:Function)-[r:CALLS*1..$hops]->(:Function)',
-        'both': '(:Function)-[r:CALLS*1..$hops]-(g:Function)'
-    }.get(direction, '(:Function)-[r:CALLS*1..$hops]-(g:Function)')
-
-    query = (
-        "UNWIND $fnames AS fname "
-        "MATCH (f:Function {name: fname})-" + dir_pattern + " "
-        "RETURN DISTINCT f, g, r LIMIT 100"
-    )
+def _node_id(node) -> str:
+    # Prefer the Joern id property; fall back to the driver's internal id.
+    nid = node.get('id')
+    if nid is None:
+        nid = getattr(node, 'element_id', None) or getattr(node, 'id', None)
+    return str(nid)
 
-    result = session.run(query, fnames=function_names, hops=int(hops))
 
+def get_function_ids_for_chunk(chunk: Dict[str, Any], link_table: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """Exact Function node ids for a chunk from the precomputed join (see link_chunks)."""
+    metadata = chunk.get('metadata') or {}
+    ids = metadata.get('function_ids')
+    if isinstance(ids, str):
+        return [fid for fid in ids.split(',') if fid]
+    if isinstance(ids, list):
+        return [str(fid) for fid in ids]
+    if link_table is not None and chunk.get('id') in link_table:
+        return list(link_table[chunk['id']])
+    return []
+
+
+def _call_pattern(direction: str, hops: int) -> str:
+    # Variable-length bounds cannot be query parameters, so inline the hop count.
+    hops = max(1, int(hops))
+    return {
+        'out': f'(f)-[r:CALLS*1..{hops}]->(g:Function)',
+        'in': f'(g:Function)-[r:CALLS*1..{hops}]->(f)',
+    }.get(direction, f'(f)-[r:CALLS*1..{hops}]-(g:Function)')
+
+
+def _collect_subgraph(result) -> Tuple[List[GraphNode], List[GraphEdge]]:
     nodes: Dict[str, GraphNode] = {}
     edges: List[GraphEdge] = []
 
@@ -85,7 +116,7 @@ def get_call_subgraph(session, function_names: List[str], direction: str = 'both
         for node in (f, g):
             if node is None:
                 continue
-            nid = str(node.get('id', node.id))
+            nid = _node_id(node)
             if nid not in nodes:
                 nodes[nid] = GraphNode(
                     id=nid,
@@ -100,46 +131,166 @@ def get_call_subgraph(session, function_names: List[str], direction: str = 'both
         # Relationships path can be list
         if isinstance(rels, list):
             for r in rels:
-                src = str(r.start_node.get('id', r.start_node.id))
-                dst = str(r.end_node.get('id', r.end_node.id))
+                src = _node_id(r.start_node)
+                dst = _node_id(r.end_node)
                 edges.append(GraphEdge(source=src, target=dst, type='CALLS'))
         else:
             if rels is not None:
-                src = str(rels.start_node.get('id', rels.start_node.id))
-                dst = str(rels.end_node.get('id', rels.end_node.id))
+                src = _node_id(rels.start_node)
+                dst = _node_id(rels.end_node)
                 edges.append(GraphEdge(source=src, target=dst, type='CALLS'))
 
     return list(nodes.values()), edges
 
 
-def _truncate(text: str, max_chars: int) -> str:
-    return text if len(text) <= max_chars else text[: max_chars - 3] + '...'
-
-
-def serialize_graph_for_model(nodes: List[GraphNode], edges: List[GraphEdge], max_tokens: int = 800) -> str:
-    # rough char budget ~ 4 chars/token
-    max_chars = max(256, int(max_tokens * 4))
-    id_to_node = {n.id: n for n in nodes}
-
-    lines: List[str] = []
-    lines.append("CALL GRAPH:")
-
-    # List nodes with short info
-    for idx, n in enumerate(nodes, 1):
-        loc = f"{n.filepath}:{n.start_line}-{n.end_line}" if n.filepath else "?"
-        sig = n.signature or ''
-        lines.append(f"{idx}) {n.name} ({loc}) {sig}")
-
-    # List edges
-    lines.append("Edges (CALLS):")
-    for e in edges[:200]:
-        src = id_to_node.get(e.source)
-        dst = id_to_node.get(e.target)
-        if src and dst:
-            lines.append(f"  {src.name} -> {dst.name}")
+def get_call_subgraph(session, function_names: List[str], direction: str = 'both', hops: int = 3) -> Tuple[List[GraphNode], List[GraphEdge]]:
+    if not function_names:
+        return [], []
 
-    text = "\n".join(lines)
-    return _truncate(text, max_chars)
+    query = (
+        "UNWIND $fnames AS fname "
+        "MATCH (f:Function {name: fname}) "
+        "MATCH " + _call_pattern(direction, hops) + " "
+        "RETURN DISTINCT f, g, r LIMIT 100"
+    )
+    with span('graph.get_call_subgraph', seeds=len(function_names), direction=direction, hops=hops) as s:
+        nodes, edges = _collect_subgraph(session.run(query, fnames=function_names))
+        s.set_attribute('nodes', len(nodes))
+        s.set_attribute('edges', len(edges))
+    return nodes, edges
 
 
+def get_call_subgraph_by_ids(session, function_ids: List[str], direction: str = 'both', hops: int = 3) -> Tuple[List[GraphNode], List[GraphEdge]]:
+    """Like get_call_subgraph, but starts from exact Function ids (indexed lookup)."""
+    if not function_ids:
+        return [], []
 
+    query = (
+        "UNWIND $fids AS fid "
+        "MATCH (f:Function {id: fid}) "
+        "MATCH " + _call_pattern(direction, hops) + " "
+        "RETURN DISTINCT f, g, r LIMIT 100"
+    )
+    with span('graph.get_call_subgraph_by_ids', seeds=len(function_ids), direction=direction, hops=hops) as s:
+        nodes, edges = _collect_subgraph(session.run(query, fids=function_ids))
+        s.set_attribute('nodes', len(nodes))
+        s.set_attribute('edges', len(edges))
+    return nodes, edges
+
+
+def rank_graph_nodes(nodes: List[GraphNode], edges: List[GraphEdge],
+                     seeds: Optional[Iterable[str]] = None) -> Tuple[List[GraphNode], Dict[str, Set[str]]]:
+    """Order nodes by hop distance from the seeds, then by degree.
+
+    Seeds may be node ids or function names. Returns the ranked nodes and the
+    de-duplicated outgoing CALLS adjacency keyed by node id.
+    """
+    outgoing: Dict[str, Set[str]] = {n.id: set() for n in nodes}
+    neighbours: Dict[str, Set[str]] = {n.id: set() for n in nodes}
+    for e in edges:
+        if e.source in outgoing and e.target in outgoing:
+            outgoing[e.source].add(e.target)
+            if e.source != e.target:
+                neighbours[e.source].add(e.target)
+                neighbours[e.target].add(e.source)
+
+    seed_set = set(seeds or ())
+    frontier = deque(n.id for n in nodes if n.id in seed_set or n.name in seed_set)
+    distance: Dict[str, int] = {nid: 0 for nid in frontier}
+    while frontier:
+        nid = frontier.popleft()
+        for other in neighbours[nid]:
+            if other not in distance:
+                distance[other] = distance[nid] + 1
+                frontier.append(other)
+
+    unreachable = len(nodes) + 1
+    ranked = sorted(nodes, key=lambda n: (distance.get(n.id, unreachable), -len(neighbours[n.id]), n.name or '', n.id))
+    return ranked, outgoing
+
+
+def serialize_graph_for_model(nodes: List[GraphNode], edges: List[GraphEdge], max_tokens: int = 800,
+                              seeds: Optional[Iterable[str]] = None,
+                              estimator: Optional[TokenEstimator] = None) -> str:
+    """Render the most relevant part of a call graph within a token budget.
+
+    Nodes are emitted in rank order (see rank_graph_nodes) together with the
+    edges to nodes already emitted, so edges near the seeds are never cut in
+    favour of far-away nodes. File paths are listed once and referenced by
+    alias, and edges are grouped by caller and referenced by node number.
+    """
+    estimator = estimator or _default_estimator()
+
+    def cost(line: str) -> int:
+        return estimator.estimate_tokens(line) + 1  # + newline
+
+    ranked, outgoing = rank_graph_nodes(nodes, edges, seeds)
+    incoming: Dict[str, Set[str]] = {node_id: set() for node_id in outgoing}
+    for caller, callees in outgoing.items():
+        for callee in callees:
+            incoming[callee].add(caller)
+
+    header = "CALL GRAPH:"
+    edge_header = "Edges (CALLS, caller -> callees by node number):"
+    # Keep room for the edge header and the trailing omission note.
+    reserve = cost(edge_header) + cost(f"... {len(ranked)} more nodes omitted")
+    used = cost(header)
+
+    file_aliases: Dict[str, str] = {}
+    file_lines: List[str] = []
+    node_lines: List[str] = []
+    edge_groups: Dict[int, List[int]] = {}
+    numbers: Dict[str, int] = {}
+
+    for node in ranked:
+        alias = file_aliases.get(node.filepath) if node.filepath else None
+        file_line = None
+        if node.filepath and alias is None:
+            alias = f"F{len(file_aliases) + 1}"
+            file_line = f"[{alias}] {node.filepath}"
+
+        number = len(numbers) + 1
+        loc = f"{alias}:{node.start_line}-{node.end_line}" if alias else "?"
+        line = f"{number}) {node.name} ({loc})"
+        if node.signature:
+            line += f" {node.signature[:_MAX_SIGNATURE_CHARS]}"
+
+        node_cost = cost(line) + (cost(file_line) if file_line else 0)
+        if used + node_cost + reserve > max_tokens:
+            break
+        used += node_cost
+        numbers[node.id] = number
+        node_lines.append(line)
+        if file_line:
+            file_aliases[node.filepath] = alias
+            file_lines.append(file_line)
+
+        # Edges between this node and everything already emitted, in rank order.
+        # Only this node's own adjacency is visited, not every emitted node.
+        pending: List[Tuple[int, int]] = []
+        for callee in outgoing[node.id]:
+            if callee in numbers:
+                pending.append((number, numbers[callee]))
+        for caller in incoming[node.id]:
+            if caller != node.id and caller in numbers:
+                pending.append((numbers[caller], number))
+        for src, dst in sorted(pending, key=lambda pair: min(pair)):
+            edge_cost = cost(f"  {src} -> {dst}")
+            if used + edge_cost + reserve > max_tokens:
+                break
+            used += edge_cost
+            edge_groups.setdefault(src, []).append(dst)
+
+    lines = [header] + file_lines + node_lines
+    if edge_groups:
+        lines.append(edge_header)
+        for src in sorted(edge_groups):
+            lines.append(f"  {src} -> {', '.join(str(d) for d in sorted(edge_groups[src]))}")
+    omitted = len(ranked) - len(numbers)
+    if omitted:
+        lines.append(f"... {omitted} more nodes omitted")
+
+    # Per-line estimates are not strictly additive; trim from the tail if needed.
+    while len(lines) > 1 and estimator.estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop()
+    return "\n".join(lines)
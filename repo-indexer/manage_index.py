@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for an existing index (chunks.jsonl + ChromaDB).
+`update --since <commit>` re-chunks and re-embeds only files changed in git;
+`gc` deletes vectors whose chunk ids are no longer in chunks.jsonl.
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# Add modules to path
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "inputandfilehandling"))
+
+from chunker.chunk_reader import iter_chunk_records, iter_chunks, loads
+from chunker.chunker import RepoChunker
+from chunker.git_changes import FileChanges, changed_files, git_head
+from chunker.interval_index import INDEX_FILENAME
+from embeddings.encoders import BACKENDS
+from embeddings.vector_store import STORES
+from filetraversal import is_text_file
+
+# Fields the rewrite needs per kept chunk; the original line is copied verbatim
+REWRITE_FIELDS = ('id', 'filepath', 'start_line', 'end_line', 'language', 'tokens_estimate', 'aliases')
+
+
+def _norm(path: str) -> str:
+    return str(path).replace('\\', '/')
+
+
+def _batched(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class IncrementalUpdater:
+    """Bring chunks.jsonl, the chunk index, the manifest and Chroma up to date with git."""
+
+    def __init__(self, root_path: str, output_dir: str,
+                 chroma_path: str = "./repo-indexer/chroma_store",
+                 model_name: str = "all-mpnet-base-v2", batch_size: int = 64,
+                 embed: bool = True, backend: Optional[str] = None, onnx_path: Optional[str] = None,
+                 store: Optional[str] = None, **chunker_kwargs):
+        self.root_path = Path(root_path)
+        self.output_dir = Path(output_dir)
+        self.chroma_path = chroma_path
+        self.model_name = model_name
+        self.batch_size = batch_size
+        # Must match the run that built the index, or new vectors land in another space
+        self.backend = backend
+        self.onnx_path = onnx_path
+        self.store = store
+        self.embed = embed
+        self.chunker = RepoChunker(root_path=root_path, output_dir=output_dir, **chunker_kwargs)
+        self.chunks_file = self.output_dir / "chunks.jsonl"
+        self.manifest_file = self.output_dir / "manifest.json"
+        self._new_records: List[Dict[str, Any]] = []
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_file.exists():
+            return {}
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _should_index(self, relative_path: str) -> bool:
+        """Apply the chunker's ignore patterns and text sniffing to a git path."""
+        parts = Path(relative_path).parts
+        if any(fnmatch.fnmatch(part, pattern) for part in parts for pattern in RepoChunker.IGNORE_PATTERNS):
+            return False
+        full_path = self.root_path / relative_path
+        return full_path.is_file() and is_text_file(str(full_path))
+
+    def _rewrite_chunks(self, changes: FileChanges, stats: Dict[str, Any]) -> Set[str]:
+        """Stream chunks.jsonl dropping stale files, then append re-chunked files.
+
+        Aliases at stale paths are pruned; files that were only aliases of a
+        dropped chunk are re-chunked on their own (re-chunked files are not
+        deduplicated, which only happens in a full run). Returns the dropped ids.
+        """
+        stale_paths = {_norm(p) for p in changes.stale_paths()}
+        dropped_ids: Set[str] = set()
+        orphaned: Set[str] = set()
+        kept_files: Set[str] = set()
+        index = self.chunker.interval_index
+        tmp_file = self.chunks_file.with_suffix('.jsonl.tmp')
+
+        with open(tmp_file, 'w', encoding='utf-8') as out:
+            if self.chunks_file.exists():
+                for record in iter_chunk_records(self.chunks_file, fields=REWRITE_FIELDS):
+                    chunk = record.chunk
+                    aliases = chunk.get('aliases') or []
+                    live_aliases = [a for a in aliases if _norm(a['filepath']) not in stale_paths]
+                    if _norm(chunk['filepath']) in stale_paths:
+                        dropped_ids.add(chunk['id'])
+                        orphaned.update(_norm(a['filepath']) for a in live_aliases)
+                        continue
+                    if len(live_aliases) == len(aliases):
+                        line = record.line.decode('utf-8')
+                        out.write(line if line.endswith('\n') else line + '\n')
+                    else:
+                        chunk_data = loads(record.line)
+                        chunk_data['aliases'] = live_aliases
+                        if not live_aliases:
+                            del chunk_data['aliases']
+                        out.write(json.dumps(chunk_data) + '\n')
+                    index.add(chunk['filepath'], chunk['start_line'], chunk['end_line'], chunk['id'])
+                    for alias in live_aliases:
+                        index.add(alias['filepath'], alias['start_line'], alias['end_line'], chunk['id'])
+                    kept_files.add(chunk['filepath'])
+                    stats['chunks_reused'] += 1
+                    stats['_languages'][chunk['language']] = stats['_languages'].get(chunk['language'], 0) + 1
+                    stats['_tokens'] += chunk.get('tokens_estimate', 0)
+
+            for relative_path in sorted(changes.paths_to_chunk() | orphaned):
+                if not self._should_index(relative_path):
+                    stats['files_skipped'] += 1
+                    continue
+                records = self.chunker.chunk_file_records(str(self.root_path / relative_path))
+                stats['files_rechunked'] += 1
+                for record in records:
+                    out.write(json.dumps(record) + '\n')
+                    stats['_languages'][record['language']] = stats['_languages'].get(record['language'], 0) + 1
+                    stats['_tokens'] += record['tokens_estimate']
+                    self._new_records.append(record)
+
+        os.replace(tmp_file, self.chunks_file)
+        stats['files_unchanged'] = len(kept_files)
+        return dropped_ids
+
+    def _sync_chroma(self, dropped_ids: Set[str], stats: Dict[str, Any]):
+        """Delete stale ids and embed only chunks Chroma does not have yet."""
+        from embeddings.embed_chroma import ChromaEmbedder
+
+        embedder = ChromaEmbedder(
+            chroma_path=self.chroma_path,
+            model_name=self.model_name,
+            batch_size=self.batch_size,
+            backend=self.backend,
+            onnx_path=self.onnx_path,
+            store=self.store
+        )
+        collection = embedder.collection
+
+        new_ids = {r['id'] for r in self._new_records}
+        stale_ids = sorted(dropped_ids - new_ids)
+        for batch in _batched(stale_ids, 500):
+            collection.delete(ids=batch)
+        stats['stale_ids_deleted'] = len(stale_ids)
+
+        for batch in _batched(self._new_records, self.batch_size):
+            # Ids are content-derived: unchanged chunks of edited files only move
+            to_embed, moved, unchanged, existing = embedder.partition_with_existing(batch)
+            stats['chunks_moved'] += embedder.update_positions(moved)
+            stats['chunks_already_embedded'] += unchanged + len(moved)
+            if not to_embed:
+                continue
+            counts = embedder.insert_batch(to_embed, embedder.embed_batch(to_embed), force=True, existing=existing)
+            stats['chunks_embedded'] += counts['inserted'] + counts['updated']
+            stats['chunks_failed'] += counts['failed']
+        embedder.close()
+        stats['embedding_errors'] = len(embedder.errors)
+        stats['embedding_timings'] = embedder.timing_summary()
+
+    def update(self, since: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Apply the changes between `since` (default: last indexed commit) and the working tree."""
+        started = time.perf_counter()
+        manifest = self._load_manifest()
+        since = since or manifest.get('git_commit')
+        if not since:
+            raise ValueError("No --since given and the manifest records no git_commit")
+
+        changes = changed_files(self.root_path, since)
+        stats: Dict[str, Any] = {
+            'since': since,
+            'head': git_head(self.root_path),
+            'files_added': len(changes.added),
+            'files_modified': len(changes.modified),
+            'files_deleted': len(changes.deleted),
+            'files_renamed': len(changes.renamed),
+            'files_rechunked': 0,
+            'files_skipped': 0,
+            'files_unchanged': 0,
+            'chunks_reused': 0,
+            'chunks_new': 0,
+            'stale_ids_deleted': 0,
+            'chunks_embedded': 0,
+            'chunks_already_embedded': 0,
+            'chunks_moved': 0,
+            'chunks_failed': 0,
+            '_languages': {},
+            '_tokens': 0,
+        }
+        if dry_run:
+            stats['paths_to_chunk'] = sorted(changes.paths_to_chunk())
+            stats['stale_paths'] = sorted(changes.stale_paths())
+            for key in ('_languages', '_tokens'):
+                stats.pop(key)
+            return stats
+
+        self._new_records = []
+        dropped_ids = self._rewrite_chunks(changes, stats)
+        stats['chunks_new'] = len(self._new_records)
+        self.chunker.write_interval_index()
+
+        if self.embed:
+            self._sync_chroma(dropped_ids, stats)
+
+        # Work avoided relative to a full re-run
+        stats['embeddings_avoided'] = stats['chunks_reused'] + stats['chunks_already_embedded']
+        stats['elapsed_s'] = round(time.perf_counter() - started, 3)
+
+        languages = stats.pop('_languages')
+        total_tokens = stats.pop('_tokens')
+        total_chunks = stats['chunks_reused'] + stats['chunks_new']
+        manifest.update({
+            'total_chunks': total_chunks,
+            'chunks_by_language': languages,
+            'total_tokens': total_tokens,
+            'avg_chunk_tokens': total_tokens // total_chunks if total_chunks else 0,
+            'timestamp': self.chunker.stats['timestamp'],
+            # The profile covers only the re-chunked files, so it stays with this update
+            'last_update': {**stats, 'profile': self.chunker.profile.to_dict()},
+        })
+        if stats['head']:
+            manifest['git_commit'] = stats['head']
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        return stats
+
+
+def live_chunk_ids(chunks_file: Path, workers: int = 1) -> Set[str]:
+    """Ids of all chunks currently in chunks.jsonl (streamed, ids only)."""
+    return {chunk['id'] for chunk in iter_chunks(chunks_file, fields=('id',), workers=workers)}
+
+
+def iter_collection_ids(collection, page_size: int = 1000) -> Iterator[List[str]]:
+    """Page through all ids of a collection without loading embeddings or documents."""
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=[])['ids']
+        if not page:
+            return
+        yield page
+        offset += len(page)
+
+
+def collect_garbage(collection, live_ids: Set[str], page_size: int = 1000,
+                    batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Delete vectors whose ids are no longer produced by the chunker."""
+    started = time.perf_counter()
+    scanned = 0
+    orphans: List[str] = []
+    # Collect first: deleting while paging by offset would skip ids.
+    for page in iter_collection_ids(collection, page_size):
+        scanned += len(page)
+        orphans.extend(chunk_id for chunk_id in page if chunk_id not in live_ids)
+
+    deleted = 0
+    if not dry_run:
+        for batch in _batched(orphans, batch_size):
+            collection.delete(ids=batch)
+            deleted += len(batch)
+
+    return {
+        'scanned': scanned,
+        'live': len(live_ids),
+        'orphans': len(orphans),
+        'deleted': deleted,
+        'elapsed_s': round(time.perf_counter() - started, 3),
+    }
+
+
+def compact_chroma_store(chroma_path: str) -> Dict[str, int]:
+    """VACUUM Chroma's SQLite store to return freed pages to the filesystem.
+
+    The HNSW segment only marks deleted labels and reuses them on later
+    inserts, so this reclaims the SQLite side (documents, metadata, WAL).
+    """
+    db_file = Path(chroma_path) / "chroma.sqlite3"
+    if not db_file.exists():
+        return {'bytes_before': 0, 'bytes_after': 0}
+    before = db_file.stat().st_size
+    conn = sqlite3.connect(str(db_file))
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return {'bytes_before': before, 'bytes_after': db_file.stat().st_size}
+
+
+def print_update_summary(stats: Dict[str, Any]):
+    """Print a human-readable summary of an incremental update."""
+    print(f"\nIncremental update {stats['since'][:12]} -> {(stats.get('head') or 'working tree')[:12]}")
+    print(f"Files: +{stats['files_added']} ~{stats['files_modified']} -{stats['files_deleted']} "
+          f"renamed {stats['files_renamed']}; re-chunked {stats['files_rechunked']}, "
+          f"untouched {stats['files_unchanged']}")
+    print(f"Chunks: reused {stats['chunks_reused']}, new {stats['chunks_new']}, "
+          f"stale ids deleted {stats['stale_ids_deleted']}")
+    print(f"Embeddings: computed {stats['chunks_embedded']}, avoided {stats['embeddings_avoided']}, "
+          f"failed {stats['chunks_failed']}")
+    print(f"Elapsed: {stats['elapsed_s']}s")
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Maintain an existing repository index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update = subparsers.add_parser("update", help="Re-index only files changed in git")
+    update.add_argument("--since", help="Commit to diff from (default: git_commit in manifest.json)")
+    update.add_argument("--root", required=True, help="Repository root path (must be inside a git repo)")
+    update.add_argument("--out", default="repo-indexer/outputs", help="Output directory of the chunker")
+    update.add_argument("--chroma-path", default="./repo-indexer/chroma_store", help="Path to ChromaDB storage")
+    update.add_argument("--model", default="all-mpnet-base-v2", help="SentenceTransformer model name")
+    update.add_argument("--backend", choices=BACKENDS,
+                        help="Encoder backend the index was built with (default: ENCODER_BACKEND or torch)")
+    update.add_argument("--onnx-path", help="Directory written by export_onnx.py (onnx backend)")
+    update.add_argument("--store", choices=STORES,
+                        help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path)")
+    update.add_argument("--batch-size", type=int, default=64, help="Batch size for embedding generation")
+    update.add_argument("--no-embed", action="store_true", help="Only update chunks, index and manifest")
+    update.add_argument("--dry-run", action="store_true", help="Only list the files that would be processed")
+
+    gc = subparsers.add_parser("gc", help="Delete vectors of chunks no longer in chunks.jsonl")
+    gc.add_argument("--chunks", default="repo-indexer/outputs/chunks.jsonl", help="Path to chunks JSONL file")
+    gc.add_argument("--chroma-path", default="./repo-indexer/chroma_store", help="Path to ChromaDB storage")
+    gc.add_argument("--store", choices=STORES,
+                    help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path)")
+    gc.add_argument("--page-size", type=int, default=1000, help="Ids fetched per collection page")
+    gc.add_argument("--batch-size", type=int, default=500, help="Ids deleted per request")
+    gc.add_argument("--workers", type=int, default=1, help="Processes parsing a large chunks file")
+    gc.add_argument("--compact", action="store_true", help="Reclaim disk space afterwards (VACUUM for Chroma, rewrite for the local store)")
+    gc.add_argument("--dry-run", action="store_true", help="Only report orphans")
+
+    args = parser.parse_args()
+
+    model_name = os.getenv('SENTENCE_MODEL', getattr(args, 'model', ''))
+    chroma_path = os.getenv('CHROMA_PATH', args.chroma_path)
+
+    try:
+        if args.command == "update":
+            updater = IncrementalUpdater(
+                root_path=args.root,
+                output_dir=args.out,
+                chroma_path=chroma_path,
+                model_name=model_name,
+                batch_size=args.batch_size,
+                embed=not args.no_embed,
+                backend=args.backend,
+                onnx_path=args.onnx_path,
+                store=args.store
+            )
+            stats = updater.update(since=args.since, dry_run=args.dry_run)
+            if args.dry_run:
+                print(json.dumps(stats, indent=2))
+            else:
+                print_update_summary(stats)
+        elif args.command == "gc":
+            from embeddings.vector_store import open_chunk_collection
+
+            chunks_file = Path(args.chunks)
+            if not chunks_file.exists():
+                raise FileNotFoundError(f"Chunks file not found: {chunks_file}")
+            _, collection = open_chunk_collection(chroma_path, create=False, store=args.store)
+            stats = collect_garbage(collection, live_chunk_ids(chunks_file, args.workers), page_size=args.page_size,
+                                    batch_size=args.batch_size, dry_run=args.dry_run)
+            print(f"Scanned {stats['scanned']} vectors, {stats['live']} live chunks, "
+                  f"{stats['orphans']} orphans, reclaimed {stats['deleted']}")
+            if args.compact and not args.dry_run:
+                if hasattr(collection, 'compact'):
+                    # Local store: rewrite vectors and records without the deleted rows
+                    sizes = collection.compact()
+                    print(f"Compacted local store: {sizes['bytes_before']} -> {sizes['bytes_after']} bytes")
+                else:
+                    sizes = compact_chroma_store(chroma_path)
+                    print(f"Compacted chroma.sqlite3: {sizes['bytes_before']} -> {sizes['bytes_after']} bytes")
+    except Exception as e:
+        logging.error(f"Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
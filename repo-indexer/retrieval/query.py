@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Query interface for retrieving code chunks from ChromaDB using semantic search.
-Wraps SentenceTransformers for query embeddings and exposes simple filters.
+Embeds queries with the same pluggable encoder backend as the embedder.
 Used by pilots and downstream tools to fetch relevant code context.
 """
 
@@ -13,30 +13,38 @@ import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-except ImportError:
-    chromadb = None
-
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    SentenceTransformer = None
+sys.path.append(str(Path(__file__).parent.parent))
+from chunker.interval_index import ChunkIntervalIndex
+from embeddings.encoders import BACKENDS, load_encoder, resolve_backend
+from embeddings.projection import encoder_name, load_projection
+from embeddings.vector_store import STORES, open_chunk_collection, resolve_store
+from tracing import span
 
 
 class CodeRetriever:
     """Code chunk retrieval from ChromaDB."""
     
     def __init__(self, chroma_path: str = "./repo-indexer/chroma_store", 
-                 model_name: str = "all-mpnet-base-v2"):
+                 model_name: str = "all-mpnet-base-v2",
+                 chunk_index_path: Optional[str] = None,
+                 backend: Optional[str] = None, onnx_path: Optional[str] = None,
+                 store: Optional[str] = None):
         self.chroma_path = chroma_path
+        self.store = resolve_store(chroma_path, store)
         self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.onnx_path = onnx_path
         self.client = None
         self.collection = None
-        self.model = None
+        self.encoder = None
+        self.interval_index = None
+        self.projection = None
         
         self._setup_logging()
+        if chunk_index_path and Path(chunk_index_path).exists():
+            self.interval_index = ChunkIntervalIndex.load(chunk_index_path)
+        # Queries must land in the same reduced space as the stored vectors
+        self.projection = load_projection(chroma_path, encoder_name(self.backend, model_name))
         self._setup_model()
         self._setup_chroma()
     
@@ -49,51 +57,29 @@ class CodeRetriever:
         )
     
     def _setup_model(self):
-        """Setup SentenceTransformer model."""
-        if not SentenceTransformer:
-            raise ImportError("sentence-transformers not installed. Run: pip install sentence-transformers")
-        
+        """Setup the query encoder."""
         try:
-            self.model = SentenceTransformer(self.model_name)
-            logging.info(f"Loaded model: {self.model_name}")
+            self.encoder = load_encoder(self.backend, self.model_name, self.onnx_path)
         except Exception as e:
-            logging.error(f"Failed to load model {self.model_name}: {e}")
+            logging.error(f"Failed to load {self.backend} model {self.model_name}: {e}")
             raise
     
     def _setup_chroma(self):
-        """Setup ChromaDB client and collection."""
-        if not chromadb:
-            raise ImportError("chromadb not installed. Run: pip install chromadb")
-        
+        """Connect to the existing chunk collection."""
         try:
-            # Connect to persistent client
-            self.client = chromadb.PersistentClient(
-                path=self.chroma_path,
-                settings=Settings(anonymized_telemetry=False)
-            )
-            
-            # Get collection
-            self.collection = self.client.get_collection("repo_chunks")
-            logging.info(f"Connected to ChromaDB at {self.chroma_path}")
+            self.client, self.collection = open_chunk_collection(self.chroma_path, create=False, store=self.store)
+            logging.info(f"Connected to {self.store} vector store at {self.chroma_path}")
         except Exception as e:
-            logging.error(f"Failed to connect to ChromaDB: {e}")
+            logging.error(f"Failed to connect to {self.store} vector store: {e}")
             raise
     
-    def _normalize_embedding(self, embedding: List[float]) -> List[float]:
-        """Normalize embedding to float32."""
-        import numpy as np
-        embedding_array = np.array(embedding, dtype=np.float32)
-        # L2 normalize
-        norm = np.linalg.norm(embedding_array)
-        if norm > 0:
-            embedding_array = embedding_array / norm
-        return embedding_array.tolist()
-    
     def embed_query(self, query: str) -> List[float]:
         """Generate embedding for query text."""
         try:
-            embedding = self.model.encode([query], convert_to_tensor=False)[0]
-            return self._normalize_embedding(embedding.tolist())
+            embedding = self.encoder.encode([query])
+            if self.projection:
+                embedding = self.projection.apply(embedding)
+            return embedding[0]
         except Exception as e:
             logging.error(f"Error generating query embedding: {e}")
             raise
@@ -102,16 +88,20 @@ class CodeRetriever:
                where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search for similar code chunks."""
         try:
-            # Generate query embedding
-            query_embedding = self.embed_query(query)
-            
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where,
-                include=['documents', 'metadatas', 'distances']
-            )
+            with span('retriever.search', n_results=n_results, filtered=where is not None, store=self.store) as s:
+                # Generate query embedding
+                with span('retriever.embed_query', backend=self.backend):
+                    query_embedding = self.embed_query(query)
+                
+                # Search in the vector store
+                with span('retriever.vector_query'):
+                    results = self.collection.query(
+                        query_embeddings=[query_embedding],
+                        n_results=n_results,
+                        where=where,
+                        include=['documents', 'metadatas', 'distances']
+                    )
+                s.set_attribute('hits', len(results['ids'][0]))
             
             # Format results
             formatted_results = []
@@ -135,11 +125,59 @@ class CodeRetriever:
         where_clause = {"language": language}
         return self.search(query, n_results, where_clause)
     
-    def search_by_file(self, query: str, filepath: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for chunks in a specific file."""
-        where_clause = {"filepath": filepath}
+    def search_by_file(self, query: str, filepath: str, n_results: int = 5,
+                       start_line: Optional[int] = None, end_line: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search for chunks in a specific file, optionally within a line range."""
+        where_clause: Dict[str, Any] = {"filepath": filepath}
+        if start_line is not None or end_line is not None:
+            start_line = start_line if start_line is not None else 1
+            end_line = end_line if end_line is not None else start_line
+            where_clause = {"$and": [
+                {"filepath": filepath},
+                {"start_line": {"$lte": end_line}},
+                {"end_line": {"$gte": start_line}}
+            ]}
+        
+        if self.interval_index is not None:
+            # Resolve candidates locally first: skip embedding the query when
+            # nothing can match and never ask Chroma for more than exists.
+            if start_line is not None:
+                candidate_ids = self.interval_index.query(filepath, start_line, end_line)
+            else:
+                candidate_ids = self.interval_index.chunks_for_file(filepath)
+            if not candidate_ids:
+                return []
+            # Candidates include aliased copies, stored under their canonical chunk's
+            # path where the filepath filter cannot reach them, so rank the ids directly
+            return self.search_ids(query, candidate_ids, n_results)
+        
         return self.search(query, n_results, where_clause)
     
+    def _distance(self, query_embedding: List[float], embedding: List[float]) -> float:
+        """Distance as the store's own query reports it (its metric over the stored vectors)."""
+        space = 'cosine' if self.store == 'local' else (self.collection.metadata or {}).get('hnsw:space', 'l2')
+        if space == 'l2':
+            return sum((q - v) ** 2 for q, v in zip(query_embedding, embedding))
+        dot = sum(q * v for q, v in zip(query_embedding, embedding))
+        if space == 'cosine' and self.store != 'local':
+            norms = (sum(q * q for q in query_embedding) * sum(v * v for v in embedding)) ** 0.5
+            dot = dot / norms if norms else 0.0
+        return 1 - dot
+    
+    def search_ids(self, query: str, chunk_ids: List[str], n_results: int = 5) -> List[Dict[str, Any]]:
+        """Rank a known, small set of chunk ids against the query without a vector search."""
+        with span('retriever.search_ids', candidates=len(chunk_ids), store=self.store):
+            query_embedding = self.embed_query(query)
+            results = self.collection.get(ids=list(dict.fromkeys(chunk_ids)),
+                                          include=['documents', 'metadatas', 'embeddings'])
+        ranked = sorted(
+            ({'id': chunk_id, 'document': document, 'metadata': metadata,
+              'similarity_score': 1 - self._distance(query_embedding, [float(v) for v in embedding])}
+             for chunk_id, document, metadata, embedding in zip(results['ids'], results['documents'],
+                                                                results['metadatas'], results['embeddings'])),
+            key=lambda result: -result['similarity_score'])
+        return ranked[:n_results]
+    
     def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific chunk by ID."""
         try:
@@ -197,6 +235,8 @@ def format_results(results: List[Dict[str, Any]], format_type: str = "json") ->
             output.append(f"  Language: {metadata.get('language', 'Unknown')}")
             output.append(f"  Type: {metadata.get('node_type', 'Unknown')}")
             output.append(f"  Lines: {metadata.get('start_line', '?')}-{metadata.get('end_line', '?')}")
+            if metadata.get('aliases'):
+                output.append(f"  Also at: {metadata['aliases'].replace(';', ', ')}")
             output.append(f"  Similarity: {result['similarity_score']:.4f}")
             output.append(f"  Summary: {metadata.get('summary', 'No summary')}")
             output.append(f"  Code:\n{result['document'][:200]}...")
@@ -213,10 +253,19 @@ def main():
     parser.add_argument("--n", type=int, default=5, help="Number of results to return")
     parser.add_argument("--chroma-path", default="./repo-indexer/chroma_store",
                        help="Path to ChromaDB storage")
+    parser.add_argument("--store", choices=STORES,
+                       help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path)")
     parser.add_argument("--model", default="all-mpnet-base-v2",
                        help="SentenceTransformer model name")
+    parser.add_argument("--backend", choices=BACKENDS,
+                       help="Encoder backend (default: ENCODER_BACKEND or torch); use the one the collection was embedded with")
+    parser.add_argument("--onnx-path", help="Directory written by export_onnx.py (onnx backend)")
     parser.add_argument("--language", help="Filter by programming language")
     parser.add_argument("--filepath", help="Filter by file path")
+    parser.add_argument("--start-line", type=int, help="With --filepath, only chunks overlapping from this line")
+    parser.add_argument("--end-line", type=int, help="With --filepath, only chunks overlapping up to this line")
+    parser.add_argument("--chunk-index", default="repo-indexer/outputs/chunk_index.json",
+                       help="Chunk line-range index written by the chunker")
     parser.add_argument("--format", choices=["json", "text"], default="json",
                        help="Output format")
     
@@ -229,14 +278,19 @@ def main():
     try:
         retriever = CodeRetriever(
             chroma_path=chroma_path,
-            model_name=model_name
+            model_name=model_name,
+            chunk_index_path=args.chunk_index,
+            backend=args.backend,
+            onnx_path=args.onnx_path,
+            store=args.store
         )
         
         # Perform search
         if args.language:
             results = retriever.search_by_language(args.query, args.language, args.n)
         elif args.filepath:
-            results = retriever.search_by_file(args.query, args.filepath, args.n)
+            results = retriever.search_by_file(args.query, args.filepath, args.n,
+                                               start_line=args.start_line, end_line=args.end_line)
         else:
             results = retriever.search(args.query, args.n)
         
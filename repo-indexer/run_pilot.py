@@ -10,11 +10,12 @@ import logging
 import random
 import sys
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
 # Add modules to path
 sys.path.append(str(Path(__file__).parent))
 
+from chunker.chunk_reader import sample_chunks, stratified_sample
 from embeddings.embed_chroma import ChromaEmbedder
 from retrieval.query import CodeRetriever
 
@@ -24,10 +25,14 @@ class PilotRunner:
     
     def __init__(self, chunks_file: str = "repo-indexer/outputs/chunks.jsonl",
                  chroma_path: str = "./repo-indexer/chroma_store",
-                 model_name: str = "all-mpnet-base-v2"):
+                 model_name: str = "all-mpnet-base-v2", backend: Optional[str] = None,
+                 store: Optional[str] = None, seed: Optional[int] = None):
         self.chunks_file = Path(chunks_file)
         self.chroma_path = chroma_path
         self.model_name = model_name
+        self.backend = backend
+        self.store = store
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
         self.output_dir = Path("repo-indexer/outputs")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -41,81 +46,21 @@ class PilotRunner:
             handlers=[logging.StreamHandler()]
         )
     
-    def load_chunks(self) -> List[Dict[str, Any]]:
-        """Load chunks from JSONL file."""
+    def select_pilot_chunks(self, chunks: Iterable[Dict[str, Any]], n_samples: int = 50,
+                            seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Select representative chunks for pilot testing in one pass over `chunks`."""
+        seed = self.seed if seed is None else seed
+        selected, total = stratified_sample(chunks, n_samples, seed)
+        logging.info(f"Selected {len(selected)} pilot chunks from {total} total chunks (seed {seed})")
+        return selected
+    
+    def sample_pilot_chunks(self, n_samples: int = 50) -> List[Dict[str, Any]]:
+        """Sample on the few fields stratification needs, then read only the chosen chunks in full."""
         if not self.chunks_file.exists():
             raise FileNotFoundError(f"Chunks file not found: {self.chunks_file}")
-        
-        chunks = []
-        with open(self.chunks_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    chunk = json.loads(line.strip())
-                    chunks.append(chunk)
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Failed to parse chunk: {e}")
-        
-        logging.info(f"Loaded {len(chunks)} chunks from {self.chunks_file}")
-        return chunks
-    
-    def select_pilot_chunks(self, chunks: List[Dict[str, Any]], n_samples: int = 50) -> List[Dict[str, Any]]:
-        """Select representative chunks for pilot testing."""
-        if len(chunks) <= n_samples:
-            return chunks
-        
-        # Group chunks by language
-        by_language = {}
-        for chunk in chunks:
-            lang = chunk.get('language', 'unknown')
-            if lang not in by_language:
-                by_language[lang] = []
-            by_language[lang].append(chunk)
-        
-        # Sample from each language proportionally
-        selected = []
-        total_chunks = len(chunks)
-        
-        for lang, lang_chunks in by_language.items():
-            # Calculate proportional sample size
-            lang_ratio = len(lang_chunks) / total_chunks
-            lang_sample_size = max(1, int(n_samples * lang_ratio))
-            
-            # Sample chunks with size diversity
-            lang_chunks_sorted = sorted(lang_chunks, key=lambda x: x.get('tokens_estimate', 0))
-            
-            # Take small, medium, and large chunks
-            small_chunks = [c for c in lang_chunks_sorted if c.get('tokens_estimate', 0) < 1000]
-            medium_chunks = [c for c in lang_chunks_sorted if 1000 <= c.get('tokens_estimate', 0) < 5000]
-            large_chunks = [c for c in lang_chunks_sorted if c.get('tokens_estimate', 0) >= 5000]
-            
-            # Sample from each size category
-            sample_size = lang_sample_size
-            selected_from_lang = []
-            
-            if small_chunks and sample_size > 0:
-                selected_from_lang.extend(random.sample(small_chunks, min(len(small_chunks), sample_size // 3)))
-                sample_size -= len(selected_from_lang)
-            
-            if medium_chunks and sample_size > 0:
-                selected_from_lang.extend(random.sample(medium_chunks, min(len(medium_chunks), sample_size // 2)))
-                sample_size -= len(selected_from_lang) - len([c for c in selected_from_lang if c in small_chunks])
-            
-            if large_chunks and sample_size > 0:
-                selected_from_lang.extend(random.sample(large_chunks, min(len(large_chunks), sample_size)))
-            
-            selected.extend(selected_from_lang)
-        
-        # If we don't have enough, fill with random samples
-        if len(selected) < n_samples:
-            remaining = [c for c in chunks if c not in selected]
-            additional = random.sample(remaining, min(len(remaining), n_samples - len(selected)))
-            selected.extend(additional)
-        
-        # Limit to requested number
-        selected = selected[:n_samples]
-        
-        logging.info(f"Selected {len(selected)} pilot chunks from {len(chunks)} total chunks")
-        return selected
+        sampled = sample_chunks(self.chunks_file, n_samples, self.seed)
+        logging.info(f"Sampled {len(sampled)} pilot chunks from {self.chunks_file} (seed {self.seed})")
+        return sampled
     
     def run_pilot_embedding(self, pilot_chunks: List[Dict[str, Any]]) -> ChromaEmbedder:
         """Run embedding process on pilot chunks."""
@@ -133,7 +78,9 @@ class PilotRunner:
         embedder = ChromaEmbedder(
             chroma_path=self.chroma_path,
             model_name=self.model_name,
-            batch_size=32  # Smaller batch for pilot
+            batch_size=32,  # Smaller batch for pilot
+            backend=self.backend,
+            store=self.store
         )
         
         # Process pilot chunks
@@ -149,7 +96,9 @@ class PilotRunner:
         # Initialize retriever
         retriever = CodeRetriever(
             chroma_path=self.chroma_path,
-            model_name=self.model_name
+            model_name=self.model_name,
+            backend=self.backend,
+            store=self.store
         )
         
         # Search for results
@@ -211,18 +160,33 @@ class PilotRunner:
         
         print("\n" + "="*60)
     
+    def run_benchmark(self, queries_file: str, k: int = 10) -> Dict[str, Any]:
+        """Score retrieval on a labeled query set instead of a single sample query."""
+        from benchmarks.bench_retrieval import run as run_retrieval_benchmark
+        
+        report = run_retrieval_benchmark(Path(queries_file), [self.chroma_path], self.backend, self.model_name,
+                                         None, k, [4, 8, 16], store=self.store)
+        output_file = self.output_dir / "retrieval_benchmark.json"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        
+        print(f"\nRetrieval benchmark ({report['queries']} queries, k={k}):")
+        for result in report['runs']:
+            print(f"  {result['mode']:<18} recall@{k}={result[f'recall_at_{k}']:.3f} "
+                  f"MRR={result['mrr']:.3f} p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                  f"QPS={result['qps']}")
+        print(f"Saved benchmark to {output_file}")
+        return report
+    
     def run(self):
         """Run the complete pilot test."""
         try:
-            # Load chunks
-            chunks = self.load_chunks()
-            if not chunks:
+            # Stream and sample pilot chunks without loading the whole file
+            pilot_chunks = self.sample_pilot_chunks(n_samples=50)
+            if not pilot_chunks:
                 print("No chunks found. Run the chunker first.")
                 return
             
-            # Select pilot chunks
-            pilot_chunks = self.select_pilot_chunks(chunks, n_samples=50)
-            
             # Run embedding
             embedder = self.run_pilot_embedding(pilot_chunks)
             
@@ -260,16 +224,32 @@ def main():
                        help="SentenceTransformer model name")
     parser.add_argument("--query", default="how is authentication implemented?",
                        help="Test query to run")
+    parser.add_argument("--backend", choices=["torch", "onnx", "hashing"],
+                       help="Encoder backend (default: ENCODER_BACKEND or torch)")
+    parser.add_argument("--store", choices=["chroma", "local"],
+                       help="Vector store (default: VECTOR_STORE, else whatever exists at --chroma-path)")
+    parser.add_argument("--seed", type=int,
+                       help="Seed for pilot chunk sampling (default: random, logged)")
+    parser.add_argument("--benchmark", metavar="QUERIES",
+                       help="Labeled queries JSONL; report recall@k/MRR/latency instead of the pilot run")
+    parser.add_argument("--k", type=int, default=10,
+                       help="Results per query for --benchmark")
     
     args = parser.parse_args()
     
     pilot = PilotRunner(
         chunks_file=args.chunks,
         chroma_path=args.chroma_path,
-        model_name=args.model
+        model_name=args.model,
+        backend=args.backend,
+        store=args.store,
+        seed=args.seed
     )
     
-    pilot.run()
+    if args.benchmark:
+        pilot.run_benchmark(args.benchmark, k=args.k)
+    else:
+        pilot.run()
 
 
 if __name__ == "__main__":
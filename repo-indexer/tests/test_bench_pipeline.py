@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the synthetic-repository pipeline benchmark.
+"""
+
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.bench_pipeline import compare, generate_repo, parse_mix, run
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+class TestSyntheticRepo(unittest.TestCase):
+    """Test repository generation."""
+
+    def test_parse_mix(self):
+        """Test weights are normalized and unknown languages rejected."""
+        self.assertEqual(parse_mix("python=3,java=1"), {'python': 0.75, 'java': 0.25})
+        with self.assertRaises(ValueError):
+            parse_mix("cobol=1")
+
+    def test_generation_is_deterministic(self):
+        """Test the same seed writes byte-identical repositories."""
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            info = generate_repo(Path(a), 12, parse_mix("python=1,java=1"), functions_per_file=3, seed=7)
+            generate_repo(Path(b), 12, parse_mix("python=1,java=1"), functions_per_file=3, seed=7)
+            files_a = sorted(p.relative_to(a) for p in Path(a).rglob('*') if p.is_file())
+            files_b = sorted(p.relative_to(b) for p in Path(b).rglob('*') if p.is_file())
+            self.assertEqual(files_a, files_b)
+            self.assertEqual(len(files_a), 12)
+            self.assertEqual(sum(info['files_by_language'].values()), 12)
+            for path in files_a:
+                self.assertEqual((Path(a) / path).read_bytes(), (Path(b) / path).read_bytes())
+
+
+class TestPipelineReport(unittest.TestCase):
+    """Test the benchmark report."""
+
+    def test_front_end_stages(self):
+        """Test traversal, chunking and writing report throughput without any model."""
+        report = run(files=10, functions_per_file=2, stages=['traversal', 'chunking', 'writing'])
+        self.assertEqual(set(report['stages']), {'traversal', 'chunking', 'writing'})
+        self.assertEqual(report['stages']['traversal']['files'], 10)
+        self.assertEqual(report['stages']['chunking']['chunks'], report['stages']['writing']['chunks'])
+        self.assertIn('p95_ms', report['stages']['chunking']['per_file_latency'])
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_embedding_and_search(self):
+        """Test the stand-in encoder and local store run the full pipeline."""
+        report = run(files=10, functions_per_file=2, n_queries=5, stages=['search'])
+        self.assertEqual(list(report['stages']), ['search'])
+        self.assertEqual(report['stages']['search']['queries'], 5)
+        self.assertIn('p50_ms', report['stages']['search']['latency'])
+
+    def test_compare(self):
+        """Test throughput ratios against a baseline report."""
+        report = {'stages': {'chunking': {'files_per_s': 200.0, 'chunks_per_s': None}}}
+        baseline = {'stages': {'chunking': {'files_per_s': 100.0, 'chunks_per_s': 50.0}}}
+        self.assertEqual(compare(report, baseline), {'chunking': {'files_per_s': 2.0}})
+
+
+if __name__ == '__main__':
+    unittest.main()
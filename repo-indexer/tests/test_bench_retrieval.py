@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the labeled-query retrieval benchmark.
+"""
+
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.bench_retrieval import evaluate, is_relevant, load_labeled_queries, run
+from benchmarks.metrics import reciprocal_rank
+from tests.test_embed_chroma import make_chunk
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+TOPICS = {
+    'auth': ('auth/login.py', 'def authenticate_user(password, token): verify password hash session token'),
+    'parse': ('config/parser.py', 'def parse_config(yaml_text): load yaml settings defaults'),
+    'render': ('ui/render.py', 'def render_template(html, context): jinja template html output'),
+    'retry': ('net/client.py', 'def retry_request(url, attempts): http retry backoff timeout'),
+}
+
+
+def hit(filepath, symbol_path='function:f'):
+    return {'metadata': {'filepath': filepath, 'symbol_path': symbol_path}}
+
+
+class TestScoring(unittest.TestCase):
+    """Test relevance matching and rank metrics."""
+
+    def test_reciprocal_rank(self):
+        """Test the first relevant position decides the score."""
+        self.assertEqual(reciprocal_rank([False, True, True]), 0.5)
+        self.assertEqual(reciprocal_rank([False, False]), 0.0)
+
+    def test_is_relevant(self):
+        """Test file suffixes and symbol names both have to match when given."""
+        metadata = {'filepath': '/repo/src/auth/login.py', 'symbol_path': 'function:authenticate'}
+        self.assertTrue(is_relevant(metadata, {'filepath': 'auth/login.py'}))
+        self.assertTrue(is_relevant(metadata, {'filepath': './src/auth/login.py', 'symbol': 'authenticate'}))
+        self.assertTrue(is_relevant(metadata, {'symbol': 'function:authenticate'}))
+        self.assertFalse(is_relevant(metadata, {'filepath': 'auth/login.py', 'symbol': 'logout'}))
+        self.assertFalse(is_relevant(metadata, {'filepath': 'auth/logout.py'}))
+        self.assertFalse(is_relevant(metadata, {}))
+        self.assertFalse(is_relevant({'filepath': 'src/data.py'}, {'filepath': 'a.py'}))
+        self.assertFalse(is_relevant({'filepath': 'github/ci.yml'}, {'filepath': '.github/ci.yml'}))
+        self.assertTrue(is_relevant({'filepath': '.github/ci.yml'}, {'filepath': './.github/ci.yml'}))
+
+    def test_evaluate(self):
+        """Test recall@k, MRR and hit rate over a fixed ranking."""
+        rankings = {
+            'q1': [hit('a.py'), hit('b.py')],
+            'q2': [hit('x.py'), hit('c.py'), hit('d.py')],
+            'q3': [hit('x.py')],
+        }
+        queries = [
+            {'query': 'q1', 'expected': [{'filepath': 'a.py'}, {'filepath': 'z.py'}]},
+            {'query': 'q2', 'expected': [{'filepath': 'c.py'}]},
+            {'query': 'q3', 'expected': [{'filepath': 'c.py'}]},
+        ]
+        report = evaluate(lambda query, k, where: rankings[query][:k], queries, k=2)
+        self.assertEqual(report['recall_at_2'], round((0.5 + 1 + 0) / 3, 4))
+        self.assertEqual(report['hit_rate_at_2'], round(2 / 3, 4))
+        self.assertEqual(report['mrr'], 0.5)
+        self.assertIn('p99_ms', report)
+        self.assertGreater(report['qps'], 0)
+
+    def test_load_labeled_queries(self):
+        """Test shorthand answer lists and rejection of unlabeled queries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "queries.jsonl"
+            path.write_text(json.dumps({'query': 'login', 'expected_files': ['auth.py'],
+                                        'expected_symbols': ['login'], 'language': 'python'}) + "\n\n",
+                            encoding='utf-8')
+            queries = load_labeled_queries(path)
+            self.assertEqual(queries[0]['expected'], [{'filepath': 'auth.py'}, {'symbol': 'login'}])
+            self.assertEqual(queries[0]['language'], 'python')
+
+            path.write_text(json.dumps({'query': 'login'}) + "\n", encoding='utf-8')
+            with self.assertRaises(ValueError):
+                load_labeled_queries(path)
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestRetrievalBenchmark(unittest.TestCase):
+    """Test the benchmark end to end on a local store with the hashing encoder."""
+
+    def test_run_local_store_modes(self):
+        """Test each topic query finds its file, with exact and IVF-PQ variants reported."""
+        from embeddings.embed_chroma import ChromaEmbedder
+        from embeddings.local_store import LocalVectorStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks_file = Path(tmp) / "chunks.jsonl"
+            with open(chunks_file, 'w', encoding='utf-8') as f:
+                for i in range(40):
+                    name = list(TOPICS)[i % len(TOPICS)]
+                    filepath, text = TOPICS[name]
+                    chunk = make_chunk(f'{name}_{i}', start_line=i * 3 + 1, filepath=filepath)
+                    chunk['text'] = text.replace('def ', f'def v{i}_')
+                    f.write(json.dumps(chunk) + "\n")
+            store_path = Path(tmp) / "store"
+            embedder = ChromaEmbedder(chroma_path=str(store_path), backend='hashing', store='local')
+            embedder.process_chunks_file(str(chunks_file))
+            embedder.close()
+            LocalVectorStore(store_path).build_index(nlist=4, subspaces=8)
+
+            queries_file = Path(tmp) / "queries.jsonl"
+            with open(queries_file, 'w', encoding='utf-8') as f:
+                for name, (filepath, text) in TOPICS.items():
+                    f.write(json.dumps({'query': text.split(':')[1], 'expected_files': [filepath]}) + "\n")
+
+            report = run(queries_file, [str(store_path)], 'hashing', 'all-mpnet-base-v2', None, k=3,
+                         nprobes=[1, 4], store='local')
+
+        modes = [result['mode'] for result in report['runs']]
+        self.assertEqual(modes, ['exact', 'ivfpq-nprobe1', 'ivfpq-nprobe4'])
+        exact = report['runs'][0]
+        self.assertEqual(exact['recall_at_3'], 1.0)
+        self.assertEqual(exact['mrr'], 1.0)
+        self.assertEqual(exact['queries'], len(TOPICS))
+        self.assertTrue(exact['encoder'].startswith('hashing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+
+from repo_indexer.graph.link_chunks import (
+    FunctionSpanIndex,
+    build_chunk_function_links,
+    iter_chunk_spans,
+    update_chroma_metadata,
+)
+from repo_indexer.graph.query_graph import get_call_subgraph_by_ids, get_function_ids_for_chunk
+from repo_indexer.embeddings.vector_store import open_chunk_collection
+
+
+def _index():
+    index = FunctionSpanIndex()
+    index.add('/work/repo/pkg/api.py', 1, 10, 'f1')
+    index.add('/work/repo/pkg/api.py', 12, 30, 'f2')
+    index.add('/work/repo/pkg/api.py', 14, 18, 'f3')
+    index.add('/work/repo/lib/util.py', 5, 8, 'f4')
+    index.finalize()
+    return index
+
+
+def test_overlapping_resolves_relative_and_windows_paths():
+    index = _index()
+    assert index.overlapping('pkg/api.py', 9, 13) == ['f1', 'f2']
+    assert index.overlapping('pkg\\api.py', 15, 15) == ['f2', 'f3']
+    assert index.overlapping('lib/util.py', 1, 4) == []
+    assert index.overlapping('other.py', 1, 100) == []
+
+
+def test_build_links_from_chunks_file(tmp_path):
+    chunks_file = tmp_path / 'chunks.jsonl'
+    with open(chunks_file, 'w') as f:
+        f.write(json.dumps({'id': 'c1', 'filepath': 'pkg/api.py', 'start_line': 1, 'end_line': 11}) + '\n')
+        f.write(json.dumps({'id': 'c2', 'filepath': 'lib/util.py', 'start_line': 20, 'end_line': 40}) + '\n')
+    links = build_chunk_function_links(iter_chunk_spans(chunks_file), _index())
+    assert links == {'c1': ['f1']}
+
+
+class FakeCollection:
+    def __init__(self, ids):
+        self.ids = set(ids)
+        self.updates = {}
+
+    def get(self, ids, include):
+        return {'ids': [i for i in ids if i in self.ids]}
+
+    def update(self, ids, metadatas):
+        self.updates.update(zip(ids, metadatas))
+
+
+def test_update_chroma_metadata_skips_unknown_chunks():
+    collection = FakeCollection(['c1'])
+    assert update_chroma_metadata(collection, {'c1': ['f1', 'f2'], 'gone': ['f3']}) == 1
+    assert collection.updates == {'c1': {'function_ids': 'f1,f2'}}
+
+
+def test_update_metadata_in_local_store(tmp_path):
+    _, store = open_chunk_collection(str(tmp_path / 'store'), store='local')
+    store.upsert(ids=['c1'], embeddings=[[0.1, 0.2]], documents=['def f(): pass'], metadatas=[{'filepath': 'a.py'}])
+    _, collection = open_chunk_collection(str(tmp_path / 'store'), create=False)
+    assert update_chroma_metadata(collection, {'c1': ['f1'], 'gone': ['f2']}) == 1
+    assert collection.get(ids=['c1'], include=['metadatas'])['metadatas'] == [{'filepath': 'a.py', 'function_ids': 'f1'}]
+
+
+def test_function_ids_for_chunk_prefers_metadata():
+    assert get_function_ids_for_chunk({'metadata': {'function_ids': 'f1,f2'}}) == ['f1', 'f2']
+    assert get_function_ids_for_chunk({'id': 'c1', 'metadata': {}}, {'c1': ['f9']}) == ['f9']
+    assert get_function_ids_for_chunk({'id': 'c2', 'metadata': {}}) == []
+
+
+def test_subgraph_by_ids_queries_indexed_id():
+    class Session:
+        def run(self, query, **params):
+            self.query, self.params = query, params
+            return [{'f': {'id': 'f1', 'name': 'foo'}, 'g': {'id': 'f2', 'name': 'bar'}, 'r': []}]
+
+    session = Session()
+    nodes, edges = get_call_subgraph_by_ids(session, ['f1'], hops=2)
+    assert 'MATCH (f:Function {id: fid})' in session.query
+    assert '*1..2' in session.query
+    assert session.params == {'fids': ['f1']}
+    assert [n.id for n in nodes] == ['f1', 'f2']
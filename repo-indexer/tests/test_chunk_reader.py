@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared chunks.jsonl reader and sampler.
+"""
+
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunk_reader import (ChunkOffsetIndex, _block_ranges, allocate, iter_chunk_records, iter_chunks,
+                                  read_chunks_at, sample_chunks, stratified_sample)
+
+
+def make_chunks(n, language='python', tokens=100, prefix='c'):
+    return [{'id': f'{prefix}{i}', 'language': language, 'tokens_estimate': tokens} for i in range(n)]
+
+
+def write_chunks(path, chunks, bad_lines=()):
+    """Write chunks as JSONL, inserting a blank line and unparsable lines at the given positions."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, chunk in enumerate(chunks):
+            if i in bad_lines:
+                f.write("{not json\n")
+            if i == 1:
+                f.write("\n")
+            f.write(json.dumps(chunk) + "\n")
+
+
+class TestChunkReader(unittest.TestCase):
+    """Test streaming, projection, parallel parsing and offsets."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "chunks.jsonl"
+        self.chunks = [{'id': f'c{i}', 'language': 'python', 'tokens_estimate': i, 'text': 'x' * (i % 50)}
+                       for i in range(300)]
+        write_chunks(self.path, self.chunks, bad_lines=(5, 200))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_projection_and_errors(self):
+        """Test fields are projected and bad lines reported with their line numbers, then skipped."""
+        errors = []
+        chunks = list(iter_chunks(self.path, fields=('id',), on_error=lambda line, e: errors.append(line)))
+        self.assertEqual(chunks, [{'id': c['id']} for c in self.chunks])
+        # Line 3 is the blank line after chunk 1; bad lines precede chunks 5 and 200
+        self.assertEqual(errors, [7, 203])
+
+    def test_records_resume_from_offset(self):
+        """Test records carry byte spans that resume the stream exactly."""
+        records = list(iter_chunk_records(self.path, on_error=lambda line, e: None))
+        middle = records[100]
+        resumed = list(iter_chunk_records(self.path, offset=middle.end_offset, line_num=middle.line_num,
+                                          on_error=lambda line, e: None))
+        self.assertEqual(resumed[0], records[101])
+        self.assertEqual(len(resumed), len(records) - 101)
+
+    def test_block_ranges_end_on_lines(self):
+        """Test parallel blocks cover the file exactly and split only after newlines."""
+        ranges = _block_ranges(self.path, 0, 1000)
+        data = self.path.read_bytes()
+        self.assertGreater(len(ranges), 3)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_parallel_matches_sequential(self):
+        """Test multi-process parsing yields the same chunks and error lines in file order."""
+        sequential_errors, parallel_errors = [], []
+        sequential = list(iter_chunks(self.path, on_error=lambda line, e: sequential_errors.append(line)))
+        parallel = list(iter_chunks(self.path, on_error=lambda line, e: parallel_errors.append(line),
+                                    workers=2, block_bytes=1000))
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel_errors, sequential_errors)
+
+    def test_read_chunks_at(self):
+        """Test chunks are read back from offsets in the order requested."""
+        offsets = {r.chunk['id']: r.offset for r in iter_chunk_records(self.path, on_error=lambda line, e: None)}
+        chunks = read_chunks_at(self.path, [offsets['c250'], offsets['c3']], fields=('id', 'tokens_estimate'))
+        self.assertEqual(chunks, [{'id': 'c250', 'tokens_estimate': 250}, {'id': 'c3', 'tokens_estimate': 3}])
+
+    def test_offset_index_lookup_and_staleness(self):
+        """Test lookups by position and id, and that a saved index is dropped once the file changes."""
+        index = ChunkOffsetIndex.build(self.path)
+        self.assertEqual(len(index), 300)
+        self.assertEqual(index.read(42)['id'], 'c42')
+        self.assertEqual(index.get('c299', fields=('id',)), {'id': 'c299'})
+        self.assertIsNone(index.get('missing'))
+
+        index_path = Path(self.tmp.name) / "offsets.json"
+        index.save(index_path)
+        self.assertEqual(ChunkOffsetIndex.load(index_path, self.path).offsets, index.offsets)
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'id': 'c300'}) + "\n")
+        self.assertIsNone(ChunkOffsetIndex.load(index_path, self.path))
+
+        reopened = ChunkOffsetIndex.open(self.path)
+        self.assertEqual(reopened.get('c300'), {'id': 'c300'})
+        self.assertIsNotNone(ChunkOffsetIndex.load(Path(self.tmp.name) / "chunk_offsets.json", self.path))
+
+    def test_offset_index_without_ids(self):
+        """Test id lookups fail loudly on an index built without ids."""
+        with self.assertRaises(ValueError):
+            ChunkOffsetIndex.build(self.path, with_ids=False).get('c1')
+
+    def test_sample_chunks(self):
+        """Test sampling reads full chunks and 0 means the whole file."""
+        sample = sample_chunks(self.path, 20, seed=1)
+        self.assertEqual(len(sample), 20)
+        self.assertIn('text', sample[0])
+        self.assertEqual(sample, sample_chunks(self.path, 20, seed=1))
+        self.assertEqual(len(sample_chunks(self.path, 0)), 300)
+
+    def test_pilot_uses_shared_sampler(self):
+        """Test the pilot draws the same seeded sample as sample_chunks."""
+        from run_pilot import PilotRunner
+        pilot = PilotRunner(str(self.path), seed=7)
+        self.assertEqual(pilot.sample_pilot_chunks(20), sample_chunks(self.path, 20, seed=7))
+
+
+class TestStratifiedSample(unittest.TestCase):
+    """Test the single-pass stratified reservoir sample."""
+
+    def setUp(self):
+        self.chunks = (make_chunks(900, 'python') + make_chunks(80, 'java', prefix='j')
+                       + make_chunks(15, 'python', tokens=2000, prefix='m') + make_chunks(5, 'go', tokens=9000, prefix='g'))
+
+    def test_small_input_returned_whole(self):
+        """Test fewer chunks than requested are all selected."""
+        selected, total = stratified_sample(make_chunks(10), 50, seed=1)
+        self.assertEqual(total, 10)
+        self.assertEqual(sorted(c['id'] for c in selected), sorted(f'c{i}' for i in range(10)))
+
+    def test_every_stratum_represented(self):
+        """Test rare languages and size buckets still get a sample, in proportion otherwise."""
+        selected, total = stratified_sample(iter(self.chunks), 50, seed=3)
+        self.assertEqual(total, 1000)
+        self.assertEqual(len(selected), 50)
+        self.assertEqual(len({c['id'] for c in selected}), 50)
+        prefixes = [c['id'][0] for c in selected]
+        self.assertGreaterEqual(prefixes.count('c'), 40)
+        for prefix in ('j', 'm', 'g'):
+            self.assertIn(prefix, prefixes)
+
+    def test_seeded_and_order_independent(self):
+        """Test the same seed selects the same ids whatever the stream order."""
+        shuffled = list(self.chunks)
+        random.Random(0).shuffle(shuffled)
+        ids = lambda chunks, seed: {c['id'] for c in stratified_sample(chunks, 30, seed=seed)[0]}
+        self.assertEqual(ids(self.chunks, 7), ids(shuffled, 7))
+        self.assertNotEqual(ids(self.chunks, 7), ids(self.chunks, 8))
+
+    def test_duplicate_ids_kept_once(self):
+        """Test a chunk id repeated in the stream is sampled at most once."""
+        selected, _ = stratified_sample(make_chunks(5) * 3, 10, seed=0)
+        self.assertEqual(len(selected), 5)
+
+    def test_allocate(self):
+        """Test quotas sum to the sample size and respect stratum capacity."""
+        counts = {('python', 'small'): 1000, ('java', 'small'): 10, ('go', 'large'): 1}
+        quotas = allocate(counts, 20)
+        self.assertEqual(sum(quotas.values()), 20)
+        self.assertEqual(quotas[('go', 'large')], 1)
+        self.assertGreater(quotas[('python', 'small')], quotas[('java', 'small')])
+        self.assertEqual(allocate(counts, 2000), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
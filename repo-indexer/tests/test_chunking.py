@@ -70,13 +70,26 @@ class TestTreeSitterChunker(unittest.TestCase):
     
     def test_create_chunk_id(self):
         """Test chunk ID creation."""
-        chunk_id = self.chunker.create_chunk_id("test.py", 1, 10, "print('hello')")
+        chunk_id = self.chunker.create_chunk_id("test.py", "print('hello')", "block", 0)
         self.assertTrue(chunk_id.startswith("sha1:"))
         self.assertEqual(len(chunk_id), 45)  # "sha1:" + 40 char hash
     
+    def test_chunk_id_ignores_positions_and_whitespace_noise(self):
+        """Test chunk IDs are stable across line shifts and trailing whitespace."""
+        text = "def hello():\n    print('hello')"
+        chunk_id = self.chunker.create_chunk_id("pkg/test.py", text, "function:hello")
+        self.assertEqual(chunk_id, self.chunker.create_chunk_id("pkg\\test.py", text + "  \n", "function:hello"))
+        self.assertNotEqual(chunk_id, self.chunker.create_chunk_id("pkg/test.py", text, "function:hello", 1))
+        self.assertNotEqual(chunk_id, self.chunker.create_chunk_id("pkg/other.py", text, "function:hello"))
+    
+    def test_extract_symbol_path(self):
+        """Test symbol paths use the first defined name."""
+        self.assertEqual(self.chunker.extract_symbol_path("class Foo:\n    def bar(self): pass", "class"), "class:Foo")
+        self.assertEqual(self.chunker.extract_symbol_path("x = 1", "block"), "block")
+    
     def test_create_code_fingerprint(self):
         """Test code fingerprint creation."""
-        fingerprint = self.chunker.create_code_fingerprint("test.py", 1, 10, "print('hello')")
+        fingerprint = self.chunker.create_code_fingerprint("print('hello')")
         self.assertEqual(len(fingerprint), 40)  # SHA1 hex length
         self.assertIsInstance(fingerprint, str)
     
@@ -201,6 +214,26 @@ class TestRepoChunker(unittest.TestCase):
                 self.assertIn('filepath', chunk_data)
                 self.assertIn('text', chunk_data)
     
+    def test_ids_survive_inserted_lines(self):
+        """Test inserting lines above a chunk keeps its ID and only moves it."""
+        chunker = RepoChunker(
+            root_path=self.temp_dir,
+            output_dir=str(self.output_dir)
+        )
+        body = "def hello():\n    print('Hello, World!')"
+        before = chunker._build_records(Path("test.py"), [
+            {'type': 'function', 'start_line': 1, 'end_line': 2, 'text': body}
+        ], 'python', '2024-01-01T00:00:00')
+        after = chunker._build_records(Path("test.py"), [
+            {'type': 'block', 'start_line': 1, 'end_line': 1, 'text': "import os"},
+            {'type': 'function', 'start_line': 3, 'end_line': 4, 'text': body}
+        ], 'python', '2024-01-02T00:00:00')
+        
+        self.assertEqual(before[0]['id'], after[1]['id'])
+        self.assertEqual(before[0]['code_fingerprint'], after[1]['code_fingerprint'])
+        self.assertEqual(after[1]['symbol_path'], 'function:hello')
+        self.assertEqual(after[1]['start_line'], 3)
+    
     def test_write_manifest(self):
         """Test manifest writing."""
         chunker = RepoChunker(
@@ -221,6 +254,36 @@ class TestRepoChunker(unittest.TestCase):
             manifest = json.load(f)
             self.assertEqual(manifest['total_files'], 5)
             self.assertEqual(manifest['total_chunks'], 10)
+    
+    def test_manifest_profile(self):
+        """Test real token totals, stage timings and size counters reach the manifest."""
+        chunker = RepoChunker(
+            root_path=self.temp_dir,
+            output_dir=str(self.output_dir)
+        )
+        
+        file_params = Mock()
+        file_params.file_path = str(self.test_file)
+        chunker.process_file(file_params)
+        chunker.write_manifest()
+        
+        with open(self.output_dir / "manifest.json", 'r') as f:
+            manifest = json.load(f)
+        with open(self.output_dir / "chunks.jsonl", 'r') as f:
+            records = [json.loads(line) for line in f]
+        
+        total_tokens = sum(record['tokens_estimate'] for record in records)
+        self.assertEqual(manifest['total_tokens'], total_tokens)
+        self.assertEqual(manifest['avg_chunk_tokens'], total_tokens // len(records))
+        profile = manifest['profile']
+        self.assertEqual(profile['bytes_read'], self.test_file.stat().st_size)
+        self.assertEqual(sum(profile['chunk_tokens_histogram'].values()), len(records))
+        self.assertEqual(set(profile['stage_seconds']), {'read', 'parse', 'tokenize', 'write'})
+        python = profile['by_language']['python']
+        self.assertEqual((python['files'], python['chunks']), (1, len(records)))
+        self.assertEqual(profile['slowest_files'][0]['filepath'], 'test.py')
+        self.assertEqual(profile['fallback_rate'],
+                         sum(1 for r in records if r.get('parser_fallback')) / len(records))
 
 
 if __name__ == '__main__':
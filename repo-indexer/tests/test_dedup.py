@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for exact duplicate files and chunks at chunk time.
+"""
+
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker
+from chunker.dedup import DuplicateTracker, content_hash
+from chunker.interval_index import ChunkIntervalIndex, INDEX_FILENAME
+
+SHARED = "".join(f"shared_{i} = {i}\n" for i in range(4))
+
+
+class TestDuplicateTracker(unittest.TestCase):
+    """Test canonical copies and alias bookkeeping."""
+
+    def test_files_and_chunks(self):
+        """Test later copies resolve to the first one and are listed as its aliases."""
+        tracker = DuplicateTracker()
+        self.assertIsNone(tracker.canonical_file("a.py", "x = 1\n", 6))
+        self.assertIsNone(tracker.canonical_file("b.py", "x = 2\n", 6))
+        self.assertEqual(tracker.canonical_file("vendor/a.py", "x = 1\n", 6), "a.py")
+
+        key = content_hash("def f(): pass")
+        self.assertIsNone(tracker.canonical_chunk(key, "a.py", 1, 1))
+        tracker.add_chunk(key, "id-a")
+        self.assertEqual(tracker.canonical_chunk(key, "b.py", 5, 5), "id-a")
+
+        self.assertEqual(tracker.aliases_for("id-a", "a.py", 1, 1), [
+            {'filepath': 'vendor/a.py', 'start_line': 1, 'end_line': 1},
+            {'filepath': 'b.py', 'start_line': 5, 'end_line': 5},
+        ])
+        self.assertEqual(tracker.stats, {'files': 1, 'chunks': 1, 'bytes': 6})
+
+
+class TestChunkerDedup(unittest.TestCase):
+    """Test duplicates are folded into canonical chunks during a run."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.repo = self.root / "repo"
+        (self.repo / "vendor").mkdir(parents=True)
+        (self.repo / "lib.txt").write_text(SHARED + "lib_only = 1\n", encoding='utf-8')
+        (self.repo / "vendor" / "lib.txt").write_text(SHARED + "lib_only = 1\n", encoding='utf-8')
+        (self.repo / "other.txt").write_text(SHARED + "other_only = 2\n" * 4, encoding='utf-8')
+        self.out = self.root / "out"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, **kwargs):
+        chunker = RepoChunker(str(self.repo), str(self.out), max_tokens=4, min_tokens=0, overlap_tokens=0, **kwargs)
+        # One token per line, so every file starts with the same four-line block
+        chunker.chunker.token_estimator.estimate_tokens = lambda text: text.count('\n') + 1
+        chunker.run()
+        with open(self.out / "chunks.jsonl", 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        with open(self.out / "manifest.json", 'r', encoding='utf-8') as f:
+            return records, json.load(f)
+
+    @unittest.skipIf(importlib.util.find_spec('numpy') is None, "numpy not installed")
+    def test_search_by_file_finds_aliases(self):
+        """Test a file search reaches chunks stored under their canonical copy's path."""
+        from embeddings.embed_chroma import ChromaEmbedder
+        from retrieval.query import CodeRetriever
+        records, _ = self._run()
+        store = str(self.root / "store")
+        embedder = ChromaEmbedder(chroma_path=store, backend='hashing', store='local')
+        embedder.process_chunks_file(str(self.out / "chunks.jsonl"))
+        embedder.close()
+
+        retriever = CodeRetriever(chroma_path=store, backend='hashing', store='local',
+                                  chunk_index_path=str(self.out / INDEX_FILENAME))
+        stored = {r['filepath'] for r in records}
+        alias = next(p for p in ('lib.txt', str(Path('vendor') / 'lib.txt')) if p not in stored)
+        expected = ChunkIntervalIndex.load(self.out / INDEX_FILENAME).chunks_for_file(alias)
+        self.assertTrue(expected)
+        hits = retriever.search_by_file("shared_0", alias, n_results=10)
+        self.assertEqual(sorted(hit['id'] for hit in hits), sorted(expected))
+        self.assertTrue(all(hit['metadata']['filepath'] != alias for hit in hits))
+        line_five = retriever.search_by_file("shared_0", alias, 1, start_line=5, end_line=5)
+        self.assertEqual([hit['document'].strip() for hit in line_five], ['lib_only = 1'])
+
+    def test_duplicates_become_aliases(self):
+        """Test identical files and chunk texts are emitted once with alias locations."""
+        records, manifest = self._run()
+        files = {r['filepath'] for r in records}
+        self.assertEqual(len(files & {'lib.txt', str(Path('vendor') / 'lib.txt')}), 1)
+        self.assertEqual(len({r['text'] for r in records}), len(records))
+        self.assertEqual(manifest['duplicates']['files'], 1)
+        self.assertGreater(manifest['duplicates']['chunks'], 0)
+        self.assertEqual(manifest['total_chunks'], len(records))
+
+        # Whichever copy came first, the shared block lists every other location
+        first = next(r for r in records if r['start_line'] == 1 and r['text'].startswith('shared_0'))
+        locations = {first['filepath']} | {a['filepath'] for a in first['aliases']}
+        self.assertEqual(locations, {'lib.txt', 'other.txt', str(Path('vendor') / 'lib.txt')})
+
+        index = ChunkIntervalIndex.load(self.out / INDEX_FILENAME)
+        for path in locations:
+            self.assertIn(first['id'], index.query(path, 1, 1))
+
+    def test_no_dedup(self):
+        """Test dedup=False chunks every copy separately."""
+        records, manifest = self._run(dedup=False)
+        self.assertIn(str(Path('vendor') / 'lib.txt'), {r['filepath'] for r in records})
+        self.assertFalse(any('aliases' in r for r in records))
+        self.assertEqual(manifest['duplicates'], {'files': 0, 'chunks': 0, 'bytes': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
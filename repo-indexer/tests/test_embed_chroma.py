@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ChromaDB embedding storage, using an in-memory collection.
+"""
+
+import json
+import tempfile
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from embeddings.embed_chroma import ChromaEmbedder, load_checkpoint
+from embeddings.encode_pool import POOL_ERRORS, EncodePool
+
+
+class FakeCollection:
+    """Minimal stand-in for a Chroma collection."""
+    
+    def __init__(self, poison=(), error=None):
+        self.records = {}
+        self.calls = []
+        self.poison = set(poison)
+        self.error = error
+    
+    def get(self, ids=None, include=None, limit=None, offset=None):
+        self.calls.append('get')
+        if ids is None:
+            keys = sorted(self.records)[offset or 0:(offset or 0) + limit if limit else None]
+        else:
+            keys = [i for i in ids if i in self.records]
+        return {'ids': keys, 'metadatas': [dict(self.records[k]['metadata']) for k in keys]}
+    
+    def add(self, ids, documents, metadatas, embeddings):
+        self.calls.append('add')
+        if len(set(ids)) != len(ids) or any(i in self.records for i in ids):
+            raise ValueError("duplicate id")
+        for i, doc, meta, emb in zip(ids, documents, metadatas, embeddings):
+            self.records[i] = {'document': doc, 'metadata': dict(meta), 'embedding': emb}
+    
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.calls.append(('upsert', len(ids)))
+        if self.error is not None:
+            raise self.error
+        if self.poison.intersection(ids):
+            raise ValueError("bad record")
+        for i, doc, meta, emb in zip(ids, documents, metadatas, embeddings):
+            self.records[i] = {'document': doc, 'metadata': dict(meta), 'embedding': emb}
+    
+    def update(self, ids, metadatas):
+        self.calls.append('update')
+        for i, meta in zip(ids, metadatas):
+            self.records[i]['metadata'].update(meta)
+    
+    def count(self):
+        return len(self.records)
+
+
+class LengthEncoder:
+    """Picklable stand-in encoder: embeds a text as [len(text), 1.0]."""
+    
+    def encode(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FailingEncoder:
+    """Encoder whose construction fails inside the worker."""
+    
+    def __init__(self):
+        raise RuntimeError("model not found")
+
+
+def make_chunk(chunk_id, start_line=1, fingerprint=None, filepath="a.py"):
+    return {
+        'id': chunk_id, 'filepath': filepath, 'language': 'python', 'node_type': 'function',
+        'symbol_path': f'function:{chunk_id}', 'start_line': start_line, 'end_line': start_line + 1,
+        'text': f'def {chunk_id}(): pass', 'summary': 'Function', 'tokens_estimate': 5,
+        'code_fingerprint': fingerprint or f'fp-{chunk_id}', 'last_modified': '2024-01-01T00:00:00',
+    }
+
+
+def make_embedder(batch_size=64):
+    with patch.object(ChromaEmbedder, '_setup_model'), patch.object(ChromaEmbedder, '_setup_chroma'):
+        embedder = ChromaEmbedder(batch_size=batch_size)
+    embedder.collection = FakeCollection()
+    embedder.embed_batch = lambda chunks: [[0.1, 0.2] for _ in chunks]
+    return embedder
+
+
+class TestStableIdUpdates(unittest.TestCase):
+    """Test that unchanged content is never re-embedded."""
+    
+    def setUp(self):
+        self.embedder = make_embedder()
+        self.embedder.insert_batch([make_chunk('a'), make_chunk('b')], [[0.1, 0.2], [0.1, 0.2]], force=True)
+    
+    def test_partition_batch(self):
+        """Test chunks are split into new, moved and unchanged."""
+        to_embed, moved, unchanged = self.embedder.partition_batch([
+            make_chunk('a'),
+            make_chunk('b', start_line=10),
+            make_chunk('c'),
+        ])
+        self.assertEqual([c['id'] for c in to_embed], ['c'])
+        self.assertEqual([c['id'] for c in moved], ['b'])
+        self.assertEqual(unchanged, 1)
+    
+    def test_moved_chunks_update_metadata_in_place(self):
+        """Test position-only changes are applied without embedding."""
+        embedded = []
+        self.embedder.embed_batch = lambda chunks: embedded.extend(chunks) or [[0.0, 0.0] for _ in chunks]
+        self.embedder._process_batch([make_chunk('a', start_line=5)], force=False, dry_run=False,
+                                     totals=dict.fromkeys(['processed', 'inserted', 'updated', 'moved',
+                                                                    'unchanged', 'skipped', 'failed'], 0))
+        self.assertEqual(embedded, [])
+        self.assertEqual(self.embedder.collection.records['a']['metadata']['start_line'], 5)
+        self.assertEqual(self.embedder.collection.records['a']['embedding'], [0.1, 0.2])
+
+
+
+class TestInsertBatch(unittest.TestCase):
+    """Test upsert writes and failure isolation."""
+    
+    def test_forced_reembed_counts_updates(self):
+        """Test forcing existing ids replaces them instead of failing the batch."""
+        embedder = make_embedder()
+        chunks = [make_chunk('a'), make_chunk('b')]
+        self.assertEqual(embedder.insert_batch(chunks, [[0.1, 0.2]] * 2)['inserted'], 2)
+        
+        counts = embedder.insert_batch(chunks + [make_chunk('c')], [[0.3, 0.4]] * 3, force=True)
+        self.assertEqual(counts, {'inserted': 1, 'updated': 2, 'skipped': 0, 'failed': 0})
+        self.assertEqual(embedder.collection.records['a']['embedding'], [0.3, 0.4])
+    
+    def test_batch_looked_up_once(self):
+        """Test forced writes skip the lookup and partitioned writes reuse it."""
+        embedder = make_embedder()
+        embedder.insert_batch([make_chunk('a')], [[0.1, 0.2]], force=True)
+        self.assertNotIn('get', embedder.collection.calls)
+        
+        embedder.collection.calls.clear()
+        totals = dict.fromkeys(['processed', 'inserted', 'updated', 'moved', 'unchanged', 'skipped', 'failed'], 0)
+        embedder._process_batch([make_chunk('a', fingerprint='changed'), make_chunk('b')], force=False,
+                                dry_run=False, totals=totals)
+        self.assertEqual(embedder.collection.calls.count('get'), 1)
+        self.assertEqual((totals['inserted'], totals['updated']), (1, 1))
+    
+    def test_unchanged_and_duplicate_ids_skipped(self):
+        """Test unchanged chunks and repeated ids in a batch are skipped."""
+        embedder = make_embedder()
+        embedder.insert_batch([make_chunk('a')], [[0.1, 0.2]])
+        counts = embedder.insert_batch([make_chunk('a'), make_chunk('b'), make_chunk('b')], [[0.1, 0.2]] * 3)
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'skipped': 2, 'failed': 0})
+    
+    def test_bad_record_isolated_by_bisection(self):
+        """Test one bad record fails alone while the rest of the batch is written."""
+        embedder = make_embedder()
+        embedder.collection = FakeCollection(poison={'c5'})
+        chunks = [make_chunk(f'c{i}') for i in range(8)]
+        counts = embedder.insert_batch(chunks, [[0.1, 0.2]] * 8)
+        
+        self.assertEqual(counts['inserted'], 7)
+        self.assertEqual(counts['failed'], 1)
+        self.assertNotIn('c5', embedder.collection.records)
+        self.assertEqual(len(embedder.collection.records), 7)
+        self.assertEqual(len(embedder.errors), 1)
+        self.assertIn('c5', embedder.errors[0])
+    
+    def test_systemic_error_not_bisected(self):
+        """Test errors no subset of the batch would avoid are raised after one attempt."""
+        embedder = make_embedder()
+        embedder.collection = FakeCollection(
+            error=ValueError("Embedding dimension 2 does not match collection dimensionality 384"))
+        with self.assertRaises(ValueError):
+            embedder.insert_batch([make_chunk(f'c{i}') for i in range(8)], [[0.1, 0.2]] * 8)
+        self.assertEqual(embedder.collection.calls, ['get', ('upsert', 8)])
+    
+    def test_systemic_error_stops_file_processing(self):
+        """Test a systemic write error ends the run instead of re-buffering every later line."""
+        embedder = make_embedder(batch_size=2)
+        embedder.collection = FakeCollection(error=ValueError("Embedding dimension 2 does not match 384"))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            chunks_file = Path(temp_dir) / "chunks.jsonl"
+            chunks_file.write_text("".join(json.dumps(make_chunk(f'c{i}')) + "\n" for i in range(10)))
+            with self.assertRaises(ValueError):
+                embedder.process_chunks_file(str(chunks_file), checkpoint_path=str(Path(temp_dir) / "ckpt"))
+        upserts = [call for call in embedder.collection.calls if call != 'get']
+        self.assertEqual(upserts, [('upsert', 2)])
+    
+    def test_missing_embeddings_count_as_failed(self):
+        """Test a batch without embeddings is reported as failed."""
+        embedder = make_embedder()
+        counts = embedder.insert_batch([make_chunk('a'), make_chunk('b')], [])
+        self.assertEqual(counts['failed'], 2)
+        self.assertEqual(embedder.collection.records, {})
+
+
+
+class TestTimings(unittest.TestCase):
+    """Test the embedder splits write-path time into encode and insert."""
+    
+    def test_encode_and_insert_timed(self):
+        """Test in-process encoding and inserts are timed and counted."""
+        with patch.object(ChromaEmbedder, '_setup_model'), patch.object(ChromaEmbedder, '_setup_chroma'):
+            embedder = ChromaEmbedder(batch_size=2)
+        embedder.collection = FakeCollection()
+        embedder.encoder = LengthEncoder()
+        chunks = [make_chunk(f'c{i}') for i in range(3)]
+        
+        embedder.insert_batch(chunks, embedder.embed_batch(chunks))
+        summary = embedder.timing_summary()
+        
+        self.assertEqual(summary['batches_encoded'], 1)
+        self.assertEqual(summary['chunks_encoded'], 3)
+        self.assertGreater(embedder.timings['encode_s'], 0)
+        self.assertGreater(embedder.timings['insert_s'], 0)
+        self.assertIn('timings', embedder.get_collection_stats())
+
+
+class TestCheckpointResume(unittest.TestCase):
+    """Test interrupted runs resume from the last committed batch."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.chunks_file = Path(self.temp_dir.name) / "chunks.jsonl"
+        self.checkpoint = Path(self.temp_dir.name) / "checkpoint.json"
+        with open(self.chunks_file, 'w', encoding='utf-8') as f:
+            for i in range(7):
+                f.write(json.dumps(make_chunk(f'c{i}')) + "\n")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _interrupted_run(self):
+        embedder = make_embedder(batch_size=2)
+        calls = []
+        
+        def embed_batch(chunks):
+            calls.append(chunks)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return [[0.1, 0.2] for _ in chunks]
+        
+        embedder.embed_batch = embed_batch
+        with self.assertRaises(KeyboardInterrupt):
+            embedder.process_chunks_file(str(self.chunks_file), checkpoint_path=str(self.checkpoint))
+        return embedder.collection
+    
+    def test_checkpoint_records_last_committed_batch(self):
+        """Test the checkpoint points just past the last written batch."""
+        self._interrupted_run()
+        checkpoint = load_checkpoint(self.checkpoint)
+        lines = self.chunks_file.read_bytes().splitlines(keepends=True)
+        self.assertEqual(checkpoint['batch'], 2)
+        self.assertEqual(checkpoint['line'], 4)
+        self.assertEqual(checkpoint['offset'], sum(len(line) for line in lines[:4]))
+        self.assertEqual(checkpoint['totals']['inserted'], 4)
+    
+    def test_resume_skips_committed_batches(self):
+        """Test a resumed run starts at the checkpoint and removes it when done."""
+        collection = self._interrupted_run()
+        embedder = make_embedder(batch_size=2)
+        embedder.collection = collection
+        seen = []
+        embedder.embed_batch = lambda chunks: seen.extend(c['id'] for c in chunks) or [[0.1, 0.2] for _ in chunks]
+        
+        totals = embedder.process_chunks_file(str(self.chunks_file), resume=True,
+                                              checkpoint_path=str(self.checkpoint))
+        self.assertEqual(seen, ['c4', 'c5', 'c6'])
+        self.assertEqual(totals['inserted'], 7)
+        self.assertEqual(len(collection.records), 7)
+        self.assertFalse(self.checkpoint.exists())
+    
+    def test_stale_checkpoint_ignored(self):
+        """Test a checkpoint for a different chunks file is not used."""
+        self._interrupted_run()
+        with open(self.chunks_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(make_chunk('c7')) + "\n")
+        embedder = make_embedder(batch_size=2)
+        seen = []
+        embedder.embed_batch = lambda chunks: seen.extend(c['id'] for c in chunks) or [[0.1, 0.2] for _ in chunks]
+        
+        embedder.process_chunks_file(str(self.chunks_file), resume=True, checkpoint_path=str(self.checkpoint))
+        self.assertEqual(seen[0], 'c0')
+        self.assertEqual(len(seen), 8)
+
+
+class TestNearDuplicateReuse(unittest.TestCase):
+    """Test cluster members are stored with their representative's vector."""
+
+    def test_members_reuse_representative_vector(self):
+        """Test only representatives are encoded and members point back to them."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            chunks_file = Path(temp_dir) / "chunks.jsonl"
+            report = Path(temp_dir) / "near_duplicates.json"
+            with open(chunks_file, 'w', encoding='utf-8') as f:
+                for i in range(5):
+                    f.write(json.dumps(make_chunk(f'c{i}')) + "\n")
+            report.write_text(json.dumps({'clusters': [{'representative': 'c0', 'members': ['c2', 'c4']}]}))
+
+            with patch.object(ChromaEmbedder, '_setup_model'), patch.object(ChromaEmbedder, '_setup_chroma'):
+                embedder = ChromaEmbedder(batch_size=2, near_duplicates=str(report))
+            embedder.collection = FakeCollection()
+            encoded = []
+            embedder.embed_batch = lambda chunks: (encoded.extend(c['id'] for c in chunks)
+                                                   or [[float(len(encoded)), 1.0] for _ in chunks])
+            totals = embedder.process_chunks_file(str(chunks_file), checkpoint_path=str(Path(temp_dir) / "ckpt"))
+
+        self.assertEqual(encoded, ['c0', 'c1', 'c3'])
+        self.assertEqual(totals['reused'], 2)
+        self.assertEqual(totals['inserted'], 5)
+        records = embedder.collection.records
+        self.assertEqual(records['c4']['embedding'], records['c0']['embedding'])
+        self.assertEqual(records['c2']['metadata']['near_duplicate_of'], 'c0')
+        self.assertEqual(embedder.timing_summary()['chunks_reused'], 2)
+
+
+
+class TestEncodePool(unittest.TestCase):
+    """Test encoding in worker processes with a single in-order writer."""
+    
+    def test_pool_results_written_in_order(self):
+        """Test every batch is encoded by the pool and checkpointed in file order."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            chunks_file = Path(temp_dir) / "chunks.jsonl"
+            with open(chunks_file, 'w', encoding='utf-8') as f:
+                for i in range(9):
+                    f.write(json.dumps(make_chunk(f'c{i}' + 'x' * i)) + "\n")
+            
+            embedder = make_embedder(batch_size=2)
+            embedder.pool = EncodePool(LengthEncoder, workers=2, threads_per_worker=1)
+            saved = []
+            with patch('embeddings.embed_chroma.save_checkpoint',
+                       side_effect=lambda path, data: saved.append(data['batch'])):
+                try:
+                    totals = embedder.process_chunks_file(str(chunks_file),
+                                                          checkpoint_path=str(Path(temp_dir) / "ckpt.json"))
+                finally:
+                    embedder.close()
+        
+        self.assertEqual(totals['inserted'], 9)
+        self.assertEqual(saved, [1, 2, 3, 4, 5])
+        records = embedder.collection.records
+        self.assertEqual(records['c3xxx']['embedding'], [float(len('def c3xxx(): pass')), 1.0])
+    
+    def test_worker_start_failure_raises(self):
+        """Test a factory failing in the workers raises at start-up instead of respawning forever."""
+        with self.assertRaises(RuntimeError):
+            EncodePool(FailingEncoder, workers=1, threads_per_worker=1, timeout=60)
+    
+    def test_result_wait_is_bounded(self):
+        """Test waiting on a batch that never completes times out."""
+        pool = EncodePool(LengthEncoder, workers=2, threads_per_worker=1, timeout=0.05)
+        try:
+            with self.assertRaises(POOL_ERRORS):
+                pool.result(Future())
+        finally:
+            pool.close()
+    
+    def test_pool_failure_ends_run(self):
+        """Test a timed-out or broken pool ends the run instead of being recorded per batch."""
+        for error in POOL_ERRORS:
+            with self.subTest(error=error.__name__), tempfile.TemporaryDirectory() as temp_dir:
+                chunks_file = Path(temp_dir) / "chunks.jsonl"
+                chunks_file.write_text("".join(json.dumps(make_chunk(f'c{i}')) + "\n" for i in range(10)))
+                embedder = make_embedder(batch_size=2)
+                embedder.pool = Mock(max_pending=0, encode_async=Mock(return_value=Future()),
+                                     result=Mock(side_effect=error()))
+                with self.assertRaises(error):
+                    embedder.process_chunks_file(str(chunks_file), checkpoint_path=str(Path(temp_dir) / "ckpt"))
+                self.assertEqual(embedder.pool.result.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for encoder backends and benchmark metrics.
+"""
+
+import math
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.metrics import cosine, mean_recall_at_k, percentile, recall_at_k, top_k
+from embeddings.embed_chroma import ChromaEmbedder
+from embeddings.encoders import BUCKET_CACHE_SIZE, HashingEncoder, _hash_bucket, load_encoder
+
+
+class TestLoadEncoder(unittest.TestCase):
+    """Test backend selection errors."""
+    
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            load_encoder('tensorflow')
+    
+    def test_onnx_requires_local_path(self):
+        """Test the onnx backend never falls back to downloading a model."""
+        with self.assertRaises(ValueError):
+            load_encoder('onnx', onnx_path=None)
+
+
+class TestHashingEncoder(unittest.TestCase):
+    """Test the deterministic stand-in encoder."""
+    
+    def setUp(self):
+        self.encoder = HashingEncoder(dimension=64)
+    
+    def test_shape_and_norm(self):
+        """Test one unit-length vector of the configured size per text."""
+        vectors = self.encoder.encode(["def parse_config(path): pass", ""])
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(vectors[0]), 64)
+        self.assertAlmostEqual(math.sqrt(sum(v * v for v in vectors[0])), 1.0, places=5)
+        self.assertEqual(vectors[1], [0.0] * 64)
+    
+    def test_deterministic(self):
+        """Test vectors are identical across instances."""
+        text = "class UserRepository:\n    def find_by_email(self, email): ..."
+        self.assertEqual(self.encoder.encode([text]), HashingEncoder(dimension=64).encode([text]))
+    
+    def test_bucket_cache_is_bounded(self):
+        """Test the token bucket memo never holds more than its cap."""
+        self.encoder.encode([" ".join(f"token{i}" for i in range(BUCKET_CACHE_SIZE + 100))])
+        self.assertLessEqual(_hash_bucket.cache_info().currsize, BUCKET_CACHE_SIZE)
+    
+    def test_shared_identifiers_are_closer(self):
+        """Test texts sharing identifier parts score higher than unrelated ones."""
+        query, related, unrelated = self.encoder.encode([
+            "load user config",
+            "def loadUserConfig(path): return read_config(path)",
+            "SELECT count(*) FROM orders WHERE total > 10",
+        ])
+        self.assertGreater(cosine(query, related), cosine(query, unrelated))
+    
+    def test_selected_by_environment(self):
+        """Test ENCODER_BACKEND picks the backend when none is passed."""
+        with patch.dict('os.environ', {'ENCODER_BACKEND': 'hashing', 'HASHING_DIM': '32'}):
+            encoder = load_encoder()
+        self.assertIsInstance(encoder, HashingEncoder)
+        self.assertEqual(encoder.dimension, 32)
+    
+    def test_embedder_runs_without_a_model(self):
+        """Test the embedder can be built on the hashing backend without any download."""
+        with patch.object(ChromaEmbedder, '_setup_chroma'):
+            embedder = ChromaEmbedder(backend='hashing')
+        vectors = embedder.embed_batch([{'text': 'def a(): pass'}, {'text': 'def b(): pass'}])
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(vectors[0]), 384)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test recall and ranking helpers."""
+    
+    def test_top_k(self):
+        """Test exact inner-product ranking."""
+        vectors = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+        self.assertEqual(top_k([1.0, 0.1], vectors, 2), [0, 2])
+    
+    def test_recall_at_k(self):
+        """Test recall against a reference ranking."""
+        self.assertEqual(recall_at_k([1, 2, 3, 4], [3, 1, 9, 8], 2), 0.5)
+        self.assertEqual(recall_at_k([], [1], 5), 0.0)
+        self.assertEqual(mean_recall_at_k([[1, 2], [3, 4]], [[1, 2], [5, 6]], 2), 0.5)
+    
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
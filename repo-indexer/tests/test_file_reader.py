@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for single-open source file reading.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker
+from chunker.file_reader import is_minified, read_source
+
+
+class TestReadSource(unittest.TestCase):
+    """Test sniffing, size caps and minified detection."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = self.root / name
+        path.write_bytes(data)
+        return str(path)
+
+    def test_reads_text(self):
+        """Test text is decoded, with bad bytes dropped, and size/mtime come from the same open."""
+        path = self._write("a.py", b"def f():\n    return '\xff'\n")
+        source = read_source(path)
+        self.assertIsNone(source.skipped)
+        self.assertEqual(source.content, "def f():\n    return ''\n")
+        self.assertEqual(source.size, 24)
+        self.assertGreater(source.mtime, 0)
+
+    def test_mmap_path_matches_read(self):
+        """Test large files decoded from a memory map give the same text."""
+        path = self._write("big.py", ("x = 1\n" * 5000).encode('utf-8'))
+        self.assertEqual(read_source(path, mmap_threshold=1).content, read_source(path).content)
+
+    def test_binary_and_known_extensions(self):
+        """Test unknown extensions are sniffed for binary content; known text extensions are not."""
+        self.assertEqual(read_source(self._write("blob.bin", b"\x00\x01\x02")).skipped, 'binary')
+        self.assertIsNone(read_source(self._write("notes", b"plain text\n")).skipped)
+        self.assertIsNone(read_source(self._write("odd.txt", b"a\x00b\n")).skipped)
+
+    def test_size_cap(self):
+        """Test files above the cap are skipped without being read."""
+        path = self._write("large.py", b"x = 1\n" * 100)
+        self.assertEqual(read_source(path, max_bytes=100).skipped, 'too_large')
+        self.assertIsNone(read_source(path, max_bytes=None).skipped)
+
+    def test_minified(self):
+        """Test a huge single line marks the file as minified."""
+        self.assertTrue(is_minified(b"var a=1;" * 5000))
+        self.assertFalse(is_minified(b"short\nlines\n" * 5000))
+        path = self._write("bundle.min.js", b"var a=1;" * 5000 + b"\n")
+        self.assertEqual(read_source(path).skipped, 'minified')
+
+    def test_chunker_counts_skips(self):
+        """Test skipped files are counted in the manifest and produce no chunks."""
+        repo = self.root / "repo"
+        repo.mkdir()
+        (repo / "main.py").write_text("def main():\n    return 1\n", encoding='utf-8')
+        (repo / "bundle.js").write_bytes(b"var a=1;" * 3000)
+        (repo / "image.dat").write_bytes(b"\x89PNG\x00\x00")
+        (repo / "dump.sql").write_bytes(b"insert into t values (1);\n" * 2000)
+        out = self.root / "out"
+        RepoChunker(str(repo), str(out), max_file_bytes=30000).run()
+
+        with open(out / "manifest.json", 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['skipped_files'], {'binary': 1, 'too_large': 1, 'minified': 1})
+        self.assertEqual(manifest['total_files'], 3)
+        with open(out / "chunks.jsonl", 'r', encoding='utf-8') as f:
+            files = {json.loads(line)['filepath'] for line in f}
+        self.assertEqual(files, {'main.py'})
+
+
+if __name__ == '__main__':
+    unittest.main()
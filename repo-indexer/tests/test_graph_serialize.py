@@ -0,0 +1,50 @@
+from repo_indexer.graph.query_graph import GraphEdge, GraphNode, rank_graph_nodes, serialize_graph_for_model
+
+
+class CharEstimator:
+    def estimate_tokens(self, text):
+        return len(text) // 4
+
+
+def _chain_graph():
+    nodes = [
+        GraphNode(id='far', label='Function', name='far', filepath='pkg/util.py', start_line=50, end_line=60),
+        GraphNode(id='seed', label='Function', name='handle', filepath='pkg/api.py', start_line=1, end_line=10),
+        GraphNode(id='near', label='Function', name='validate', filepath='pkg/api.py', start_line=12, end_line=20),
+        GraphNode(id='mid', label='Function', name='store', filepath='pkg/util.py', start_line=30, end_line=40),
+    ]
+    edges = [
+        GraphEdge('seed', 'near', 'CALLS'),
+        GraphEdge('seed', 'near', 'CALLS'),
+        GraphEdge('near', 'mid', 'CALLS'),
+        GraphEdge('mid', 'far', 'CALLS'),
+    ]
+    return nodes, edges
+
+
+def test_rank_by_hop_distance_from_seed():
+    nodes, edges = _chain_graph()
+    ranked, outgoing = rank_graph_nodes(nodes, edges, seeds=['handle'])
+    assert [n.id for n in ranked] == ['seed', 'near', 'mid', 'far']
+    assert outgoing['seed'] == {'near'}
+
+
+def test_serialize_compresses_paths_and_groups_edges():
+    nodes, edges = _chain_graph()
+    text = serialize_graph_for_model(nodes, edges, max_tokens=500, seeds=['handle'], estimator=CharEstimator())
+    assert text.startswith('CALL GRAPH:')
+    assert text.count('pkg/api.py') == 1
+    assert text.count('pkg/util.py') == 1
+    assert '1) handle (F1:1-10)' in text
+    assert '  1 -> 2' in text
+    assert 'omitted' not in text
+
+
+def test_serialize_respects_budget_and_keeps_nearest_nodes():
+    nodes, edges = _chain_graph()
+    estimator = CharEstimator()
+    text = serialize_graph_for_model(nodes, edges, max_tokens=45, seeds=['handle'], estimator=estimator)
+    assert estimator.estimate_tokens(text) <= 45
+    assert 'handle' in text
+    assert 'far' not in text
+    assert 'more nodes omitted' in text
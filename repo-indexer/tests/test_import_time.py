@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Import-time checks: CLI modules must not load heavy libraries at import,
+for --help, or for a chunker dry run.
+"""
+
+import json
+import subprocess
+import sys
+import textwrap
+import unittest
+from pathlib import Path
+
+REPO_INDEXER = Path(__file__).parent.parent
+
+HEAVY_MODULES = ['tiktoken', 'tree_sitter', 'chromadb', 'sentence_transformers', 'torch',
+                 'numpy', 'onnxruntime', 'tokenizers', 'neo4j']
+
+CLI_MODULES = ['chunker.chunker', 'embeddings.embed_chroma', 'retrieval.query', 'manage_index']
+
+# Generous bound so slow CI machines pass; heavy imports take seconds, not this.
+IMPORT_BUDGET_S = 1.0
+
+# Runs in a child interpreter: records any attempt to import a heavy module
+# (installed or not) via a meta path finder that never resolves anything.
+GUARD = textwrap.dedent('''
+    import json, runpy, sys
+    heavy = set({heavy!r})
+    attempted = []
+
+    class Guard:
+        def find_spec(self, name, path=None, target=None):
+            if name.split('.')[0] in heavy:
+                attempted.append(name)
+            return None
+
+    sys.meta_path.insert(0, Guard())
+    sys.path.insert(0, {root!r})
+    {body}
+    print(json.dumps(sorted(set(attempted))))
+''')
+
+
+def run_guarded(body: str, cwd: str = None) -> list:
+    code = GUARD.format(heavy=HEAVY_MODULES, root=str(REPO_INDEXER), body=body)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=cwd, timeout=60)
+    if proc.returncode != 0:
+        raise AssertionError(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test heavy libraries load only on the code paths that need them."""
+    
+    def test_module_import(self):
+        """Test importing the CLI modules pulls in no heavy library."""
+        body = "\n".join(f"import {module}" for module in CLI_MODULES)
+        self.assertEqual(run_guarded(body), [])
+    
+    def test_help(self):
+        """Test --help of every CLI exits without heavy imports."""
+        for module in CLI_MODULES:
+            body = textwrap.dedent(f'''
+                sys.argv = ['{module}', '--help']
+                try:
+                    runpy.run_module('{module}', run_name='__main__')
+                except SystemExit:
+                    pass
+            ''')
+            with self.subTest(module=module):
+                self.assertEqual(run_guarded(body), [])
+    
+    def test_chunker_dry_run(self):
+        """Test a chunker dry run never loads tiktoken or tree_sitter."""
+        body = textwrap.dedent('''
+            from chunker.chunker import RepoChunker
+            import tempfile
+            with tempfile.TemporaryDirectory() as out:
+                RepoChunker(root_path='.', output_dir=out).run(dry_run=True)
+        ''')
+        self.assertEqual(run_guarded(body), [])
+    
+    def test_import_time(self):
+        """Test cumulative import time of the CLI modules (python -X importtime)."""
+        code = f"import sys; sys.path.insert(0, {str(REPO_INDEXER)!r}); " + "; ".join(
+            f"import {module}" for module in CLI_MODULES)
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              capture_output=True, text=True, timeout=60)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        
+        cumulative_us = {}
+        for line in proc.stderr.splitlines():
+            fields = line[len('import time:'):].split('|')
+            if not line.startswith('import time:') or len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            cumulative_us[fields[2].strip()] = int(fields[1])
+        
+        total_s = sum(cumulative_us.get(module, 0) for module in CLI_MODULES) / 1e6
+        self.assertLess(total_s, IMPORT_BUDGET_S, f"CLI modules took {total_s:.2f}s to import")
+        self.assertFalse(set(HEAVY_MODULES) & set(cumulative_us))
+
+
+if __name__ == '__main__':
+    unittest.main()
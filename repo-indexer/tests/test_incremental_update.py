@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for git-diff driven incremental indexing.
+"""
+
+import importlib.util
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker
+from chunker.git_changes import changed_files
+from chunker.interval_index import ChunkIntervalIndex, INDEX_FILENAME
+from manage_index import IncrementalUpdater, collect_garbage, live_chunk_ids
+
+
+def _git(repo: Path, *args: str):
+    subprocess.run(['git', '-C', str(repo), '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@unittest.skipIf(shutil.which('git') is None, "git not available")
+class TestIncrementalUpdate(unittest.TestCase):
+    """Test incremental update against a throwaway git repository."""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.repo = self.temp_dir / "repo"
+        self.out = self.temp_dir / "out"
+        (self.repo / "pkg").mkdir(parents=True)
+        (self.repo / "pkg" / "keep.py").write_text("def keep():\n    return 1\n")
+        (self.repo / "pkg" / "change.py").write_text("def change():\n    return 2\n")
+        (self.repo / "pkg" / "gone.py").write_text("def gone():\n    return 3\n")
+        (self.repo / "pkg" / "move.py").write_text("def move():\n    return 4\n")
+        _git(self.repo, 'init', '-q')
+        _git(self.repo, 'add', '.')
+        _git(self.repo, 'commit', '-q', '-m', 'initial')
+        
+        RepoChunker(root_path=str(self.repo), output_dir=str(self.out)).run()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def _chunks(self):
+        with open(self.out / "chunks.jsonl") as f:
+            return [json.loads(line) for line in f]
+    
+    def _edit_tree(self):
+        (self.repo / "pkg" / "change.py").write_text("def change():\n    return 20\n")
+        (self.repo / "pkg" / "gone.py").unlink()
+        _git(self.repo, 'mv', 'pkg/move.py', 'pkg/moved.py')
+        (self.repo / "pkg" / "new.py").write_text("def new():\n    return 5\n")
+    
+    def test_changed_files_classification(self):
+        """Test git diff output is classified per change type."""
+        self._edit_tree()
+        changes = changed_files(self.repo, 'HEAD')
+        self.assertEqual(changes.modified, ['pkg/change.py'])
+        self.assertEqual(changes.deleted, ['pkg/gone.py'])
+        self.assertEqual(changes.renamed, [('pkg/move.py', 'pkg/moved.py')])
+        self.assertEqual(changes.added, ['pkg/new.py'])
+    
+    def test_update_rechunks_only_changed_files(self):
+        """Test update keeps untouched chunks and replaces changed ones."""
+        manifest = json.loads((self.out / "manifest.json").read_text())
+        self.assertIn('git_commit', manifest)
+        keep_before = [c for c in self._chunks() if c['filepath'].endswith('keep.py')]
+        
+        self._edit_tree()
+        updater = IncrementalUpdater(root_path=str(self.repo), output_dir=str(self.out), embed=False)
+        stats = updater.update()
+        
+        chunks = self._chunks()
+        files = sorted(Path(c['filepath']).name for c in chunks)
+        self.assertEqual(files, ['change.py', 'keep.py', 'moved.py', 'new.py'])
+        self.assertEqual([c for c in chunks if c['filepath'].endswith('keep.py')], keep_before)
+        self.assertIn('return 20', next(c for c in chunks if c['filepath'].endswith('change.py'))['text'])
+        self.assertEqual(stats['files_rechunked'], 3)
+        self.assertEqual(stats['files_unchanged'], 1)
+        self.assertEqual(stats['chunks_reused'], len(keep_before))
+        
+        index = ChunkIntervalIndex.load(self.out / INDEX_FILENAME)
+        self.assertEqual(index.chunks_for_file(str(Path('pkg') / 'gone.py')), [])
+        self.assertEqual(len(index), len(chunks))
+        
+        manifest = json.loads((self.out / "manifest.json").read_text())
+        self.assertEqual(manifest['total_chunks'], len(chunks))
+        self.assertEqual(manifest['last_update']['files_deleted'], 1)
+
+    @unittest.skipIf(importlib.util.find_spec('numpy') is None, "numpy not installed")
+    def test_update_embeds_with_configured_backend_and_store(self):
+        """Test the backend and store the index was built with are used for the new vectors."""
+        from embeddings.local_store import LocalVectorStore
+        self._edit_tree()
+        store_path = self.temp_dir / "store"
+        updater = IncrementalUpdater(root_path=str(self.repo), output_dir=str(self.out), chroma_path=str(store_path),
+                                     backend='hashing', store='local')
+        stats = updater.update()
+
+        store = LocalVectorStore(store_path, create=False)
+        self.assertGreater(stats['chunks_embedded'], 0)
+        self.assertEqual(store.count(), stats['chunks_embedded'])
+
+    def test_update_rechunks_orphaned_aliases(self):
+        """Test copies that were aliases of a deleted file get chunks of their own."""
+        (self.repo / "pkg" / "copy.py").write_text((self.repo / "pkg" / "gone.py").read_text())
+        _git(self.repo, 'add', '.')
+        _git(self.repo, 'commit', '-q', '-m', 'copy')
+        RepoChunker(root_path=str(self.repo), output_dir=str(self.out)).run()
+        canonical = [c for c in self._chunks() if c.get('aliases')]
+        self.assertEqual(len(canonical), 1)
+
+        (self.repo / "pkg" / canonical[0]['filepath'].split('/')[-1]).unlink()
+        IncrementalUpdater(root_path=str(self.repo), output_dir=str(self.out), embed=False).update()
+
+        chunks = self._chunks()
+        files = sorted(Path(c['filepath']).name for c in chunks)
+        self.assertEqual(len([f for f in files if f in ('gone.py', 'copy.py')]), 1)
+        self.assertFalse(any(c.get('aliases') for c in chunks))
+
+
+class PagedCollection:
+    """Collection stand-in that supports paged id listing and deletes."""
+    
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.page_calls = 0
+        self.delete_calls = []
+    
+    def get(self, limit, offset, include):
+        self.page_calls += 1
+        return {'ids': self.ids[offset:offset + limit]}
+    
+    def delete(self, ids):
+        self.delete_calls.append(list(ids))
+        self.ids = [i for i in self.ids if i not in set(ids)]
+
+
+class TestGarbageCollection(unittest.TestCase):
+    """Test orphaned vectors are found in pages and deleted in batches."""
+    
+    def test_collect_garbage(self):
+        """Test only ids missing from chunks.jsonl are deleted."""
+        collection = PagedCollection([f"id{i}" for i in range(10)])
+        live = {"id0", "id3", "id9"}
+        stats = collect_garbage(collection, live, page_size=4, batch_size=3)
+        self.assertEqual(stats['scanned'], 10)
+        self.assertEqual(stats['orphans'], 7)
+        self.assertEqual(stats['deleted'], 7)
+        self.assertEqual(sorted(collection.ids), sorted(live))
+        self.assertEqual(collection.page_calls, 4)
+        self.assertEqual([len(b) for b in collection.delete_calls], [3, 3, 1])
+    
+    def test_dry_run_deletes_nothing(self):
+        """Test dry runs only report orphans."""
+        collection = PagedCollection(["a", "b"])
+        stats = collect_garbage(collection, {"a"}, dry_run=True)
+        self.assertEqual(stats['orphans'], 1)
+        self.assertEqual(collection.ids, ["a", "b"])
+    
+    def test_live_chunk_ids(self):
+        """Test ids are read from chunks.jsonl."""
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            chunks_file = temp_dir / "chunks.jsonl"
+            chunks_file.write_text('{"id": "x", "text": "a"}\n\n{"id": "y", "text": "b"}\n')
+            self.assertEqual(live_chunk_ids(chunks_file), {"x", "y"})
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
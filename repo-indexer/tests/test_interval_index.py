@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the chunk line-range index.
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker
+from chunker.interval_index import ChunkIntervalIndex, INDEX_FILENAME
+
+
+class TestChunkIntervalIndex(unittest.TestCase):
+    """Test interval queries over chunk line ranges."""
+    
+    def setUp(self):
+        self.index = ChunkIntervalIndex()
+        self.index.add("src/a.py", 1, 20, "a1")
+        self.index.add("src/a.py", 15, 40, "a2")
+        self.index.add("src/a.py", 41, 60, "a3")
+        self.index.add("src/a.py", 1, 200, "a_all")
+        self.index.add("src\\b.py", 1, 10, "b1")
+    
+    def test_query_overlap(self):
+        """Test chunks overlapping a line range are returned."""
+        self.assertEqual(sorted(self.index.query("src/a.py", 18, 19)), ["a1", "a2", "a_all"])
+        self.assertEqual(sorted(self.index.query("src/a.py", 45, 45)), ["a3", "a_all"])
+        self.assertEqual(self.index.query("src/a.py", 201, 300), [])
+    
+    def test_query_normalizes_separators(self):
+        """Test Windows and POSIX paths resolve to the same file."""
+        self.assertEqual(self.index.query("src/b.py", 5, 5), ["b1"])
+        self.assertIn("src\\a.py", self.index)
+    
+    def test_unknown_file(self):
+        """Test unknown files return no chunks."""
+        self.assertEqual(self.index.query("missing.py", 1, 10), [])
+        self.assertEqual(self.index.chunks_for_file("missing.py"), [])
+    
+    def test_add_after_query_and_remove(self):
+        """Test the index stays correct when files are updated."""
+        self.index.query("src/a.py", 1, 1)
+        self.index.add("src/a.py", 61, 70, "a4")
+        self.assertEqual(self.index.query("src/a.py", 65, 65), ["a_all", "a4"])
+        self.index.remove_file("src/a.py")
+        self.assertEqual(self.index.chunks_for_file("src/a.py"), [])
+    
+    def test_save_and_load_roundtrip(self):
+        """Test persistence keeps query results."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = Path(temp_dir) / INDEX_FILENAME
+            self.index.save(path)
+            loaded = ChunkIntervalIndex.load(path)
+            self.assertEqual(len(loaded), 5)
+            self.assertEqual(sorted(loaded.query("src/a.py", 18, 19)), ["a1", "a2", "a_all"])
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_repo_chunker_builds_index(self):
+        """Test RepoChunker records written chunks in its index."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            test_file = Path(temp_dir) / "test.py"
+            test_file.write_text("def hello():\n    print('Hello')\n")
+            chunker = RepoChunker(root_path=temp_dir, output_dir=str(Path(temp_dir) / "output"))
+            with patch.object(chunker.chunker, 'chunk_file', return_value=[
+                {'type': 'function', 'name': 'hello', 'start_line': 1, 'end_line': 2, 'text': "def hello():\n    print('Hello')"}
+            ]):
+                file_params = Mock()
+                file_params.file_path = str(test_file)
+                chunker.process_file(file_params)
+            
+            chunker.write_interval_index()
+            with open(chunker.output_dir / "chunks.jsonl") as f:
+                chunk_id = json.loads(f.readline())['id']
+            loaded = ChunkIntervalIndex.load(chunker.output_dir / INDEX_FILENAME)
+            self.assertEqual(loaded.query("test.py", 2, 2), [chunk_id])
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
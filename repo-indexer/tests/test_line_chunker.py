@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Unit tests for streaming line chunking and the shared line-offset index.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker, TreeSitterChunker
+from chunker.line_chunker import LineOffsetIndex, add_overlap, iter_line_chunks
+
+SAMPLES = ["", "one", "one\n", "a\nb\nc", "a\r\nb\r\n\n\nc\n", "é\nü\n" * 3]
+
+
+def list_overlap(chunks, content, overlap_lines):
+    """The list-based pass add_overlap replaces, extending chunks in place front to back."""
+    if len(chunks) <= 1:
+        return chunks
+    lines = content.split('\n')
+    for i, chunk in enumerate(chunks):
+        if i > 0:
+            prev_end = chunks[i - 1]['end_line']
+            overlap_start = max(0, prev_end - overlap_lines)
+            chunk['text'] = '\n'.join(lines[overlap_start:prev_end]) + '\n' + chunk['text']
+            chunk['start_line'] = overlap_start + 1
+        if i < len(chunks) - 1:
+            next_start = chunks[i + 1]['start_line'] - 1
+            overlap_end = min(len(lines), next_start + overlap_lines)
+            chunk['text'] = chunk['text'] + '\n' + '\n'.join(lines[next_start:overlap_end])
+            chunk['end_line'] = overlap_end
+    return chunks
+
+
+class TestLineChunker(unittest.TestCase):
+    """Test the line-offset index, line chunking and overlap."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        queries_dir = Path(__file__).parent.parent / "chunker" / "queries"
+        self.chunker = TreeSitterChunker(queries_dir, max_tokens=60, min_tokens=10, overlap_tokens=12)
+        self.content = "".join(f"value_{i} = compute({i}, {i * 7})\n" for i in range(200))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        path = self.root / name
+        path.write_bytes(text.encode('utf-8'))
+        return str(path)
+
+    def test_index_lines_match_split(self):
+        """Test string and file indexes number lines exactly like str.split('\\n')."""
+        for text in SAMPLES:
+            expected = text.split('\n')
+            self.assertEqual(list(LineOffsetIndex.from_text(text).iter_lines(text)), expected)
+            index = LineOffsetIndex()
+            with open(self._write("sample.txt", text), 'rb') as f:
+                self.assertEqual(list(index.track(f)), expected)
+            self.assertEqual(len(index), len(expected))
+
+    def test_index_text_slices_ranges(self):
+        """Test any line range is read back from a string or a file through the index."""
+        text = "a\nbb\n\nccc\nd\n"
+        lines = text.split('\n')
+        string_index = LineOffsetIndex.from_text(text)
+        file_index = LineOffsetIndex()
+        path = self._write("ranges.txt", text)
+        with open(path, 'rb') as f:
+            list(file_index.track(f))
+        with open(path, 'rb') as f:
+            for start in range(1, len(lines) + 1):
+                for end in range(start, len(lines) + 1):
+                    expected = '\n'.join(lines[start - 1:end])
+                    self.assertEqual(string_index.text(text, start, end), expected)
+                    self.assertEqual(file_index.text(f, start, end), expected)
+
+    def test_iter_line_chunks_bounds(self):
+        """Test blocks cover every line once and stay under the token limit."""
+        chunks = list(iter_line_chunks(self.content.split('\n'), len, 120))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks[0]['start_line'], 1)
+        self.assertEqual(chunks[-1]['end_line'], 201)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk['start_line'], previous['end_line'] + 1)
+        self.assertEqual('\n'.join(c['text'] for c in chunks), self.content)
+        self.assertTrue(all(sum(map(len, c['text'].split('\n'))) <= 120 for c in chunks))
+
+    def test_overlap_matches_list_pass(self):
+        """Test streamed overlap equals the in-place list pass, including clamping at the end of the file."""
+        text = '\n'.join(f"l{i}" for i in range(1, 13))
+        index = LineOffsetIndex.from_text(text)
+        for bounds in (((1, 4), (5, 8), (9, 12)), ((1, 5), (6, 11), (12, 12)), ((1, 12),)):
+            for overlap_lines in (0, 2, 3):
+                def blocks():
+                    return [{'start_line': s, 'end_line': e, 'text': index.text(text, s, e)} for s, e in bounds]
+                with self.subTest(bounds=bounds, overlap_lines=overlap_lines):
+                    self.assertEqual(list(add_overlap(blocks(), index, text, overlap_lines)),
+                                     list_overlap(blocks(), text, overlap_lines))
+
+    def test_stream_matches_in_memory(self):
+        """Test chunk_file_stream yields the same chunks as the in-memory path, whatever the file's tail."""
+        for tail in ("", "x", "x\n", "y = 1\nz = 2", "last = compute(1, 2)\n\n\n"):
+            with self.subTest(tail=tail):
+                content = self.content + tail
+                path = self._write("data.txt", content)
+                expected = self.chunker.chunk_file(path, content)
+                self.assertGreater(len(expected), 2)
+                self.assertEqual(list(self.chunker.chunk_file_stream(path)), expected)
+
+    def test_oversize_stream_policy(self):
+        """Test files over the cap are streamed into chunks.jsonl instead of skipped."""
+        repo = self.root / "repo"
+        repo.mkdir()
+        (repo / "huge.txt").write_text(self.content, encoding='utf-8')
+        out = self.root / "out"
+        RepoChunker(str(repo), str(out), max_file_bytes=1000, oversize='stream', max_tokens=60).run()
+
+        with open(out / "manifest.json", 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['skipped_files']['too_large'], 0)
+        self.assertEqual(manifest['parsed_files'], 1)
+        with open(out / "chunks.jsonl", 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), manifest['total_chunks'])
+        self.assertTrue(all(r['parser_fallback'] for r in records))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local memory-mapped vector store.
+"""
+
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from embeddings.embed_chroma import ChromaEmbedder
+from embeddings.encoders import HashingEncoder
+from embeddings.local_store import (INDEX_FILENAME, RECORDS_FILENAME, STORE_MARKER, VECTORS_FILENAME,
+                                    LocalVectorStore, matches)
+from embeddings.vector_store import open_chunk_collection, resolve_store
+from tests.test_embed_chroma import make_chunk
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+def unit(*values):
+    norm = sum(v * v for v in values) ** 0.5
+    return [v / norm for v in values]
+
+
+class TestWhereFilters(unittest.TestCase):
+    """Test Chroma-style metadata filters."""
+
+    def test_operators(self):
+        """Test equality, ranges, membership and boolean combinators."""
+        metadata = {'language': 'python', 'filepath': 'a.py', 'start_line': 10, 'end_line': 20}
+        self.assertTrue(matches(metadata, {'language': 'python'}))
+        self.assertFalse(matches(metadata, {'language': {'$ne': 'python'}}))
+        self.assertTrue(matches(metadata, {'$and': [{'filepath': 'a.py'}, {'start_line': {'$lte': 15}},
+                                                   {'end_line': {'$gte': 15}}]}))
+        self.assertFalse(matches(metadata, {'$and': [{'filepath': 'a.py'}, {'start_line': {'$gt': 15}}]}))
+        self.assertTrue(matches(metadata, {'$or': [{'language': 'go'}, {'language': {'$in': ['python']}}]}))
+        self.assertFalse(matches(metadata, {'missing': {'$nin': ['x']}}))
+
+    def test_unknown_operator(self):
+        """Test unsupported operators fail loudly instead of matching everything."""
+        with self.assertRaises(ValueError):
+            matches({'language': 'python'}, {'language': {'$like': 'py'}})
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestLocalVectorStore(unittest.TestCase):
+    """Test the collection API of the local store."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "store"
+        self.store = LocalVectorStore(self.path)
+        self.store.upsert(
+            ids=['a', 'b', 'c'],
+            embeddings=[unit(1, 0, 0, 0), unit(1, 1, 0, 0), unit(0, 0, 1, 0)],
+            documents=['alpha', 'beta', 'gamma'],
+            metadatas=[{'language': 'python', 'filepath': 'a.py', 'start_line': 1},
+                       {'language': 'go', 'filepath': 'b.go', 'start_line': 5},
+                       {'language': 'python', 'filepath': 'c.py', 'start_line': 9}]
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_query_ranks_by_cosine(self):
+        """Test exact search returns nearest ids with cosine distances."""
+        results = self.store.query(query_embeddings=[unit(1, 0, 0, 0)], n_results=2,
+                                   include=['documents', 'metadatas', 'distances'])
+        self.assertEqual(results['ids'][0], ['a', 'b'])
+        self.assertAlmostEqual(results['distances'][0][0], 0.0, places=5)
+        self.assertEqual(results['documents'][0][1], 'beta')
+
+    def test_query_with_filters(self):
+        """Test language and non-coded metadata filters restrict candidates."""
+        results = self.store.query(query_embeddings=[unit(1, 0, 0, 0)], n_results=5,
+                                   where={'language': 'python'})
+        self.assertEqual(results['ids'][0], ['a', 'c'])
+        results = self.store.query(query_embeddings=[unit(1, 0, 0, 0)], n_results=5,
+                                   where={'$and': [{'language': 'python'}, {'start_line': {'$gte': 5}}]})
+        self.assertEqual(results['ids'][0], ['c'])
+        results = self.store.query(query_embeddings=[unit(1, 0, 0, 0)], n_results=5,
+                                   where={'filepath': 'missing.py'})
+        self.assertEqual(results['ids'][0], [])
+
+    def test_upsert_overwrites_in_place(self):
+        """Test re-upserting an id replaces its vector without growing the matrix."""
+        self.store.upsert(ids=['a'], embeddings=[unit(0, 0, 0, 1)], documents=['alpha2'],
+                          metadatas=[{'language': 'python', 'filepath': 'a.py'}])
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(len(self.store.ids), 3)
+        results = self.store.query(query_embeddings=[unit(0, 0, 0, 1)], n_results=1)
+        self.assertEqual(results['ids'][0], ['a'])
+        self.assertEqual(results['documents'][0], ['alpha2'])
+
+    def test_update_merges_metadata(self):
+        """Test update merges keys like Chroma and skips unknown ids."""
+        self.store.update(ids=['b', 'zzz'], metadatas=[{'function_ids': 'x'}, {'function_ids': 'y'}])
+        metadata = self.store.get(ids=['b'], include=['metadatas'])['metadatas'][0]
+        self.assertEqual(metadata['function_ids'], 'x')
+        self.assertEqual(metadata['language'], 'go')
+        self.assertEqual(self.store.count(), 3)
+
+    def test_metadata_update_logs_no_vector_or_document(self):
+        """Test metadata-only updates append a small update record and survive a reload."""
+        vectors_size = (self.path / VECTORS_FILENAME).stat().st_size
+        self.store.update(ids=['b'], metadatas=[{'start_line': 50}])
+        self.assertEqual((self.path / VECTORS_FILENAME).stat().st_size, vectors_size)
+        last = json.loads((self.path / RECORDS_FILENAME).read_text().splitlines()[-1])
+        self.assertEqual(set(last), {'row', 'update', 'metadata'})
+
+        reopened = LocalVectorStore(self.path, create=False)
+        result = reopened.get(ids=['b'], include=['metadatas', 'documents'])
+        self.assertEqual(result['metadatas'][0]['start_line'], 50)
+        self.assertEqual(result['documents'][0], 'beta')
+        self.assertEqual(reopened.query(query_embeddings=[unit(1, 1, 0, 0)], n_results=1,
+                                        where={'language': 'go'})['ids'][0], ['b'])
+
+    def test_add_rejects_existing_ids(self):
+        """Test add refuses ids that are already stored."""
+        with self.assertRaises(ValueError):
+            self.store.add(ids=['a'], embeddings=[unit(1, 0, 0, 0)])
+
+    def test_dimension_mismatch(self):
+        """Test vectors of another dimension are rejected."""
+        with self.assertRaises(ValueError):
+            self.store.upsert(ids=['d'], embeddings=[[1.0, 0.0]])
+
+    def test_delete_get_and_pagination(self):
+        """Test deleted ids disappear from get, count and query."""
+        self.store.delete(ids=['a', 'missing'])
+        self.assertEqual(self.store.count(), 2)
+        self.assertEqual(self.store.get(ids=['a'])['ids'], [])
+        self.assertEqual(self.store.get(limit=1, offset=1, include=[])['ids'], ['c'])
+        results = self.store.query(query_embeddings=[unit(1, 0, 0, 0)], n_results=3)
+        self.assertNotIn('a', results['ids'][0])
+
+    def test_reload_replays_log(self):
+        """Test a reopened store sees upserts, updates and deletes."""
+        self.store.update(ids=['c'], metadatas=[{'summary': 'third'}])
+        self.store.delete(ids=['b'])
+        reopened = LocalVectorStore(self.path, create=False)
+        self.assertEqual(reopened.count(), 2)
+        self.assertEqual(reopened.get(ids=['c'])['metadatas'][0]['summary'], 'third')
+        self.assertEqual(reopened.query(query_embeddings=[unit(0, 0, 1, 0)], n_results=1)['ids'][0], ['c'])
+
+    def test_compact_drops_deleted_rows(self):
+        """Test compaction shrinks the files and keeps the live records."""
+        self.store.delete(ids=['a'])
+        sizes = self.store.compact()
+        self.assertLess(sizes['bytes_after'], sizes['bytes_before'])
+        self.assertEqual(len(self.store.ids), 2)
+        reopened = LocalVectorStore(self.path, create=False)
+        self.assertEqual(sorted(reopened.get(include=[])['ids']), ['b', 'c'])
+        self.assertEqual(reopened.query(query_embeddings=[unit(1, 1, 0, 0)], n_results=1)['ids'][0], ['b'])
+
+    def test_open_requires_existing_store(self):
+        """Test create=False does not create an empty store."""
+        with self.assertRaises(FileNotFoundError):
+            LocalVectorStore(Path(self.tmp.name) / "missing", create=False)
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestIvfPqIndex(unittest.TestCase):
+    """Test approximate search against exact search."""
+
+    def test_recall_against_exact(self):
+        """Test IVF-PQ with reranking finds most of the exact top-k on clustered data."""
+        import numpy as np
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, 32))
+        vectors = centers[rng.integers(0, 20, 3000)] + 0.3 * rng.normal(size=(3000, 32))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = vectors[rng.choice(3000, 20, replace=False)] + 0.05 * rng.normal(size=(20, 32))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LocalVectorStore(tmp)
+            store.upsert(ids=[str(i) for i in range(3000)], embeddings=vectors.tolist(),
+                         metadatas=[{'language': 'python' if i % 2 else 'go'} for i in range(3000)])
+            exact = store.query(query_embeddings=queries.tolist(), n_results=10)['ids']
+            store.build_index(nlist=32, subspaces=8)
+            store.nprobe = 8
+            approx = store.query(query_embeddings=queries.tolist(), n_results=10)['ids']
+            recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(approx, exact)])
+            self.assertGreaterEqual(recall, 0.8)
+
+            # Rows upserted after training are encoded into the index too
+            store.upsert(ids=['new'], embeddings=[queries[0].tolist()], metadatas=[{'language': 'go'}])
+            top = store.query(query_embeddings=[queries[0].tolist()], n_results=1, where={'language': 'go'})
+            self.assertEqual(top['ids'][0], ['new'])
+
+            reopened = LocalVectorStore(tmp, create=False)
+            self.assertIsNotNone(reopened.index)
+            self.assertEqual(reopened.query(query_embeddings=[queries[0].tolist()], n_results=1)['ids'][0], ['new'])
+
+    def test_index_saved_on_flush(self):
+        """Test upserts leave the index file alone until flush, and unflushed rows are re-encoded on open."""
+        import numpy as np
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(300, 16))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LocalVectorStore(tmp)
+            store.upsert(ids=[str(i) for i in range(300)], embeddings=vectors.tolist())
+            store.build_index(nlist=8, subspaces=4)
+            saved = (Path(tmp) / INDEX_FILENAME).read_bytes()
+
+            store.upsert(ids=['x', 'y'], embeddings=vectors[:2].tolist())
+            self.assertEqual((Path(tmp) / INDEX_FILENAME).read_bytes(), saved)
+            self.assertEqual(len(LocalVectorStore(tmp, create=False).index.cells), 302)
+
+            store.close()
+            self.assertEqual(len(LocalVectorStore(tmp, create=False).index.cells), 302)
+            self.assertNotEqual((Path(tmp) / INDEX_FILENAME).read_bytes(), saved)
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestStoreSelection(unittest.TestCase):
+    """Test choosing between Chroma and the local store."""
+
+    def test_resolve_store(self):
+        """Test explicit choice, environment and detection of an existing local store."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.dict(os.environ, {}, clear=False):
+                os.environ.pop('VECTOR_STORE', None)
+                self.assertEqual(resolve_store(tmp), 'chroma')
+                self.assertEqual(resolve_store(tmp, 'local'), 'local')
+                (Path(tmp) / STORE_MARKER).write_text('{"dimension": null}', encoding='utf-8')
+                self.assertEqual(resolve_store(tmp), 'local')
+            with patch.dict(os.environ, {'VECTOR_STORE': 'bogus'}):
+                with self.assertRaises(ValueError):
+                    resolve_store(tmp)
+
+    def test_embedder_on_local_store(self):
+        """Test the embedder writes chunks to the local store end to end."""
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks_file = Path(tmp) / "chunks.jsonl"
+            chunks_file.write_text(''.join(
+                json.dumps(make_chunk(f'c{i}', filepath=f'm{i}.py')) + '\n' for i in range(5)
+            ), encoding='utf-8')
+            with patch.object(ChromaEmbedder, '_setup_model'):
+                embedder = ChromaEmbedder(chroma_path=str(Path(tmp) / "store"), store='local', batch_size=2)
+            embedder.encoder = HashingEncoder(64)
+            embedder.process_chunks_file(str(chunks_file))
+            self.assertEqual(embedder.collection.count(), 5)
+
+            _, collection = open_chunk_collection(str(Path(tmp) / "store"), create=False)
+            query = HashingEncoder(64).encode(["def c3(): pass"])
+            self.assertEqual(collection.query(query_embeddings=query, n_results=1)['ids'][0], ['c3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for MinHash/LSH near-duplicate chunk clustering.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from chunker.chunker import RepoChunker
+from chunker.near_dedup import (NEAR_DUPLICATES_FILENAME, MinHasher, cluster_chunks, load_representatives,
+                                lsh_params, shingles)
+
+
+def handler(name: str, field: str) -> str:
+    return "\n".join([
+        f"def handle_{name}(request, session):",
+        f"    payload = request.json()",
+        f"    record = session.query(Model).filter_by(id=payload['id']).first()",
+        f"    if record is None:",
+        f"        return error_response(404, 'not found')",
+        f"    record.{field} = payload['{field}']",
+        f"    session.add(record)",
+        f"    session.commit()",
+        f"    audit_log.write(user=request.user, action='update', target=record.id)",
+        f"    notify_subscribers(record, channel='updates', retries=3)",
+        f"    return json_response(record.to_dict(), status=200)",
+    ])
+
+
+class TestMinHash(unittest.TestCase):
+    """Test shingling, signatures and band selection."""
+
+    def test_shingles(self):
+        """Test shingles are word 5-grams and short texts collapse to one shingle."""
+        self.assertEqual(len(shingles("a b c d e f g")), 3)
+        self.assertEqual(len(shingles("a b")), 1)
+        self.assertEqual(shingles("  ,; "), set())
+
+    def test_signature_estimates_jaccard(self):
+        """Test signature agreement tracks the true Jaccard similarity."""
+        hasher = MinHasher(num_perm=256, seed=1)
+        a, b = set(range(0, 1000)), set(range(200, 1200))
+        agreement = (hasher.signature(a) == hasher.signature(b)).mean()
+        self.assertAlmostEqual(agreement, 800 / 1200, delta=0.1)
+
+    def test_lsh_params(self):
+        """Test bands times rows uses the whole signature with a candidate threshold below the target."""
+        bands, rows = lsh_params(64, 0.85)
+        self.assertEqual(bands * rows, 64)
+        self.assertLessEqual((1 / bands) ** (1 / rows), 0.85)
+
+
+class TestClusterChunks(unittest.TestCase):
+    """Test near-duplicates are grouped under the earliest chunk."""
+
+    def test_clusters(self):
+        """Test copies differing in one identifier cluster and unrelated chunks do not."""
+        chunks = [
+            {'id': 'a', 'text': handler('user', 'email'), 'tokens_estimate': 100},
+            {'id': 'other', 'text': "class Cache:\n" + "\n".join(f"    slot_{i} = compute_{i}(x, y)"
+                                                                  for i in range(20)), 'tokens_estimate': 90},
+            {'id': 'b', 'text': handler('user', 'email') + "\n# generated", 'tokens_estimate': 100},
+            {'id': 'tiny', 'text': "pass", 'tokens_estimate': 1},
+        ]
+        report = cluster_chunks(chunks, threshold=0.8)
+        self.assertEqual(report['clusters'], [{'representative': 'a', 'members': ['b']}])
+        self.assertEqual(report['stats']['chunks'], 4)
+        self.assertEqual(report['stats']['chunks_hashed'], 3)
+        self.assertEqual(report['stats']['embeddings_avoided'], 1)
+        self.assertEqual(report['stats']['tokens_avoided'], 100)
+
+    def test_chains_do_not_cluster(self):
+        """Test a chunk similar only to a member (A~B, B~C, A!~C) is not put under the representative."""
+        words = [f"token{i}" for i in range(120)]
+        chunks = [{'id': name, 'text': " ".join(words[start:start + 100])}
+                  for name, start in (('a', 0), ('b', 10), ('c', 20))]
+        report = cluster_chunks(chunks, threshold=0.75, num_perm=256)
+        self.assertEqual(report['clusters'], [{'representative': 'a', 'members': ['b']}])
+
+    def test_repo_chunker_report(self):
+        """Test the optional pass after a run writes the report and manifest stats."""
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = Path(tmp) / "repo"
+            repo.mkdir()
+            for name in ('orders', 'invoices', 'accounts'):
+                (repo / f"{name}.txt").write_text(handler(name, 'status') + "\n", encoding='utf-8')
+            out = Path(tmp) / "out"
+            RepoChunker(str(repo), str(out), near_dedup=0.5).run()
+
+            manifest = json.loads((out / "manifest.json").read_text())
+            report = json.loads((out / NEAR_DUPLICATES_FILENAME).read_text())
+            self.assertEqual(manifest['near_duplicates'], report['stats'])
+            self.assertEqual(report['stats']['clusters'], 1)
+            self.assertEqual(len(load_representatives(out / NEAR_DUPLICATES_FILENAME)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Unit tests for reduced-dimension vector storage.
+"""
+
+import importlib.util
+import json
+import math
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from embeddings.embed_chroma import ChromaEmbedder
+from embeddings.encoders import HashingEncoder
+from embeddings.projection import PROJECTION_FILENAME, Projection, load_projection
+from retrieval.query import CodeRetriever
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+def norm(vector):
+    return math.sqrt(sum(v * v for v in vector))
+
+
+class TestProjection(unittest.TestCase):
+    """Test projection maths and persistence."""
+    
+    def test_truncate(self):
+        """Test truncation keeps leading coordinates and re-normalizes."""
+        projected = Projection.truncate(2).apply([[3.0, 4.0, 12.0]])
+        self.assertEqual(len(projected[0]), 2)
+        self.assertAlmostEqual(projected[0][0], 0.6)
+        self.assertAlmostEqual(projected[0][1], 0.8)
+    
+    def test_save_and_load(self):
+        """Test the projection round-trips through the collection directory."""
+        with tempfile.TemporaryDirectory() as store:
+            self.assertIsNone(load_projection(store))
+            Projection.truncate(128, encoder='hashing:x').save(Path(store) / PROJECTION_FILENAME)
+            loaded = load_projection(store)
+        self.assertEqual((loaded.method, loaded.dimension, loaded.encoder), ('truncate', 128, 'hashing:x'))
+    
+    def test_pca_requires_fit(self):
+        """Test a pca projection cannot be built without fitted parameters."""
+        with self.assertRaises(ValueError):
+            Projection('pca', 8)
+    
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_pca_fit(self):
+        """Test PCA output dimension, normalization and explained variance."""
+        vectors = HashingEncoder(dimension=32).encode([f"def f{i}(x): return x * {i}" for i in range(40)])
+        projection = Projection.fit_pca(vectors, 8)
+        projected = projection.apply(vectors[:3])
+        self.assertEqual(len(projected[0]), 8)
+        self.assertAlmostEqual(norm(projected[0]), 1.0, places=5)
+        self.assertTrue(0 < projection.explained_variance <= 1)
+
+
+class TestProjectedStorage(unittest.TestCase):
+    """Test the embedder and retriever share the stored projection."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = self.temp_dir.name
+        self.chunks_file = Path(self.store) / "chunks.jsonl"
+        with open(self.chunks_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'text': 'def a(): pass'}) + "\n")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def make_embedder(self, **kwargs):
+        with patch.object(ChromaEmbedder, '_setup_chroma'):
+            embedder = ChromaEmbedder(chroma_path=self.store, backend='hashing', **kwargs)
+        embedder.collection = Mock(count=lambda: 0)
+        return embedder
+    
+    def test_embedder_and_retriever_use_same_space(self):
+        """Test documents and queries are reduced identically."""
+        embedder = self.make_embedder(reduce_dim=64, reduce_method='truncate')
+        embedder.fit_projection(self.chunks_file)
+        document = embedder.embed_batch([{'text': 'def load_config(path): pass'}])[0]
+        self.assertEqual(len(document), 64)
+        
+        with patch.object(CodeRetriever, '_setup_chroma'):
+            retriever = CodeRetriever(chroma_path=self.store, backend='hashing')
+        self.assertEqual(retriever.embed_query('def load_config(path): pass'), document)
+    
+    def test_requested_projection_must_match_stored(self):
+        """Test a store cannot silently mix vector sizes."""
+        Projection.truncate(64).save(Path(self.store) / PROJECTION_FILENAME)
+        self.assertEqual(len(self.make_embedder().embed_batch([{'text': 'x'}])[0]), 64)
+        with self.assertRaises(ValueError):
+            self.make_embedder(reduce_dim=128, reduce_method='truncate')
+    
+    def test_projection_refuses_other_encoder(self):
+        """Test a projection fitted for one encoder is never applied to another's vectors."""
+        Projection.truncate(64, encoder='torch:all-mpnet-base-v2').save(Path(self.store) / PROJECTION_FILENAME)
+        with self.assertRaises(ValueError):
+            self.make_embedder()
+        with patch.object(CodeRetriever, '_setup_chroma'), self.assertRaises(ValueError):
+            CodeRetriever(chroma_path=self.store, backend='hashing')
+    
+    def test_fit_refuses_non_empty_collection(self):
+        """Test a projection is never introduced over full-size vectors."""
+        embedder = self.make_embedder(reduce_dim=64, reduce_method='truncate')
+        embedder.collection = Mock(count=lambda: 5)
+        with self.assertRaises(ValueError):
+            embedder.fit_projection(self.chunks_file)
+
+    def test_pca_fit_samples_whole_file(self):
+        """Test PCA is fitted on a sample drawn from the whole file, not its first lines."""
+        with open(self.chunks_file, 'w', encoding='utf-8') as f:
+            for i in range(40):
+                f.write(json.dumps({'id': f'c{i}', 'language': 'python', 'tokens_estimate': 10,
+                                    'text': f'def f{i}(x): return x * {i}'}) + "\n")
+        embedder = self.make_embedder(reduce_dim=4, fit_sample=10)
+        fitted = []
+        encode = embedder.embed_batch
+        embedder.embed_batch = lambda chunks: fitted.extend(c['text'] for c in chunks) or encode(chunks)
+        embedder.fit_projection(self.chunks_file)
+
+        self.assertEqual(len(fitted), 10)
+        self.assertTrue(any(int(text.split('*')[1]) >= 10 for text in fitted))
+
+
+if __name__ == '__main__':
+    unittest.main()
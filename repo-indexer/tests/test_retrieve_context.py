@@ -36,3 +36,36 @@ def test_retrieve_context_minimal():
 
 
 
+
+
+class DuplicateChroma:
+    def search(self, query, n):
+        hit = {
+            'id': 'c1',
+            'document': 'def foo():\n  pass',
+            'metadata': {'filepath': 'a.py', 'start_line': 1, 'end_line': 2, 'tokens_estimate': 5},
+        }
+        return [
+            {'id': 'seed', 'document': 'def foo():\n  pass', 'metadata': {'filepath': 'a.py', 'start_line': 1, 'end_line': 9}},
+            hit,
+            dict(hit),
+            {'id': 'c2', 'document': 'x', 'metadata': {'filepath': 'b.py', 'start_line': 1, 'end_line': 2, 'tokens_estimate': 5000}},
+        ]
+
+
+def test_retrieve_context_dedupes_and_times_stages():
+    chunk = {'id': 'seed', 'document': 'def foo():\n  pass', 'metadata': {'filepath': 'a.py', 'start_line': 1, 'end_line': 9}}
+    ctx = retrieve_context_for_chunk(chunk, DuplicateChroma(), FakeSession(), n_semantic=3, hops=1, max_tokens=1000)
+    assert [c['id'] for c in ctx['semantic_chunks']] == ['c1']
+    assert ctx['duplicates_dropped'] == 2
+    assert ctx['chunks_over_budget'] == 1
+    assert ctx['tokens']['total'] <= 1000
+    for stage in ('semantic_ms', 'graph_ms', 'serialize_ms', 'pack_ms', 'total_ms'):
+        assert stage in ctx['timings']
+
+
+def test_retrieve_context_without_graph_session():
+    chunk = {'document': 'def foo():\n  pass', 'metadata': {}}
+    ctx = retrieve_context_for_chunk(chunk, FakeChroma(), None, n_semantic=1)
+    assert ctx['graph_nodes'] == []
+    assert len(ctx['semantic_chunks']) == 1
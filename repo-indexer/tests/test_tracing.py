@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pipeline tracing.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+import tracing
+from chunker.chunker import RepoChunker
+
+
+class TestTracing(unittest.TestCase):
+    """Test spans, nesting and export."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.trace_file = Path(self.temp_dir.name) / "trace.jsonl"
+
+    def tearDown(self):
+        tracing.configure(None)
+        self.temp_dir.cleanup()
+
+    def _spans(self):
+        tracing.flush()
+        with open(self.trace_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_disabled_is_noop(self):
+        """Test spans cost nothing and write nothing while tracing is off."""
+        tracing.configure(None)
+        with tracing.span('work', size=1) as s:
+            s.set_attribute('more', 2)
+        self.assertFalse(tracing.enabled())
+        self.assertFalse(self.trace_file.exists())
+
+    def test_explicit_configure_beats_environment(self):
+        """Test TRACE_FILE does not override an explicit configure()."""
+        with patch.dict(os.environ, {'TRACE_FILE': str(self.trace_file)}):
+            tracing._configured_from_env = False
+            tracing.configure(None)
+            self.assertFalse(tracing.enabled())
+            with tracing.span('work'):
+                pass
+        self.assertFalse(self.trace_file.exists())
+
+    def test_nesting_and_errors(self):
+        """Test children point at their parent and exceptions mark the span."""
+        tracing.configure(str(self.trace_file))
+        with tracing.span('outer', kind='test') as outer:
+            with tracing.span('inner'):
+                pass
+            outer.set_attribute('done', True)
+        with self.assertRaises(ValueError):
+            with tracing.span('failing'):
+                raise ValueError("boom")
+
+        spans = {s['name']: s for s in self._spans()}
+        self.assertEqual(spans['inner']['parent_id'], spans['outer']['span_id'])
+        self.assertEqual(spans['inner']['trace_id'], spans['outer']['trace_id'])
+        self.assertIsNone(spans['outer']['parent_id'])
+        self.assertEqual(spans['outer']['attributes'], {'kind': 'test', 'done': True})
+        self.assertEqual(spans['failing']['status'], 'error')
+        self.assertIn('boom', spans['failing']['attributes']['error'])
+
+    def test_propagate_across_threads(self):
+        """Test work submitted to a thread pool stays under the submitting span."""
+        tracing.configure(str(self.trace_file))
+
+        def work():
+            with tracing.span('threaded'):
+                pass
+
+        with tracing.span('request'):
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(tracing.propagate(work)).result()
+
+        spans = {s['name']: s for s in self._spans()}
+        self.assertEqual(spans['threaded']['parent_id'], spans['request']['span_id'])
+
+    def test_chunker_run_trace_and_summary(self):
+        """Test a chunking run traces traversal and every file, and summarizes by self time."""
+        root = Path(self.temp_dir.name) / "repo"
+        root.mkdir()
+        for name in ('a.py', 'b.py'):
+            (root / name).write_text("def f():\n    return 1\n", encoding='utf-8')
+        tracing.configure(str(self.trace_file))
+        RepoChunker(str(root), str(Path(self.temp_dir.name) / "out")).run()
+
+        spans = self._spans()
+        traversal = next(s for s in spans if s['name'] == 'traverse_file_system')
+        files = [s for s in spans if s['name'] == 'chunker.process_file']
+        self.assertEqual(len(files), 2)
+        self.assertTrue(all(s['parent_id'] == traversal['span_id'] for s in files))
+        self.assertEqual(traversal['attributes']['files'], 2)
+
+        rows = {row['name']: row for row in tracing.summarize(str(self.trace_file))}
+        self.assertEqual(rows['chunker.process_file']['count'], 2)
+        self.assertLessEqual(rows['traverse_file_system']['self_ms'], rows['traverse_file_system']['total_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
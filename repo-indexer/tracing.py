@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Lightweight spans for the indexing and retrieval pipeline.
+Disabled unless TRACE_FILE is set (or configure() is called); spans are then
+appended to a JSONL file, or exported through OpenTelemetry when TRACE_FORMAT=otel.
+"""
+
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+FORMATS = ('jsonl', 'otel')
+
+_current: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+_tracer = None
+_configured_from_env = False
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off; every operation does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed operation; nests under the span active in the current context."""
+
+    __slots__ = ('tracer', 'name', 'attributes', 'trace_id', 'span_id', 'parent_id',
+                 'start_ns', 'start', 'status', '_token')
+
+    def __init__(self, tracer: 'JsonlTracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.status = 'ok'
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current.get()
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.status = 'error'
+            self.attributes['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.export({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'duration_ms': round(duration_ms, 3),
+            'status': self.status,
+            'thread': threading.current_thread().name,
+            'pid': os.getpid(),
+            'attributes': self.attributes,
+        })
+        return False
+
+
+class JsonlTracer:
+    """Appends one JSON object per finished span to a local file."""
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def start(self, name: str, attributes: Dict[str, Any]) -> Span:
+        return Span(self, name, attributes)
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(self._buffer))
+            self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+class OtelTracer:
+    """Delegates to the OpenTelemetry SDK, exporting spans to a local file (no collector)."""
+
+    def __init__(self, path: str):
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+        except ImportError:
+            raise ImportError("TRACE_FORMAT=otel needs the OpenTelemetry SDK. Run: pip install opentelemetry-sdk")
+        self._file = open(path, 'a', encoding='utf-8')
+        self.provider = TracerProvider(resource=Resource.create({'service.name': 'repo-indexer'}))
+        self.provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter(out=self._file)))
+        self.tracer = self.provider.get_tracer('repo-indexer')
+
+    def start(self, name: str, attributes: Dict[str, Any]):
+        return _OtelSpan(self.tracer, name, attributes)
+
+    def flush(self):
+        self.provider.force_flush()
+        self._file.flush()
+
+
+class _OtelSpan:
+    """Context manager around start_as_current_span; OTel tracks parents itself."""
+
+    __slots__ = ('tracer', 'name', 'attributes', '_manager', '_span')
+
+    def __init__(self, tracer, name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any):
+        self._span.set_attribute(key, _otel_value(value))
+
+    def __enter__(self):
+        self._manager = self.tracer.start_as_current_span(
+            self.name, attributes={k: _otel_value(v) for k, v in self.attributes.items()})
+        self._span = self._manager.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._manager.__exit__(exc_type, exc, tb)
+
+
+def _otel_value(value: Any):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+def configure(path: Optional[str] = None, fmt: Optional[str] = None):
+    """Turn tracing on (to `path`) or off (path None); defaults come from TRACE_FILE/TRACE_FORMAT.
+
+    An explicit choice is final: TRACE_FILE is no longer consulted afterwards.
+    """
+    global _tracer, _configured_from_env
+    _configured_from_env = True
+    if _tracer is not None:
+        _tracer.flush()
+    fmt = fmt or os.getenv('TRACE_FORMAT') or 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown trace format: {fmt} (choose from {', '.join(FORMATS)})")
+    if not path:
+        _tracer = None
+    elif fmt == 'otel':
+        _tracer = OtelTracer(path)
+    else:
+        _tracer = JsonlTracer(path)
+    return _tracer
+
+
+def _tracer_from_env():
+    global _configured_from_env
+    _configured_from_env = True
+    if os.getenv('TRACE_FILE'):
+        configure(os.getenv('TRACE_FILE'))
+    return _tracer
+
+
+def enabled() -> bool:
+    return (_tracer if _configured_from_env else _tracer_from_env()) is not None
+
+
+def span(name: str, **attributes):
+    """Context manager timing a block: `with span('search', n_results=5) as s: ...`."""
+    tracer = _tracer if _configured_from_env else _tracer_from_env()
+    if tracer is None:
+        return _NOOP
+    return tracer.start(name, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of span() using the function's qualified name by default."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind `fn` to the current span so it nests correctly when run on another thread."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def flush():
+    if _tracer is not None:
+        _tracer.flush()
+
+
+atexit.register(flush)
+
+
+def summarize(path: str) -> List[Dict[str, Any]]:
+    """Per span name: count, total, self time and latency percentiles from a JSONL trace."""
+    from benchmarks.metrics import latency_summary
+
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                spans.append(json.loads(line))
+    child_ms: Dict[str, float] = {}
+    for record in spans:
+        if record.get('parent_id'):
+            child_ms[record['parent_id']] = child_ms.get(record['parent_id'], 0.0) + record['duration_ms']
+
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for record in spans:
+        entry = by_name.setdefault(record['name'], {'durations': [], 'self_ms': 0.0, 'errors': 0})
+        entry['durations'].append(record['duration_ms'])
+        entry['self_ms'] += max(0.0, record['duration_ms'] - child_ms.get(record['span_id'], 0.0))
+        entry['errors'] += record.get('status') == 'error'
+
+    rows = []
+    for name, entry in by_name.items():
+        rows.append({
+            'name': name,
+            'count': len(entry['durations']),
+            'total_ms': round(sum(entry['durations']), 3),
+            'self_ms': round(entry['self_ms'], 3),
+            'errors': entry['errors'],
+            **latency_summary(entry['durations']),
+        })
+    return sorted(rows, key=lambda row: row['self_ms'], reverse=True)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description="Summarize a JSONL trace written with TRACE_FILE")
+    parser.add_argument("trace", help="Trace file")
+    parser.add_argument("--format", choices=["json", "text"], default="text", help="Output format")
+    args = parser.parse_args()
+
+    rows = summarize(args.trace)
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'span':<40} {'count':>7} {'total ms':>11} {'self ms':>11} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in rows:
+        print(f"{row['name'][:40]:<40} {row['count']:>7} {row['total_ms']:>11.1f} {row['self_ms']:>11.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
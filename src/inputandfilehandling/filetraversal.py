@@ -8,33 +8,41 @@ import fnmatch
 from typing import Callable, List, Optional
 
 # Simple text file detection without magic
+TEXT_EXTENSIONS = {'.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp', 
+                   '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.sh', 
+                   '.bash', '.zsh', '.fish', '.ps1', '.bat', '.cmd', '.sql', '.html', '.htm', 
+                   '.css', '.scss', '.sass', '.less', '.xml', '.json', '.yaml', '.yml', 
+                   '.toml', '.ini', '.cfg', '.conf', '.txt', '.md', '.rst', '.tex', '.r', 
+                   '.m', '.pl', '.pm', '.tcl', '.lua', '.dart', '.elm', '.hs', '.ml', '.fs', 
+                   '.vb', '.pas', '.ada', '.asm', '.s', '.f', '.f90', '.f95', '.f03', '.f08'}
+
+# Bytes sampled from the start of a file with an unknown extension
+SNIFF_BYTES = 1024
+
+
+def looks_like_text(head: bytes) -> bool:
+    """Content check on the first SNIFF_BYTES: no null bytes and valid UTF-8."""
+    # Check if it contains null bytes (binary indicator)
+    if b'\x00' in head:
+        return False
+    # Try to decode as UTF-8
+    try:
+        head.decode('utf-8')
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
 def is_text_file(file_path: str) -> bool:
     """Simple text file detection based on extension and content sampling."""
-    text_extensions = {'.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp', 
-                      '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.sh', 
-                      '.bash', '.zsh', '.fish', '.ps1', '.bat', '.cmd', '.sql', '.html', '.htm', 
-                      '.css', '.scss', '.sass', '.less', '.xml', '.json', '.yaml', '.yml', 
-                      '.toml', '.ini', '.cfg', '.conf', '.txt', '.md', '.rst', '.tex', '.r', 
-                      '.m', '.pl', '.pm', '.tcl', '.lua', '.dart', '.elm', '.hs', '.ml', '.fs', 
-                      '.vb', '.pas', '.ada', '.asm', '.s', '.f', '.f90', '.f95', '.f03', '.f08'}
-    
     file_path_obj = Path(file_path)
-    if file_path_obj.suffix.lower() in text_extensions:
+    if file_path_obj.suffix.lower() in TEXT_EXTENSIONS:
         return True
     
     # Try to read first 1024 bytes to check if it's text
     try:
         with open(file_path, 'rb') as f:
-            chunk = f.read(1024)
-            # Check if it contains null bytes (binary indicator)
-            if b'\x00' in chunk:
-                return False
-            # Try to decode as UTF-8
-            try:
-                chunk.decode('utf-8')
-                return True
-            except UnicodeDecodeError:
-                return False
+            return looks_like_text(f.read(SNIFF_BYTES))
     except Exception:
         return False
 
@@ -59,13 +67,16 @@ class TraverseFileSystemParams:
         process_file: Optional[Callable[[ProcessFileParams], None]] = None,
         process_folder: Optional[Callable[[ProcessFolderParams], None]] = None,
         ignore: Optional[List[str]] = None,
-        chunk_size: int = 500
+        chunk_size: int = 500,
+        sniff: bool = True
     ):
         self.input_path = input_path
         self.process_file = process_file
         self.process_folder = process_folder
         self.ignore = ignore or []
         self.chunk_size = chunk_size
+        # False hands every file to process_file, which then does its own text check
+        self.sniff = sniff
 
 def traverse_file_system(params: TraverseFileSystemParams):
     """Traverse File System"""
@@ -106,7 +117,7 @@ def traverse_file_system(params: TraverseFileSystemParams):
                   print(f"Found file: {entry.name}")
                   file_path = str(entry)
                   try:
-                      if is_text_file(file_path):
+                      if not params.sniff or is_text_file(file_path):
                           if params.process_file:
                               params.process_file(
                                   ProcessFileParams(